@@ -0,0 +1,79 @@
+"""
+Vectorized drug extraction from clinical trial intervention strings.
+
+Interventions look like "DRUG: Aspirin 50 mg | PROCEDURE: Surgery" or
+"Drug: Pembrolizumab (MK-3475)|Radiation: ...". Everything runs as pandas string
+operations (split / explode / extract / replace), so hundreds of thousands of
+trials are processed in seconds instead of looping row by row.
+"""
+import re
+
+import pandas as pd
+
+# "DRUG:" / "Drug:" / "drug :" prefix, case-insensitive
+DRUG_PATTERN = r'^\s*drug\s*:\s*(?P<drug>.+?)\s*$'
+
+# Dosage and formulation suffixes: "50 mg", "10mg/kg", "0.5%", "2 x 10^6 cells", "100 mg tablets"...
+DOSAGE_PATTERN = (
+    r'\s+\d[\d.,/]*\s*(?:mg|mcg|µg|ug|g|kg|ml|l|iu|units?|%|mmol|mol|x)(?:/\s*(?:kg|m2|m²|ml|day|d))?\b.*$'
+)
+# Trailing parentheticals and formulation words: "(MK-3475)", "tablets", "injection"
+SUFFIX_PATTERN = r'\s*\([^)]*\)\s*$|\s+(?:tablets?|capsules?|injection|infusion|oral solution|iv|po)\s*$'
+
+
+def explode_drugs(interventions: pd.Series) -> pd.DataFrame:
+    """
+    One row per (trial, drug) mention.
+
+    Args:
+        interventions: Intervention strings, indexed by trial.
+    Returns:
+        DataFrame indexed like the input with columns 'drug' (normalized display name)
+        and 'drug_key' (casefolded name used for deduplication).
+    """
+    parts = (
+        interventions.dropna()
+        .astype(str)
+        .str.split('|')
+        .explode()
+    )
+    drugs = parts.str.extract(DRUG_PATTERN, flags=re.IGNORECASE)['drug'].dropna()
+
+    drugs = (
+        drugs.str.replace(DOSAGE_PATTERN, '', regex=True, case=False)
+        .str.replace(SUFFIX_PATTERN, '', regex=True, case=False)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip(' ,;-')
+    )
+    drugs = drugs[drugs != '']
+    return pd.DataFrame({'drug': drugs, 'drug_key': drugs.str.casefold()})
+
+
+def drug_trial_counts(interventions: pd.Series) -> pd.DataFrame:
+    """
+    Deduplicated drug -> number of trials table.
+
+    A drug mentioned several times in one trial counts once for that trial.
+    Spelling variants that differ only in case are merged; the most common spelling is kept.
+
+    Returns:
+        DataFrame with 'Drug Name' and 'Trial Count', most frequent first.
+    """
+    mentions = explode_drugs(interventions)
+    if mentions.empty:
+        return pd.DataFrame({'Drug Name': pd.Series(dtype=str), 'Trial Count': pd.Series(dtype=int)})
+
+    mentions = mentions.reset_index(names='trial').drop_duplicates(['trial', 'drug_key'])
+    counts = mentions.groupby('drug_key')['trial'].nunique()
+    names = (
+        mentions.groupby(['drug_key', 'drug']).size()
+        .sort_values(ascending=False)
+        .reset_index()
+        .drop_duplicates('drug_key')
+        .set_index('drug_key')['drug']
+    )
+    return (
+        pd.DataFrame({'Drug Name': names.reindex(counts.index), 'Trial Count': counts})
+        .sort_values(['Trial Count', 'Drug Name'], ascending=[False, True])
+        .reset_index(drop=True)
+    )
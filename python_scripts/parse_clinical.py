@@ -3,33 +3,8 @@ import json
 import urllib.request
 import time
 
-def extract_drugs(interventions_str):
-    if pd.isna(interventions_str): return []
-    drugs = []
-    
-    # Try different formats depending on how interventions are stored
-    # Sometime it's "DRUG: Aspirin | PROCEDURE: Surgery"
-    # Sometimes it's a list or JSON
-    if isinstance(interventions_str, str):
-        if "DRUG:" in interventions_str:
-            parts = interventions_str.split('|')
-            for p in parts:
-                p = p.strip()
-                if p.startswith('DRUG:'):
-                    drug = p.replace('DRUG:', '').strip()
-                    drugs.append(drug)
-        elif "Drug: " in interventions_str:
-             parts = interventions_str.split('|')
-             for p in parts:
-                 p = p.strip()
-                 if p.startswith('Drug:'):
-                     drug = p.replace('Drug:', '').strip()
-                     drugs.append(drug)
-        else:
-             # Just assume the whole string is the drug if no prefix and we filtered rows
-             pass
-    
-    return drugs
+from drug_extraction import drug_trial_counts
+
 
 print("Reading ailment index...")
 ailment_df = pd.read_csv('/home/anurag/Desktop/project-lr/ailment_index.csv')
@@ -45,6 +20,11 @@ try:
     for _, row in df.head(5).iterrows():
         print("\nRow Intervention:", row.get('Intervention') or row.get('Interventions'))
         print("Row Conditions:", row.get('Condition') or row.get('Conditions'))
+
+    intervention_col = next((c for c in df.columns if 'intervent' in c.lower()), None)
+    if intervention_col:
+        print("\nDrugs by trial count:")
+        print(drug_trial_counts(df[intervention_col]).head(20).to_string(index=False))
         
 except Exception as e:
     print('Error:', e)
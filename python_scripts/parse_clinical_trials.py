@@ -1,14 +1,30 @@
+import os
 import pandas as pd
 import requests
 import json
 import time
 
+from drug_extraction import drug_trial_counts
+
+PUBCHEM_PAUSE = 0.3  # Seconds between drugs without the shared limiter
+
+try:
+    # The workflow API clients' shared per-host limiter, when sequential_api_workflow/ is on PYTHONPATH
+    import rate_limiter
+except ImportError:
+    rate_limiter = None
+    print(f"Warning: rate_limiter not importable (add sequential_api_workflow/ to PYTHONPATH); "
+          f"pacing PubChem requests with a fixed {PUBCHEM_PAUSE}s pause instead of the shared limiter")
+
+def _get(url, **kwargs):
+    return rate_limiter.get(url, **kwargs) if rate_limiter else requests.get(url, **kwargs)
+
 def fetch_moa(drug_name):
     """Fetch mechanism of action from PubChem for a given drug name."""
     print(f"Fetching MOA for: {drug_name}...")
     try:
         url_cid = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{drug_name}/cids/JSON"
-        res_cid = requests.get(url_cid, timeout=10)
+        res_cid = _get(url_cid, timeout=10)
         
         if res_cid.status_code == 404:
             return "Drug not found in PubChem"
@@ -20,7 +36,7 @@ def fetch_moa(drug_name):
             
         cid = cids[0]
         url_profile = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug_view/data/compound/{cid}/JSON"
-        res_profile = requests.get(url_profile, timeout=10)
+        res_profile = _get(url_profile, timeout=10)
         
         if res_profile.status_code == 404:
             return "Profile not found"
@@ -67,27 +83,10 @@ def fetch_moa(drug_name):
         print(f"Error fetching MOA for {drug_name}: {e}")
         return f"Error: {e}"
 
-def extract_drugs(interventions_str):
-    """Extract drugs from the interventions string."""
-    if pd.isna(interventions_str):
-        return []
-    
-    drugs = []
-    parts = str(interventions_str).split('|')
-    for part in parts:
-        part = part.strip()
-        if part.upper().startswith('DRUG:'):
-            drug_name = part[5:].strip()
-            # If the drug string contains dosage (e.g. "Aspirin 50mg"), take just the first word
-            drug_name = drug_name.split(' ')[0]
-            drugs.append(drug_name)
-    return drugs
-
 def main():
     print("Loading ailment index...")
     try:
         # Check parent directory since script is in python_scripts/
-        import os
         ailment_path = '../ailment_index.csv' if os.path.exists('../ailment_index.csv') else 'ailment_index.csv'
         ailments = pd.read_csv(ailment_path)
         if 'Keyword' in ailments.columns and 'Index' in ailments.columns:
@@ -125,12 +124,9 @@ def main():
     print(f"Found {len(cancer_trials)} cancer trials out of {len(df)} total.")
     
     print("Extracting unique drugs...")
-    all_drugs = set()
-    for _, row in cancer_trials.iterrows():
-        drugs = extract_drugs(row[intervention_col])
-        all_drugs.update(drugs)
-        
-    unique_drugs = sorted(list(all_drugs))
+    drug_counts = drug_trial_counts(cancer_trials[intervention_col]).sort_values('Drug Name')
+    unique_drugs = drug_counts['Drug Name'].tolist()
+    trial_counts = dict(zip(drug_counts['Drug Name'], drug_counts['Trial Count']))
     print(f"Found {len(unique_drugs)} unique drugs across cancer trials.")
     
     results = []
@@ -140,9 +136,11 @@ def main():
         moa = fetch_moa(drug)
         results.append({
             'Drug Name': drug,
+            'Trial Count': trial_counts[drug],
             'Mechanism of Action': moa
         })
-        time.sleep(0.3) 
+        if rate_limiter is None:
+            time.sleep(PUBCHEM_PAUSE)
         
     print("\nGenerated Mechanisms of Action. Saving to Output Excel...")
     output_df = pd.DataFrame(results)
@@ -0,0 +1,194 @@
+"""
+Batch Workflow Runner
+Runs the workflow chain from input_apis.csv once per seed query across a process pool.
+
+Seeds are substituted into the template: keyword cells containing "{seed}" are formatted,
+and if no cell has a placeholder every non-empty keyword cell is replaced by the seed.
+Each seed writes to its own directory under the output root (see seed_slug). Across all worker processes,
+in-flight requests per upstream host (and per Node bridge API) are capped by shared
+semaphores, and each worker gets an equal share of every host's rate limit.
+
+Usage:
+    python batch_runner.py seeds.txt --workers 4
+    python batch_runner.py seeds.csv --host-concurrency 2 --output-root portfolio -- --output-format parquet --dedup
+
+Arguments after "--" are passed to workflow_orchestrator for every seed.
+"""
+import argparse
+import csv
+import hashlib
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import rate_limiter
+import workflow_orchestrator
+
+OUTPUT_ROOT = 'batch_outputs'
+WORKERS = 4
+HOST_CONCURRENCY = 2
+BRIDGE_APIS = ('pubchem', 'uspto', 'patentsview')  # APIs served through the Node bridge (execute_step)
+SUMMARY_FILE = 'batch_summary.csv'
+
+
+def read_seeds(path):
+    """Seeds from a text file (one per line) or a CSV with a 'seed' or 'query' column."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            reader = csv.DictReader(f)
+            column = next((c for c in reader.fieldnames or [] if c.lower() in ('seed', 'query')), None)
+            if column is None:
+                raise ValueError(f"{path} needs a 'seed' or 'query' column")
+            seeds = [row[column] for row in reader]
+        else:
+            seeds = f.read().splitlines()
+    return list(dict.fromkeys(s.strip() for s in seeds if s.strip() and not s.startswith('#')))
+
+
+def seed_steps(template, seed):
+    """Copy of the template steps with the seed substituted into the keyword cells."""
+    has_placeholder = any('{seed}' in (step.get('keywords') or '') for step in template)
+    steps = []
+    for step in template:
+        step = dict(step)
+        keywords = (step.get('keywords') or '').strip()
+        if has_placeholder:
+            step['keywords'] = keywords.replace('{seed}', seed)
+        elif keywords:
+            step['keywords'] = seed
+        steps.append(step)
+    return steps
+
+
+def seed_slug(seed):
+    """
+    Output directory name for a seed: a readable prefix plus a hash of the exact seed, so
+    seeds differing only in case or punctuation (or in non-Latin scripts) never share one.
+    """
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', seed).strip('_').lower()[:80] or 'seed'
+    return f"{slug}-{hashlib.sha1(seed.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _init_worker(slots, rate_scale):
+    rate_limiter.limiter.configure_shared(slots, rate_scale)
+
+
+def _run_seed(seed, steps, workflow_argv, output_dir):
+    args = workflow_orchestrator.parse_args(workflow_argv + ['--output-dir', output_dir])
+    started = time.perf_counter()
+    try:
+        summary = workflow_orchestrator.run_workflow(steps, args)
+        status, error = 'ok', ''
+    except Exception as e:
+        summary, status, error = [], 'error', str(e)
+    return {
+        'seed': seed,
+        'output_dir': output_dir,
+        'status': status,
+        'error': error,
+        'seconds': round(time.perf_counter() - started, 3),
+        'steps': summary,
+    }
+
+
+def print_summary(results, template):
+    step_labels = [f"{i+1}:{(s.get('api_name') or '').strip()}" for i, s in enumerate(template)]
+    header = f"{'seed':<30}{'status':>7}{'secs':>9}" + "".join(f"{label:>16}" for label in step_labels)
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        by_step = {s['step']: s for s in r['steps']}
+        cells = "".join(
+            f"{(str(by_step[i+1]['records']) + ' / ' + format(by_step[i+1]['seconds'], '.1f') + 's') if i+1 in by_step else '-':>16}"
+            for i in range(len(template))
+        )
+        print(f"{r['seed'][:29]:<30}{r['status']:>7}{r['seconds']:>9.1f}{cells}")
+    print("(cells: records / seconds)")
+
+
+def write_summary(results, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['seed', 'status', 'error', 'total_seconds', 'step', 'api_name',
+                                               'step_status', 'records', 'seconds', 'output_dir'])
+        writer.writeheader()
+        for r in results:
+            base = {'seed': r['seed'], 'status': r['status'], 'error': r['error'],
+                    'total_seconds': r['seconds'], 'output_dir': r['output_dir']}
+            if not r['steps']:
+                writer.writerow(base)
+            for s in r['steps']:
+                writer.writerow({**base, 'step': s['step'], 'api_name': s['api_name'],
+                                 'step_status': s['status'], 'records': s['records'], 'seconds': s['seconds']})
+
+
+def run_batch(seeds, template, output_root=OUTPUT_ROOT, workers=WORKERS,
+              host_concurrency=HOST_CONCURRENCY, workflow_argv=None):
+    """
+    Run one workflow per seed on a process pool.
+
+    Args:
+        seeds (list): Seed queries, e.g. disease names.
+        template (list): Workflow steps as read by workflow_orchestrator.read_input_csv.
+        output_root (str): Parent directory; each seed gets its own subdirectory.
+        workers (int): Worker processes.
+        host_concurrency (int): Max in-flight requests per upstream host across all workers.
+        workflow_argv (list): Extra workflow_orchestrator options applied to every seed.
+    Returns:
+        list: Per-seed results (status, seconds, per-step summaries) in seed order.
+    """
+    workflow_argv = list(workflow_argv or [])
+    os.makedirs(output_root, exist_ok=True)
+
+    with multiprocessing.Manager() as manager:
+        keys = list(rate_limiter.HOST_LIMITS) + [f"bridge:{api}" for api in BRIDGE_APIS]
+        slots = {key: manager.BoundedSemaphore(host_concurrency) for key in keys}
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(slots, 1.0 / workers)) as executor:
+            futures = {}
+            for seed in seeds:
+                output_dir = os.path.join(output_root, seed_slug(seed))
+                futures[executor.submit(_run_seed, seed, seed_steps(template, seed),
+                                        workflow_argv, output_dir)] = seed
+            for future in as_completed(futures):
+                seed = futures[future]
+                try:
+                    results[seed] = future.result()
+                except Exception as e:  # Worker process died
+                    results[seed] = {'seed': seed, 'output_dir': '', 'status': 'error',
+                                     'error': str(e), 'seconds': 0.0, 'steps': []}
+                print(f"[batch] {seed}: {results[seed]['status']} in {results[seed]['seconds']:.1f}s "
+                      f"({len(results)}/{len(seeds)})")
+
+    return [results[seed] for seed in seeds]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the workflow chain for many seed queries.")
+    parser.add_argument('seeds', help="Text file with one seed per line, or CSV with a 'seed'/'query' column")
+    parser.add_argument('--template', default=workflow_orchestrator.INPUT_FILE, help="Workflow definition CSV")
+    parser.add_argument('--output-root', default=OUTPUT_ROOT)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--host-concurrency', type=int, default=HOST_CONCURRENCY,
+                        help="Max in-flight requests per upstream across all workers")
+    args, workflow_argv = parser.parse_known_args(argv)
+    if workflow_argv[:1] == ['--']:
+        workflow_argv = workflow_argv[1:]
+
+    seeds = read_seeds(args.seeds)
+    template = workflow_orchestrator.read_input_csv(args.template)
+    print(f"--- Batch: {len(seeds)} seeds x {len(template)} steps on {args.workers} workers ---")
+
+    results = run_batch(seeds, template, args.output_root, args.workers, args.host_concurrency, workflow_argv)
+
+    print_summary(results, template)
+    summary_path = os.path.join(args.output_root, SUMMARY_FILE)
+    write_summary(results, summary_path)
+    print(f"\nSummary written to {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: /api/search response serialization and compression.
+
+Compares the default FastAPI path (jsonable_encoder + stdlib json) with
+response_encoding.dumps, and reports bytes on the wire for identity, gzip and brotli.
+Records are cycled from the sample PubMed/PatentsView step outputs in workflow_outputs/,
+so compressed sizes for large responses are optimistic (repeated records compress well).
+
+Usage:
+    python bench_response_encoding.py
+    python bench_response_encoding.py --sizes 100 1000 5000 --repeat 20
+"""
+import argparse
+import json
+import os
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+import response_encoding
+from response_encoding import dumps, compress
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), 'workflow_outputs')
+SAMPLES = {
+    'PubMed': 'step_1_PubMed_output.json',
+    'PatentsView': 'step_4_PatentsView_output.json',
+}
+
+
+def load_sample(name, size):
+    with open(os.path.join(SAMPLE_DIR, SAMPLES[name]), encoding='utf-8') as f:
+        records = json.load(f)
+    return [records[i % len(records)] for i in range(size)]
+
+
+def stdlib_dumps(content):
+    # Mirrors FastAPI's default: jsonable_encoder followed by starlette's JSONResponse.render
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def cpu_time(fn, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(arg)
+        best = min(best, time.process_time() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization and compression.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    encoder = 'orjson' if response_encoding.orjson is not None else 'json (orjson not installed)'
+    print(f"Encoder: {encoder}; brotli: {'yes' if response_encoding.brotli is not None else 'no'}\n")
+    print(f"{'source':<12}{'records':>8}{'before ms':>11}{'after ms':>10}{'identity':>12}{'gzip':>11}{'br':>11}")
+
+    for name in SAMPLES:
+        for size in args.sizes:
+            content = {"results": load_sample(name, size), "total": size}
+            before_ms = cpu_time(stdlib_dumps, content, args.repeat)
+            after_ms = cpu_time(dumps, content, args.repeat)
+
+            body = dumps(content)
+            gzip_size = len(compress(body, 'gzip'))
+            br_size = len(compress(body, 'br')) if response_encoding.brotli is not None else None
+
+            print(
+                f"{name:<12}{size:>8}{before_ms:>11.2f}{after_ms:>10.2f}"
+                f"{len(body):>12,}{gzip_size:>11,}{(f'{br_size:,}' if br_size else '-'):>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
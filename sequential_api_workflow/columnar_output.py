@@ -0,0 +1,178 @@
+"""
+Columnar Step Output
+Reads and writes workflow step results as JSON+CSV, Parquet or Arrow IPC files.
+
+Parquet and Arrow files are typed and compressed; list fields (inventors, species, ...)
+are stored as list columns. Columns Arrow can't type (mixed scalars, ragged nesting) are
+stored as JSON text tagged in the field metadata and decoded again on load, so a columnar
+round trip returns the same values as the JSON output. Both formats are memory-mapped on
+reload and come back as a ResultTable built from the Arrow columns.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Union
+
+from json_to_csv import convert_json_to_csv
+from profiling import phase
+from result_table import ResultTable, jsonable
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+OUTPUT_FORMATS = ('json', 'parquet', 'arrow')
+FORMAT_EXTENSIONS = {'json': '.json', 'parquet': '.parquet', 'arrow': '.arrow'}
+PARQUET_COMPRESSION = 'zstd'
+ARROW_COMPRESSION = 'lz4'
+JSON_FIELD_METADATA = {b'encoding': b'json'}  # Tags columns stored as JSON text
+
+
+def _require_pyarrow(output_format):
+    if pa is None:
+        raise RuntimeError(f"Output format '{output_format}' requires pyarrow (pip install pyarrow)")
+
+
+def _has_struct(data_type) -> bool:
+    if pa.types.is_struct(data_type):
+        return True
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return _has_struct(data_type.value_type)
+    return False
+
+
+def _column(name: str, values: List[Any]):
+    """
+    Typed Arrow field and array for one column. Mixed-type columns, and dicts whose keys
+    differ between rows (a struct would add the missing keys as nulls), fall back to JSON
+    text with JSON_FIELD_METADATA, so load_step_output can decode them unchanged.
+    """
+    try:
+        array = pa.array(values)
+        if not _has_struct(array.type) or array.to_pylist() == values:
+            return pa.field(name, array.type), array
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        pass
+    array = pa.array([None if v is None else json.dumps(v, default=str) for v in values], type=pa.string())
+    return pa.field(name, pa.string(), metadata=JSON_FIELD_METADATA), array
+
+
+def _table(columns: Dict[str, List[Any]]) -> "pa.Table":
+    fields, arrays = zip(*(_column(name, values) for name, values in columns.items())) if columns else ((), ())
+    return pa.Table.from_arrays(list(arrays), schema=pa.schema(list(fields)))
+
+
+def records_to_table(records: List[Dict[str, Any]]) -> "pa.Table":
+    """
+    Convert a list of result dictionaries (or a ResultTable) to an Arrow table.
+
+    Columns keep first-seen key order; rows missing a key get nulls.
+    """
+    _require_pyarrow('arrow')
+    if isinstance(records, ResultTable):
+        return _table({col: records.column(col) for col in records.names})
+    columns = list(dict.fromkeys(k for record in records for k in record.keys()))
+    return _table({col: [record.get(col) for record in records] for col in columns})
+
+
+def write_json(records: List[Dict[str, Any]], f):
+    """
+    Write records as an indented JSON array.
+
+    A ResultTable is written a chunk of rows at a time, so only RECORD_CHUNK rows
+    exist as dictionaries at once.
+    """
+    if not isinstance(records, ResultTable) or not records:
+        json.dump(records, f, indent=2, default=jsonable)
+        return
+    f.write('[')
+    for i, chunk in enumerate(records.iter_record_chunks()):
+        # Strip the chunk's own "[" and "\n]" so the pieces join into one array
+        f.write(('' if i == 0 else ',') + json.dumps(chunk, indent=2, default=jsonable)[1:-2])
+    f.write('\n]')
+
+
+def step_output_path(output_dir: str, step_name: str, output_format: str) -> str:
+    """Path of a step's primary output file, e.g. workflow_outputs/step_1_PubMed_output.parquet"""
+    return os.path.join(output_dir, f"{step_name}_output{FORMAT_EXTENSIONS[output_format]}")
+
+
+def save_step_output(records: List[Dict[str, Any]], output_dir: str, step_name: str,
+                     output_format: str = 'json') -> str:
+    """
+    Write a step's results in the requested format.
+
+    Args:
+        records: List of result dictionaries or a ResultTable.
+        output_dir: Directory to write into.
+        step_name: File stem prefix, e.g. "step_1_PubMed".
+        output_format: "json" (pretty JSON plus CSV), "parquet" or "arrow".
+    Returns:
+        str: Path of the primary output file.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}'. Choose from {', '.join(OUTPUT_FORMATS)}")
+
+    path = step_output_path(output_dir, step_name, output_format)
+
+    if output_format == 'json':
+        with phase('json_dump'), open(path, 'w', encoding='utf-8') as jf:
+            write_json(records, jf)
+        with phase('csv'):
+            convert_json_to_csv(records, os.path.join(output_dir, f"{step_name}_output.csv"))
+        return path
+
+    _require_pyarrow(output_format)
+    with phase('columnar_write'):
+        table = records_to_table(records)
+        if output_format == 'parquet':
+            pq.write_table(table, path, compression=PARQUET_COMPRESSION)
+        else:
+            with pa_ipc.new_file(path, table.schema,
+                                 options=pa_ipc.IpcWriteOptions(compression=ARROW_COMPRESSION)) as writer:
+                writer.write_table(table)
+    print(f"Successfully wrote {table.num_rows} rows to {path}")
+    return path
+
+
+def find_step_output(output_dir: str, step_name: str) -> Optional[str]:
+    """Return an existing output file for a step, preferring columnar formats."""
+    for output_format in ('arrow', 'parquet', 'json'):
+        path = step_output_path(output_dir, step_name, output_format)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_step_table(path: str) -> "pa.Table":
+    """
+    Memory-map a Parquet or Arrow step output as an Arrow table.
+    """
+    _require_pyarrow(os.path.splitext(path)[1].lstrip('.'))
+    if path.endswith('.parquet'):
+        return pq.read_table(path, memory_map=True)
+    return pa_ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def table_to_result_table(table: "pa.Table") -> ResultTable:
+    """ResultTable over an Arrow table's columns (no per-row dictionaries), decoding JSON-text columns."""
+    columns = {}
+    for field, column in zip(table.schema, table.columns):
+        values = column.to_pylist()
+        if field.metadata and field.metadata.get(b'encoding') == JSON_FIELD_METADATA[b'encoding']:
+            values = [None if v is None else json.loads(v) for v in values]
+        columns[field.name] = values
+    return ResultTable.from_columns(columns)
+
+
+def load_step_output(path: str) -> Union[List[Dict[str, Any]], ResultTable]:
+    """
+    Load a step output file back: a list of dictionaries from JSON, a ResultTable from
+    Parquet or Arrow.
+    """
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as jf:
+            return json.load(jf)
+    return table_to_result_table(load_step_table(path))
@@ -0,0 +1,88 @@
+"""
+Deadline Budgets
+Context-local time budgets passed down from a workflow or API request to every step,
+retry loop, HTTP call and Node bridge call underneath it.
+
+A budget is an absolute monotonic deadline held in a context variable. Nested budgets
+can only shrink it. rate_limiter and resilience cap every request timeout by the time
+remaining. Code that fans out to worker threads wraps its callables with propagate()
+so the workers see the same deadline (and the rest of the caller's context, such as
+the active profiling.StepProfiler).
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import requests
+
+_deadline_at: contextvars.ContextVar = contextvars.ContextVar('deadline_at', default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when a call's deadline or the surrounding budget runs out."""
+
+
+def current() -> Optional[float]:
+    """Absolute time.monotonic() deadline of the current budget, or None."""
+    return _deadline_at.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget (may be negative), or None without a budget."""
+    deadline_at = _deadline_at.get()
+    return None if deadline_at is None else deadline_at - time.monotonic()
+
+
+def expired(margin: float = 0.0) -> bool:
+    """True when less than `margin` seconds of the current budget are left."""
+    left = remaining()
+    return left is not None and left <= margin
+
+
+def cap(timeout):
+    """
+    Limit a timeout (seconds) to the time remaining in the current budget.
+
+    Raises:
+        DeadlineExceeded: The budget is already used up.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Deadline budget exhausted")
+    if timeout is None or isinstance(timeout, tuple):
+        return left if timeout is None else tuple(min(t, left) if t else left for t in timeout)
+    return min(timeout, left)
+
+
+@contextmanager
+def at(deadline_at: Optional[float]):
+    """Run with an absolute deadline (None keeps the current budget). Never extends it."""
+    outer = _deadline_at.get()
+    if deadline_at is None or (outer is not None and outer <= deadline_at):
+        yield
+        return
+    token = _deadline_at.set(deadline_at)
+    try:
+        yield
+    finally:
+        _deadline_at.reset(token)
+
+
+@contextmanager
+def budget(seconds: Optional[float]):
+    """Run with at most `seconds` more time (None: no additional limit)."""
+    with at(None if seconds is None else time.monotonic() + seconds):
+        yield
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap fn so it runs under the caller's current deadline and context variables in another thread."""
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time: each call runs in its own copy
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
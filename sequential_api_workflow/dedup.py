@@ -0,0 +1,240 @@
+"""
+Result Deduplication
+Cross-source duplicate removal for literature and patent results.
+
+Two passes:
+  1. Exact-ID dedup via a hash index on normalized PMID/DOI/patent IDs (keyed by
+     ID type, so a PMID never matches a patent number with the same digits).
+  2. Near-duplicate detection on title + abstract using MinHash signatures and
+     LSH banding, so only records sharing a band are compared (near-linear time).
+
+From each duplicate cluster the most complete record is kept. A Deduplicator keeps
+its indexes between calls, with the IDs and signatures of every record it has seen
+(dropped duplicates included), so records already handled by an earlier workflow step
+are dropped from later steps too (the earlier record wins).
+
+LSH buckets hold at most BUCKET_CAP records. Boilerplate text (identical abstracts,
+templated titles) can put thousands of records in one bucket; past the cap, new
+records are only compared through their other bands, keeping the scan near-linear.
+"""
+import re
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from result_table import ResultTable
+
+DEFAULT_THRESHOLD = 0.9       # Estimated Jaccard similarity for near-duplicates
+NUM_PERM = 128
+BANDS = 32                    # 32 bands x 4 rows: candidate pairs from ~0.4 similarity upward
+SHINGLE_SIZE = 3              # Word n-grams
+MIN_TOKENS = 5                # Records with less text than this only get exact-ID dedup
+BUCKET_CAP = 64               # Records kept per LSH bucket (comparisons per band per record)
+
+ID_FIELDS = ('DOI/PMID', 'doi', 'pmid', 'patent_id', 'patentNumber', 'publicationNumber', 'url')
+# Namespace of each ID field's keys; 'DOI/PMID' and 'url' are told apart by their value
+ID_TYPES = {'doi': 'doi', 'pmid': 'pmid', 'patent_id': 'patent', 'patentNumber': 'patent',
+            'publicationNumber': 'patent', 'url': 'url'}
+TITLE_FIELDS = ('Title', 'title', 'patent_title', 'inventionTitle')
+ABSTRACT_FIELDS = ('Abstract', 'abstract', 'patent_abstract', 'abstractText')
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_DOI_PREFIX_RE = re.compile(r'^(https?://(dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+_PMID_PREFIX_RE = re.compile(r'^pmid:\s*', re.IGNORECASE)
+_PATENT_PREFIX_RE = re.compile(r'^us', re.IGNORECASE)
+
+
+def _first(record: Dict[str, Any], fields) -> str:
+    for field in fields:
+        value = record.get(field)
+        if value:
+            return value if isinstance(value, str) else str(value)
+    return ""
+
+
+def normalize_id(record: Dict[str, Any]) -> Optional[str]:
+    """
+    Normalized identifier for exact matching, prefixed with its type so a PMID and a
+    patent number with the same digits differ: 'https://doi.org/10.1000/X' -> 'doi:10.1000/x',
+    'PMID: 0765' -> 'pmid:765', 'US7654321' -> 'patent:7654321'.
+    """
+    field = next((f for f in ID_FIELDS if record.get(f)), None)
+    if field is None:
+        return None
+    raw = str(record[field]).strip().lower()
+    id_type = ID_TYPES.get(field)
+    if id_type in (None, 'url'):
+        if _DOI_PREFIX_RE.match(raw) or raw.startswith('10.'):
+            id_type = 'doi'
+        elif _PMID_PREFIX_RE.match(raw) or raw.isdigit():
+            id_type = 'pmid'
+        else:
+            id_type = id_type or 'id'
+    if id_type == 'doi':
+        raw = _DOI_PREFIX_RE.sub('', raw)
+    elif id_type == 'pmid':
+        raw = _PMID_PREFIX_RE.sub('', raw).lstrip('0')
+    elif id_type == 'patent':
+        raw = _PATENT_PREFIX_RE.sub('', raw).lstrip('0')
+    return f"{id_type}:{raw}" if raw else None
+
+
+def record_quality(record: Dict[str, Any]):
+    """Sort key for choosing the best record of a cluster (higher is better)."""
+    filled = sum(1 for v in record.values() if v not in (None, '', [], {}))
+    return (normalize_id(record) is not None, len(_first(record, ABSTRACT_FIELDS)), filled)
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+class Deduplicator:
+    """
+    Stateful exact-ID + MinHash/LSH deduplicator.
+
+    Args:
+        threshold: Minimum estimated Jaccard similarity to treat two records as duplicates.
+        num_perm: MinHash signature length.
+        bands: LSH bands; num_perm must be divisible by it.
+        seed: Seed for the hash family, so signatures are reproducible.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM,
+                 bands: int = BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: h(x) = (a*x + b) >> 32 with odd a, wrapping mod 2**64
+        self._a = (rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self._seen_ids = set()
+        self._signatures: List[np.ndarray] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of the text's word shingles, or None if the text is too short."""
+        tokens = _TOKEN_RE.findall(text.lower())
+        if len(tokens) < MIN_TOKENS:
+            return None
+        token_hashes = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in tokens),
+                                   dtype=np.uint64, count=len(tokens))
+        span = len(tokens) - SHINGLE_SIZE + 1
+        with np.errstate(over='ignore'):
+            # Polynomial combination of consecutive token hashes = hash of each word n-gram
+            shingles = token_hashes[:span].copy()
+            for offset in range(1, SHINGLE_SIZE):
+                shingles = shingles * _SHINGLE_MULTIPLIER + token_hashes[offset:offset + span]
+            x = np.unique(shingles)
+            hashes = (self._a[:, None] * x[None, :] + self._b[:, None]) >> np.uint64(32)
+        return hashes.min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _similar(self, a: np.ndarray, b: np.ndarray) -> bool:
+        return float(np.mean(a == b)) >= self.threshold
+
+    def deduplicate(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Remove exact and near duplicates, within the batch and against earlier batches.
+
+        Args:
+            records: List of result dictionaries or a ResultTable (PubMed, PatentsView, USPTO, ...).
+        Returns:
+            list: One record per duplicate cluster, in first-seen order (a ResultTable for a ResultTable).
+        """
+        n = len(records)
+        uf = _UnionFind(n)
+        dropped = [False] * n
+
+        # Pass 1: exact IDs
+        first_by_id = {}
+        for i, record in enumerate(records):
+            rid = normalize_id(record)
+            if rid is None:
+                continue
+            if rid in self._seen_ids:
+                dropped[i] = True
+            elif rid in first_by_id:
+                uf.union(first_by_id[rid], i)
+            else:
+                first_by_id[rid] = i
+
+        # Pass 2: MinHash/LSH near-duplicates
+        signatures = [None] * n
+        local_buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        for i, record in enumerate(records):
+            if dropped[i]:
+                continue
+            sig = self.signature(f"{_first(record, TITLE_FIELDS)} {_first(record, ABSTRACT_FIELDS)}")
+            if sig is None:
+                continue
+            signatures[i] = sig
+            compared_seen, compared = set(), set()  # Pairs sharing several bands are compared once
+            for band, key in self._band_keys(sig):
+                candidates = [j for j in self._buckets[band].get(key, ()) if j not in compared_seen]
+                compared_seen.update(candidates)
+                if any(self._similar(sig, self._signatures[j]) for j in candidates):
+                    dropped[i] = True
+                    break
+                bucket = local_buckets[band].setdefault(key, [])
+                for j in bucket:
+                    if j not in compared and uf.find(i) != uf.find(j) and self._similar(sig, signatures[j]):
+                        uf.union(i, j)
+                compared.update(bucket)
+                if len(bucket) < BUCKET_CAP:
+                    bucket.append(i)
+
+        # Keep the best record of each cluster, ordered by first appearance
+        clusters: Dict[int, List[int]] = {}
+        for i in range(n):
+            clusters.setdefault(uf.find(i), []).append(i)
+
+        kept = []
+        for root in sorted(clusters):
+            members = [i for i in clusters[root] if not dropped[i]]
+            if len(members) == len(clusters[root]):  # Else the cluster overlaps a record emitted earlier
+                kept.append(max(members, key=lambda i: record_quality(records[i])))
+            # Later batches drop copies of any member, not just of the record kept
+            for i in clusters[root]:
+                self._remember(records[i], signatures[i])
+
+        if isinstance(records, ResultTable):
+            return records.take(sorted(kept))
+        return [records[i] for i in sorted(kept)]
+
+    def _remember(self, record: Dict[str, Any], sig: Optional[np.ndarray]):
+        rid = normalize_id(record)
+        if rid is not None:
+            self._seen_ids.add(rid)
+        if sig is not None:
+            idx = len(self._signatures)
+            self._signatures.append(sig)
+            for band, key in self._band_keys(sig):
+                bucket = self._buckets[band].setdefault(key, [])
+                if len(bucket) < BUCKET_CAP:
+                    bucket.append(idx)
+
+
+def deduplicate(records: List[Dict[str, Any]], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """One-shot dedup of a list of records; see Deduplicator."""
+    return Deduplicator(threshold=threshold).deduplicate(records)
@@ -0,0 +1,228 @@
+"""
+Entity Resolution Memo
+Persistent disease name <-> ICD-11 code <-> EFO/MONDO ID <-> top genes mappings.
+
+Resolution results (icd11_client.search_icd11, opentargets_client.search_disease and
+get_disease_gene_associations) are stored in a local SQLite table with their source,
+original query and fetch time. workflow_orchestrator.execute_step consults the memo
+first and skips the upstream call entirely while an entry is fresh.
+
+Entries are chained on resolved IDs rather than on the text each step was given:
+storing ICD-11 hits also links each hit's title to its code, and a disease search whose
+query is a linked ICD-11 title is stored under that code ('icd:5A11'). Gene lists are
+keyed by the EFO/MONDO ID. resolve() follows name -> ICD-11 code -> EFO ID -> genes.
+
+Entries expire after a per-kind TTL, and entries written under another MEMO_VERSION
+(bumped whenever a client's output shape changes) are treated as missing. Mocked
+ICD-11 results and empty results are never stored.
+
+Usage:
+    python entity_memo.py show "Type 2 diabetes"
+    python entity_memo.py list
+    python entity_memo.py purge            # drop expired and old-version entries
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from result_table import jsonable
+
+MEMO_PATH = os.environ.get('ENTITY_MEMO_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.entity_memo', 'entity_memo.sqlite'))
+MEMO_VERSION = 1
+DAY = 24 * 3600
+TTL_SECONDS = {
+    'icd11': 90 * DAY,        # ICD-11 codes only change with a new linearization release
+    'efo': 30 * DAY,          # Disease name -> EFO/MONDO ID
+    'genes': 7 * DAY,         # Association scores move with each OpenTargets release
+    'link': 90 * DAY,         # ICD-11 title -> code, as for 'icd11'
+}
+MEMO_MODES = ('use', 'refresh', 'off')
+
+_NORMALIZE_RE = re.compile(r'[^0-9a-z]+')
+_TAG_RE = re.compile(r'<[^>]+>')  # ICD-API flexisearch marks matches with <em class='found'>
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mappings (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    query TEXT,
+    source TEXT,
+    version INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+"""
+
+
+def normalize_name(name: str) -> str:
+    """'Type-2  Diabetes' -> 'type 2 diabetes'"""
+    return _NORMALIZE_RE.sub(' ', _TAG_RE.sub('', name).lower()).strip()
+
+
+def genes_key(disease_id: str, limit: Optional[int], min_score: float) -> str:
+    return f"{disease_id}|k={limit}|min={min_score:g}"
+
+
+class EntityMemo:
+    """
+    SQLite-backed memo table of resolved entities.
+
+    Args:
+        path: SQLite file.
+    """
+
+    def __init__(self, path: str = MEMO_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one transaction, closed afterwards."""
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """Fresh value for (kind, key), or None when missing, expired or from another version."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM mappings WHERE kind = ? AND key = ? AND version = ? AND expires_at > ?",
+                (kind, key, MEMO_VERSION, time.time()),
+            ).fetchone()
+        return json.loads(row['value']) if row else None
+
+    def put(self, kind: str, key: str, value: Any, query: str = '', source: str = ''):
+        """Store a value; ICD-11 hits also link their titles to their codes (see link_icd11)."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO mappings (kind, key, value, query, source, version, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(value, default=jsonable), query, source, MEMO_VERSION, now, now + TTL_SECONDS[kind]),
+            )
+        if kind == 'icd11':
+            self.link_icd11(value, source)
+
+    def link_icd11(self, hits: List[Dict[str, Any]], source: str = ''):
+        """Link each ICD-11 hit's title to its code, so a later search for the title resolves to the code."""
+        for hit in hits or []:
+            if hit.get('title') and hit.get('code'):
+                self.put('link', normalize_name(hit['title']), hit['code'], hit['title'], source)
+
+    def efo_key(self, query: str) -> str:
+        """Memo key of a disease search: 'icd:<code>' for a linked ICD-11 title, else the normalized query."""
+        code = self.get('link', normalize_name(query))
+        return f"icd:{code}" if code else normalize_name(query)
+
+    def cached(self, kind: str, key: str, fetch: Callable[[], Any], query: str = '', source: str = '',
+               mode: str = 'use', cacheable: Callable[[Any], bool] = bool) -> Any:
+        """
+        Memoized fetch().
+
+        Args:
+            mode: 'use' (fresh entries skip fetch), 'refresh' (always fetch, then store) or 'off'.
+            cacheable: Predicate deciding whether a fetched value may be stored. Partial
+                       results (a dict with 'partial': True) are never stored.
+        """
+        if mode == 'off':
+            return fetch()
+        if mode == 'use':
+            value = self.get(kind, key)
+            if value is not None:
+                print(f"  -> Memo hit: {kind} '{key}' (source {source})")
+                return value
+        value = fetch()
+        if not (isinstance(value, dict) and value.get('partial')) and cacheable(value):
+            self.put(kind, key, value, query, source)
+        return value
+
+    def resolve(self, disease_name: str) -> Dict[str, Any]:
+        """
+        Everything known about a disease name, following the chain name -> ICD-11 hits ->
+        the top hit's code -> OpenTargets disease -> stored gene lists for its ID, with
+        provenance. Falls back to a disease search keyed by the name itself.
+        """
+        key = normalize_name(disease_name)
+        hits = self.get('icd11', key) or []
+        code = hits[0].get('code') if hits else None
+        efo_keys = ([f"icd:{code}"] if code else []) + [key]
+        efo = next((hit for hit in (self.get('efo', k) for k in efo_keys) if hit), None)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM mappings WHERE version = ? AND ((kind = 'icd11' AND key = ?) "
+                "OR (kind = 'link' AND key = ?) OR (kind = 'efo' AND key IN (?, ?)) OR (kind = 'genes' AND key LIKE ?)) "
+                "ORDER BY CASE kind WHEN 'icd11' THEN 0 WHEN 'link' THEN 1 WHEN 'efo' THEN 2 ELSE 3 END",
+                (MEMO_VERSION, key, normalize_name(hits[0].get('title') or '') if hits else '',
+                 efo_keys[0], key, f"{(efo or {}).get('id', '')}|%"),
+            ).fetchall()
+        return {'disease': key, 'icd11_code': code, 'efo_id': (efo or {}).get('id'),
+                'mappings': [self._describe(r) for r in rows]}
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM mappings ORDER BY kind, key").fetchall()
+        return [self._describe(r) for r in rows]
+
+    def purge(self) -> int:
+        """Delete expired and old-version entries; returns how many were removed."""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM mappings WHERE version != ? OR expires_at <= ?",
+                                (MEMO_VERSION, time.time())).rowcount
+
+    @staticmethod
+    def _describe(row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry['value'] = json.loads(entry['value'])
+        entry['fresh'] = entry['version'] == MEMO_VERSION and entry['expires_at'] > time.time()
+        for field in ('fetched_at', 'expires_at'):
+            entry[field] = datetime.fromtimestamp(entry[field], timezone.utc).isoformat()
+        return entry
+
+
+_memo = None
+_memo_lock = threading.Lock()
+
+
+def default_memo() -> EntityMemo:
+    """Process-wide EntityMemo at MEMO_PATH, created on first use."""
+    global _memo
+    with _memo_lock:
+        if _memo is None:
+            _memo = EntityMemo()
+        return _memo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the entity resolution memo.")
+    parser.add_argument('command', choices=['show', 'list', 'purge'])
+    parser.add_argument('name', nargs='?', help="Disease name (for show)")
+    parser.add_argument('--path', default=MEMO_PATH)
+    args = parser.parse_args(argv)
+
+    memo = EntityMemo(args.path)
+    if args.command == 'purge':
+        print(f"Removed {memo.purge()} entries")
+    elif args.command == 'show':
+        print(json.dumps(memo.resolve(args.name or ''), indent=2))
+    else:
+        for e in memo.entries():
+            print(f"{e['kind']:<6} {'fresh' if e['fresh'] else 'stale':<6} {e['fetched_at'][:19]}  {e['source']:<26} {e['key']}")
+
+
+if __name__ == "__main__":
+    main()
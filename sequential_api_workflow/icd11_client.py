@@ -1,11 +1,20 @@
-import requests
 import os
+import deadline
+import icd11_index
+import rate_limiter
+import resilience
 
 # Env vars would be set here
 CLIENT_ID = os.environ.get('ICD11_CLIENT_ID')
 CLIENT_SECRET = os.environ.get('ICD11_CLIENT_SECRET')
 TOKEN_ENDPOINT = 'https://icdaccessmanagement.who.int/connect/token'
 SEARCH_ENDPOINT = 'https://id.who.int/icd/entity/search'
+# 'api' (WHO ICD-API, mocked without credentials), 'local' (offline index, see icd11_index.py)
+# or 'auto' (the offline index once it has been built, else the API). Opt-in: the two
+# score matches differently, so building the index doesn't change results unless asked to.
+BACKENDS = ('api', 'local', 'auto')
+BACKEND = os.environ.get('ICD11_BACKEND', 'api')
+LOCAL_LIMIT = 10
 
 _access_token = None
 
@@ -28,23 +37,50 @@ def get_access_token():
             'client_secret': CLIENT_SECRET,
             'scope': 'icdapi_access'
         }
-        r = requests.post(TOKEN_ENDPOINT, data=data)
+        r = rate_limiter.post(TOKEN_ENDPOINT, data=data)
         r.raise_for_status()
         _access_token = r.json().get('access_token')
         return _access_token
+    except deadline.DeadlineExceeded:
+        raise  # Not a credentials problem: don't fall back to mocked data
     except Exception as e:
         print(f"ICD-11 Auth Error: {e}")
         return None
 
-def search_icd11(query):
+def resolve_backend(backend=None):
+    """
+    The backend a search will use: 'api' or 'local'.
+    Args:
+        backend (str): One of BACKENDS (default: ICD11_BACKEND env var, else 'api').
+    """
+    backend = (backend or BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ICD-11 backend '{backend}'. Choose from {', '.join(BACKENDS)}")
+    if backend == 'auto':
+        return 'local' if os.path.exists(icd11_index.INDEX_PATH) else 'api'
+    return backend
+
+def search_icd11(query, backend=None):
     """
     Search ICD-11 for a disease.
     Args:
         query (str): Disease name.
+        backend (str): 'api', 'local' or 'auto' (see resolve_backend).
     Returns:
-        list: List of results with title, code, score.
+        list: List of results with title, code, score. If the deadline budget runs out,
+              a dict with empty 'results' and 'partial': True.
     """
-    token = get_access_token()
+    if resolve_backend(backend) == 'local':
+        try:
+            return icd11_index.default_index().search(query, limit=LOCAL_LIMIT)
+        except Exception as e:
+            print(f"ICD-11 Local Index Error: {e}")
+            return []
+
+    try:
+        token = get_access_token()
+    except deadline.DeadlineExceeded as e:
+        return {'results': [], 'total': 0, 'partial': True, 'error': str(e)}
     
     # Mock Fallback if no token
     if not token:
@@ -68,7 +104,7 @@ def search_icd11(query):
             'API-Version': 'v2'
         }
         params = {'q': query, 'useFlexisearch': 'true'}
-        r = requests.get(SEARCH_ENDPOINT, headers=headers, params=params)
+        r = resilience.get(SEARCH_ENDPOINT, key='icd11.search', headers=headers, params=params)
         r.raise_for_status()
         
         data = r.json()
@@ -81,6 +117,9 @@ def search_icd11(query):
             })
         return results
 
+    except deadline.DeadlineExceeded as e:
+        print("ICD-11: deadline reached")
+        return {'results': [], 'total': 0, 'partial': True, 'error': str(e)}
     except Exception as e:
         print(f"ICD-11 Search Error: {e}")
         return []
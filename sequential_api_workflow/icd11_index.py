@@ -0,0 +1,314 @@
+"""
+Offline ICD-11 Index
+Local fuzzy and prefix search over a downloaded ICD-11 MMS linearization.
+
+Build it once from the WHO "SimpleTabulation" export of the MMS linearization
+(tab-separated .txt, .csv or .xlsx from https://icd.who.int/browse/ -> Info -> Spreadsheet
+file). Any extra synonym/index-term column ('Synonyms', 'Index terms', 'Inclusions';
+values separated by ';' or '|') is indexed too. A plain CSV with 'code' and 'title'
+columns also works.
+
+The index is a single SQLite file: entities, their searchable terms, and an inverted
+index from character trigrams to term IDs stored as packed int32 arrays. ICD11Index
+loads it into memory; a query counts shared trigrams per term over the postings of
+its trigrams with numpy and ranks the best candidates, so typos and word-order changes
+still match. Terms that start with the query get a bonus. No credentials or network
+are needed.
+
+Usage:
+    python icd11_index.py build SimpleTabulation-ICD-11-MMS-en.txt
+    python icd11_index.py search "type 2 diabets"
+    python icd11_index.py complete "diabetes mell"
+"""
+import argparse
+import bisect
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+INDEX_PATH = os.environ.get('ICD11_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.icd11_index', 'icd11_index.sqlite'))
+MIN_SCORE = 0.3          # Scores below this are not a match
+CONTAINMENT_WEIGHT = 0.7 # Share of the score from query-trigram containment; the rest is Dice similarity
+PREFIX_BONUS = 0.2       # Added when a term starts with the query
+CANDIDATES = 200         # Terms scored per query, by shared trigram count
+
+TITLE_COLUMNS = ('title',)
+CODE_COLUMNS = ('code', 'thecode')
+KIND_COLUMNS = ('classkind', 'class kind', 'kind')
+URI_COLUMNS = ('linearization (release) uri', 'linearization uri', 'browserlink', 'foundation uri', 'uri')
+SYNONYM_COLUMNS = ('synonyms', 'synonym', 'index terms', 'indexterms', 'inclusions')
+
+_NORMALIZE_RE = re.compile(r'[^0-9a-z]+')
+_DEPTH_PREFIX_RE = re.compile(r'^(?:-\s*)+')
+_SYNONYM_SPLIT_RE = re.compile(r'[;|\n]')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    title TEXT NOT NULL,
+    kind TEXT,
+    uri TEXT
+);
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    entity_id INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    norm TEXT NOT NULL,
+    grams INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS terms_norm ON terms(norm);
+CREATE TABLE IF NOT EXISTS trigrams (
+    gram TEXT PRIMARY KEY,
+    postings BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def normalize(text: str) -> str:
+    """'Type-2 Diabetes, mellitus' -> 'type 2 diabetes mellitus'"""
+    return _NORMALIZE_RE.sub(' ', (text or '').lower()).strip()
+
+
+def trigrams(norm: str) -> List[str]:
+    """Distinct trigrams of each word, padded like pg_trgm: 'cat' -> '  c', ' ca', 'cat', 'at '."""
+    grams = dict.fromkeys(
+        padded[i:i + 3]
+        for word in norm.split()
+        for padded in (f"  {word} ",)
+        for i in range(len(padded) - 2)
+    )
+    return list(grams)
+
+
+def _pick(header: Dict[str, int], names) -> Optional[int]:
+    return next((header[n] for n in names if n in header), None)
+
+
+def _rows(path: str) -> Iterator[list]:
+    if path.endswith('.xlsx'):
+        import pandas as pd
+        df = pd.read_excel(path, dtype=str).fillna('')
+        yield list(df.columns)
+        yield from df.values.tolist()
+        return
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.readline()
+        f.seek(0)
+        yield from csv.reader(f, delimiter='\t' if '\t' in sample else ',')
+
+
+def read_linearization(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read coded entities from a linearization export.
+
+    Yields:
+        dict: code, title, kind, uri and synonyms (list) for every row with a code.
+              Chapters and blocks, which have no code, are skipped.
+    """
+    rows = _rows(path)
+    header = {str(name).strip().lower(): i for i, name in enumerate(next(rows, []))}
+    code_col, title_col = _pick(header, CODE_COLUMNS), _pick(header, TITLE_COLUMNS)
+    if code_col is None or title_col is None:
+        raise ValueError(f"{path}: expected 'Code' and 'Title' columns, found {', '.join(header) or 'none'}")
+    kind_col, uri_col, synonym_col = _pick(header, KIND_COLUMNS), _pick(header, URI_COLUMNS), _pick(header, SYNONYM_COLUMNS)
+
+    def cell(row, col):
+        return str(row[col]).strip() if col is not None and col < len(row) else ''
+
+    for row in rows:
+        code = cell(row, code_col)
+        title = _DEPTH_PREFIX_RE.sub('', cell(row, title_col)).strip()
+        if not code or not title:
+            continue
+        synonyms = [s.strip() for s in _SYNONYM_SPLIT_RE.split(cell(row, synonym_col)) if s.strip()]
+        yield {'code': code, 'title': title, 'kind': cell(row, kind_col), 'uri': cell(row, uri_col),
+               'synonyms': synonyms}
+
+
+class ICD11Index:
+    """
+    Read side of the offline index. The whole index is loaded into memory on open
+    (a few MB for the full MMS), so queries run without touching SQLite.
+
+    Args:
+        path: SQLite index file (see build()).
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"ICD-11 index not found at {path} (build it with: python icd11_index.py build <export>)")
+        self.path = path
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            self._entities = conn.execute("SELECT code, title, kind, uri FROM entities ORDER BY id").fetchall()
+            terms = conn.execute("SELECT entity_id, term, norm, grams FROM terms ORDER BY id").fetchall()
+            self._postings = {gram: np.frombuffer(blob, dtype=np.int32)
+                              for gram, blob in conn.execute("SELECT gram, postings FROM trigrams")}
+            self.source = dict(conn.execute("SELECT key, value FROM meta").fetchall()).get('source', '')
+        self._term_entity = np.array([t[0] for t in terms], dtype=np.int32)
+        self._term_text = [t[1] for t in terms]
+        self._term_norm = [t[2] for t in terms]
+        self._term_grams = np.array([t[3] for t in terms], dtype=np.int32)
+        # Term IDs sorted by normalized text, for prefix lookups by bisection
+        self._by_norm = sorted(range(len(terms)), key=self._term_norm.__getitem__)
+        self._sorted_norms = [self._term_norm[i] for i in self._by_norm]
+
+    def __len__(self):
+        return len(self._entities)
+
+    def _hit(self, term_id: int, score: float) -> Dict[str, Any]:
+        code, title, kind, uri = self._entities[self._term_entity[term_id]]
+        return {'title': title, 'code': code, 'score': round(float(score), 4), 'kind': kind, 'uri': uri,
+                'matchedTerm': self._term_text[term_id], 'source': 'icd11.local'}
+
+    def search(self, query: str, limit: int = 10, min_score: float = MIN_SCORE) -> List[Dict[str, Any]]:
+        """
+        Fuzzy search: entities whose title or a synonym contains most of the query's trigrams.
+
+        The score mixes the share of query trigrams found in the term (so extra words in
+        a title cost little) with their Dice similarity (so closer-sized terms win ties).
+
+        Returns:
+            list: Dicts like icd11_client.search_icd11 results (title, code, score), plus
+                  kind, uri, the matched term and source 'icd11.local'. Best first.
+        """
+        norm = normalize(query)
+        grams = trigrams(norm)
+        arrays = [self._postings[g] for g in grams if g in self._postings]
+        if not arrays:
+            return []
+        counts = np.bincount(np.concatenate(arrays), minlength=len(self._term_text))
+        candidates = np.flatnonzero(counts)
+        if len(candidates) > CANDIDATES:
+            candidates = candidates[np.argpartition(-counts[candidates], CANDIDATES)[:CANDIDATES]]
+        shared = counts[candidates]
+        containment = shared / len(grams)
+        dice = 2.0 * shared / (len(grams) + self._term_grams[candidates])
+        scores = CONTAINMENT_WEIGHT * containment + (1 - CONTAINMENT_WEIGHT) * dice
+
+        best: Dict[int, tuple] = {}
+        for term_id, score in zip(candidates.tolist(), scores.tolist()):
+            if self._term_norm[term_id].startswith(norm):
+                score = min(1.0, score + PREFIX_BONUS)
+            if score < min_score:
+                continue
+            entity_id = int(self._term_entity[term_id])
+            if entity_id not in best or score > best[entity_id][1]:
+                best[entity_id] = (term_id, score)
+        ranked = sorted(best.values(), key=lambda item: -item[1])[:limit]
+        return [self._hit(term_id, score) for term_id, score in ranked]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Prefix search: entities with a title or synonym starting with the prefix, shortest first."""
+        norm = normalize(prefix)
+        if not norm:
+            return []
+        lo = bisect.bisect_left(self._sorted_norms, norm)
+        hi = bisect.bisect_left(self._sorted_norms, norm + '\uffff', lo)
+        matches = sorted(self._by_norm[lo:hi], key=lambda t: len(self._term_norm[t]))
+        hits, seen = [], set()
+        for term_id in matches:
+            entity_id = int(self._term_entity[term_id])
+            if entity_id not in seen:
+                seen.add(entity_id)
+                hits.append(self._hit(term_id, len(norm) / len(self._term_norm[term_id])))
+                if len(hits) >= limit:
+                    break
+        return hits
+
+
+def build(source: str, path: str = INDEX_PATH) -> int:
+    """
+    Build (or rebuild) the index from a linearization export.
+
+    Returns:
+        int: Number of coded entities indexed.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    postings = defaultdict(list)
+    entity_count = 0
+    with closing(sqlite3.connect(tmp)) as conn, conn:
+        conn.executescript(SCHEMA)
+        term_id = 0
+        for entity_id, entity in enumerate(read_linearization(source)):
+            entity_count += 1
+            conn.execute("INSERT INTO entities (id, code, title, kind, uri) VALUES (?, ?, ?, ?, ?)",
+                         (entity_id, entity['code'], entity['title'], entity['kind'], entity['uri']))
+            seen = set()
+            for term in [entity['title']] + entity['synonyms']:
+                norm = normalize(term)
+                if not norm or norm in seen:
+                    continue
+                seen.add(norm)
+                grams = trigrams(norm)
+                conn.execute("INSERT INTO terms (id, entity_id, term, norm, grams) VALUES (?, ?, ?, ?, ?)",
+                             (term_id, entity_id, term, norm, len(grams)))
+                for gram in grams:
+                    postings[gram].append(term_id)
+                term_id += 1
+        conn.executemany("INSERT INTO trigrams (gram, postings) VALUES (?, ?)",
+                         ((gram, np.array(ids, dtype=np.int32).tobytes()) for gram, ids in postings.items()))
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                         [('source', os.path.basename(source)), ('built_at', time.strftime('%Y-%m-%dT%H:%M:%S'))])
+    with closing(sqlite3.connect(tmp)) as conn:
+        conn.execute("VACUUM")
+    os.replace(tmp, path)
+    print(f"ICD-11 index: {entity_count} entities, {term_id} terms, {len(postings)} trigrams -> {path}")
+    return entity_count
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def default_index() -> ICD11Index:
+    """Process-wide ICD11Index at INDEX_PATH, opened on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ICD11Index()
+        return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ICD-11 MMS index.")
+    parser.add_argument('--index', default=INDEX_PATH, help="SQLite index path")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help="Index a linearization export (.txt/.tsv/.csv/.xlsx)")
+    build_cmd.add_argument('source')
+    for name in ('search', 'complete'):
+        cmd = sub.add_parser(name, help="Fuzzy search" if name == 'search' else "Prefix search")
+        cmd.add_argument('text')
+        cmd.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        build(args.source, args.index)
+        return
+    index = ICD11Index(args.index)
+    started = time.perf_counter()
+    hits = index.search(args.text, args.limit) if args.command == 'search' else index.complete(args.text, args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    for hit in hits:
+        print(f"[{hit['score']:.2f}] {hit['code']:<10} {hit['title']}"
+              + (f"  (via '{hit['matchedTerm']}')" if hit['matchedTerm'] != hit['title'] else ""))
+    print(f"{len(hits)} hits in {elapsed:.2f} ms" if hits else "No matches.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Incremental Refresh
+Watermark-based delta fetching for saved PatentsView and PubMed queries.
+
+Each saved query keeps a high-water mark: the latest patent_date (PatentsView) or
+PubMed entry date seen so far. A refresh only asks the upstream API for records on or
+after that mark, merges them into the query's stored result set by normalized ID, and
+advances the mark. Nightly refresh cost therefore follows the number of new
+publications, not the size of the corpus.
+
+The first refresh of a query fetches up to INITIAL_MAX_RESULTS records.
+
+Usage:
+    python incremental.py patentsview "CRISPR gene editing"
+    python incremental.py pubmed "type 2 diabetes ABCC8"
+    python incremental.py --list
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import columnar_output
+from columnar_output import save_step_output, find_step_output, load_step_output
+from dedup import normalize_id
+import patentsview_service
+import pubmed_client
+from result_table import ResultTable
+
+STORE_FORMAT = 'parquet' if columnar_output.pa is not None else 'json'
+STORE_DIR = os.environ.get('INCREMENTAL_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.incremental_store'))
+INITIAL_MAX_RESULTS = 1000
+PATENTSVIEW_PAGE_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    key TEXT PRIMARY KEY,
+    api_name TEXT NOT NULL,
+    query TEXT NOT NULL,
+    watermark TEXT,
+    records INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+"""
+
+
+def query_key(api_name: str, query: str) -> str:
+    """Stable key for a saved query; case and whitespace differences map to the same key."""
+    normalized = f"{api_name.lower().strip()}:{' '.join(query.lower().split())}"
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def fetch_patentsview(query: str, since: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Patents granted on or after `since` (all pages), or the newest INITIAL_MAX_RESULTS.
+
+    Returns:
+        (records, watermark): watermark is the latest patent date among the records.
+    Raises:
+        RuntimeError: When a page fails, so the stored watermark is not advanced.
+    """
+    records = ResultTable()
+    page = 1
+    while True:
+        result = patentsview_service.search_patents(query, page=page, size=PATENTSVIEW_PAGE_SIZE, since=since)
+        if result.get('error'):
+            raise RuntimeError(result['error'])
+        batch = result.get('results', [])
+        records.extend(batch)
+        if len(batch) < PATENTSVIEW_PAGE_SIZE or len(records) >= result.get('total', 0):
+            break
+        if since is None and len(records) >= INITIAL_MAX_RESULTS:
+            break
+        page += 1
+    return records, max(filter(None, records.column('date')), default=None)
+
+
+def fetch_pubmed(query: str, since: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    PubMed records entered on or after `since` (YYYY/MM/DD), or the first INITIAL_MAX_RESULTS.
+
+    Returns:
+        (records, watermark): watermark is the latest entry date among the records.
+    Raises:
+        RuntimeError: When the search fails, so the stored watermark is not advanced.
+    """
+    result = pubmed_client.search_pubmed(
+        query,
+        max_results=None if since else INITIAL_MAX_RESULTS,
+        date_from=since,
+        datetype='edat',
+    )
+    if result.get('error'):
+        raise RuntimeError(result['error'])
+    records = result['results']
+    return records, max(filter(None, records.column('Entry Date')), default=None)
+
+
+FETCHERS: Dict[str, Callable[[str, Optional[str]], Tuple[List[Dict[str, Any]], Optional[str]]]] = {
+    'patentsview': fetch_patentsview,
+    'pubmed': fetch_pubmed,
+}
+
+
+def merge_records(existing: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Merge new records into a stored result set by normalized ID.
+
+    New versions replace stored ones; records without an ID are appended.
+
+    Returns:
+        (merged, added): merged records (new first) and how many IDs were not stored before.
+    """
+    new_ids = set()
+    unkeyed = []
+    for record in new:
+        record_id = normalize_id(record)
+        if record_id is None:
+            unkeyed.append(record)
+        else:
+            new_ids.add(record_id)
+    stored_ids = {normalize_id(r) for r in existing}
+    kept = [r for r in existing if normalize_id(r) not in new_ids]
+    fresh = list({normalize_id(r): r for r in new if normalize_id(r) is not None}.values())
+    return fresh + unkeyed + kept, len(new_ids - stored_ids) + len(unkeyed)
+
+
+class IncrementalStore:
+    """
+    Watermarks (SQLite) plus one stored result file per saved query.
+
+    Args:
+        directory: Holds watermarks.sqlite and the per-query result files.
+    """
+
+    def __init__(self, directory: str = STORE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, 'watermarks.sqlite')
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one transaction, closed afterwards."""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def watermark(self, api_name: str, query: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT watermark FROM watermarks WHERE key = ?",
+                               (query_key(api_name, query),)).fetchone()
+        return row['watermark'] if row else None
+
+    def load(self, api_name: str, query: str) -> List[Dict[str, Any]]:
+        """Stored result set of a saved query (empty before its first refresh)."""
+        path = find_step_output(self.directory, query_key(api_name, query))
+        return load_step_output(path) if path else []
+
+    def refresh(self, api_name: str, query: str) -> Dict[str, Any]:
+        """
+        Fetch records newer than the query's watermark and merge them into its store.
+
+        Returns:
+            dict: {'results': full merged result set, 'new': records added,
+                   'fetched': records fetched, 'watermark': the new mark}.
+                  On failure the store is unchanged: 'results' is the stored set, with
+                  'partial': True and 'error' holding the message.
+        """
+        api_lower = api_name.lower().strip()
+        if api_lower not in FETCHERS:
+            raise ValueError(f"Incremental refresh is not supported for '{api_name}' (use one of {', '.join(FETCHERS)})")
+
+        key = query_key(api_lower, query)
+        since = self.watermark(api_lower, query)
+        print(f"Incremental {api_name}: '{query}' since {since or 'the beginning'}")
+        try:
+            fetched, latest = FETCHERS[api_lower](query, since)
+        except Exception as e:
+            print(f"Incremental {api_name} Error: {e}")
+            return {'results': self.load(api_lower, query), 'new': 0, 'fetched': 0,
+                    'watermark': since, 'partial': True, 'error': str(e)}
+
+        existing = self.load(api_lower, query)
+        merged, added = merge_records(existing, fetched)
+        watermark = max(filter(None, (since, latest)), default=None)
+        if fetched:
+            save_step_output(merged, self.directory, key, STORE_FORMAT)
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO watermarks (key, api_name, query, watermark, records, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "watermark = excluded.watermark, records = excluded.records, updated_at = excluded.updated_at",
+                (key, api_lower, query, watermark, len(merged), datetime.now(timezone.utc).isoformat()),
+            )
+        print(f"Incremental {api_name}: fetched {len(fetched)}, {added} new, {len(merged)} stored (watermark {watermark})")
+        return {'results': merged, 'new': added, 'fetched': len(fetched), 'watermark': watermark}
+
+    def saved_queries(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM watermarks ORDER BY api_name, query").fetchall()
+        return [dict(r) for r in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally refresh saved PatentsView / PubMed queries.")
+    parser.add_argument('api_name', nargs='?', choices=sorted(FETCHERS))
+    parser.add_argument('query', nargs='?')
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--list', action='store_true', help="Show saved queries and their watermarks")
+    args = parser.parse_args(argv)
+
+    store = IncrementalStore(args.store_dir)
+    if args.list or not args.query:
+        for q in store.saved_queries():
+            print(f"{q['api_name']:<12} {q['watermark'] or '-':<12} {q['records']:>7}  {q['query']}")
+        return
+    store.refresh(args.api_name, args.query)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Background Workflow Jobs
+Queues workflow definitions (same columns as input_apis.csv) on a bounded worker pool.
+
+Job state and per-step progress live in a local SQLite file, and each job writes its
+outputs to its own directory, so jobs survive a server restart: on startup queued jobs
+are re-queued, and jobs that were running are re-run with --resume so finished steps
+are loaded from disk instead of being fetched again.
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'job_outputs'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+MAX_PENDING_JOBS = 50
+# Network APIs a submitted job may call. Steps reading server-side files (pdf) are
+# CLI-only: over HTTP they would return the text of any PDF the server can read.
+JOB_APIS = ('pubmed', 'pubchem', 'uspto', 'patentsview', 'icd11', 'opentargets', 'reactome')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    steps TEXT NOT NULL,
+    options TEXT NOT NULL,
+    progress TEXT NOT NULL DEFAULT '[]',
+    error TEXT,
+    created_at TEXT,
+    started_at TEXT,
+    finished_at TEXT
+);
+"""
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already queued or running."""
+
+
+class InvalidJob(ValueError):
+    """Raised for workflow definitions or options the orchestrator cannot run."""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_steps_csv(text: str) -> List[Dict[str, str]]:
+    """Parse workflow steps from CSV text with the input_apis.csv columns."""
+    return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def options_to_argv(options: Dict[str, Any]) -> List[str]:
+    """
+    Turn {'output_format': 'parquet', 'dedup': True} into orchestrator CLI flags.
+    """
+    argv = []
+    for key, value in (options or {}).items():
+        flag = f"--{key.replace('_', '-')}"
+        if value is True:
+            argv.append(flag)
+        elif value not in (False, None):
+            argv.extend([flag, str(value)])
+    return argv
+
+
+class JobManager:
+    """
+    Persistent job registry plus a bounded pool of worker threads.
+
+    Args:
+        jobs_dir: Directory holding jobs.sqlite and one output directory per job.
+        workers: Jobs run concurrently.
+    """
+
+    def __init__(self, jobs_dir: str = JOBS_DIR, workers: int = JOB_WORKERS):
+        self.jobs_dir = jobs_dir
+        self.db_path = os.path.join(jobs_dir, 'jobs.sqlite')
+        os.makedirs(jobs_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one transaction, closed afterwards."""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def output_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, steps: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Validate and queue a workflow.
+
+        Returns:
+            str: The new job ID.
+        Raises:
+            InvalidJob: Empty steps, APIs outside JOB_APIS or invalid options.
+            JobQueueFull: MAX_PENDING_JOBS are already queued or running.
+        """
+        if not steps or any(not (s.get('api_name') or '').strip() for s in steps):
+            raise InvalidJob("Every step needs an api_name")
+        rejected = sorted({s['api_name'].strip() for s in steps if s['api_name'].strip().lower() not in JOB_APIS})
+        if rejected:
+            raise InvalidJob(f"Unsupported api_name for jobs: {', '.join(rejected)}. Choose from {', '.join(JOB_APIS)}")
+        options = dict(options or {})
+        options.pop('output_dir', None)
+        if options.get('profile'):
+            # Profiling measures process-wide state, and jobs run concurrently
+            raise InvalidJob("Profiling is only available from the command line")
+        import workflow_orchestrator  # Imports js_api_wrapper, which imports this module
+        try:
+            workflow_orchestrator.parse_args(options_to_argv(options))
+        except SystemExit:
+            raise InvalidJob(f"Invalid workflow options: {options}")
+
+        with self._lock, self._connect() as conn:
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+            if pending >= MAX_PENDING_JOBS:
+                raise JobQueueFull(f"{pending} jobs already pending")
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO jobs (id, status, steps, options, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(steps), json.dumps(options), _now()),
+            )
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id: str, resume: bool = False):
+        job = self.get(job_id)
+        if job is None or job['status'] not in ('queued', 'running'):
+            return
+
+        progress = {s['step']: s for s in job['progress']}
+
+        def on_step(entry):
+            progress[entry['step']] = entry
+            self._update(job_id, progress=json.dumps([progress[k] for k in sorted(progress)]))
+
+        self._update(job_id, status='running', started_at=job['started_at'] or _now())
+        argv = options_to_argv(job['options']) + ['--output-dir', self.output_dir(job_id)]
+        if resume:
+            argv.append('--resume')
+        import workflow_orchestrator  # Imports js_api_wrapper, which imports this module
+        try:
+            workflow_orchestrator.run_workflow(job['steps'], workflow_orchestrator.parse_args(argv), on_step=on_step)
+            self._update(job_id, status='completed', finished_at=_now())
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e), finished_at=_now())
+
+    def recover(self):
+        """Re-queue jobs left queued or running by a previous server process."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, status FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        for row in rows:
+            print(f"Recovering job {row['id']} ({row['status']})")
+            self._executor.submit(self._run, row['id'], row['status'] == 'running')
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ('steps', 'options', 'progress'):
+            job[field] = json.loads(job[field])
+        return job
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, status, created_at, started_at, finished_at, error FROM jobs "
+                "ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def outputs(self, job_id: str) -> List[Dict[str, Any]]:
+        """Files written by a job, with sizes."""
+        directory = self.output_dir(job_id)
+        if not os.path.isdir(directory):
+            return []
+        return [
+            {'name': name, 'bytes': os.path.getsize(os.path.join(directory, name))}
+            for name in sorted(os.listdir(directory))
+            if os.path.isfile(os.path.join(directory, name))
+        ]
+
+    def output_path(self, job_id: str, name: str) -> Optional[str]:
+        """Absolute path of one output file, or None (also for unknown jobs and paths escaping the job directory)."""
+        if name != os.path.basename(name) or self.get(job_id) is None:
+            return None
+        directory = os.path.realpath(self.output_dir(job_id))
+        path = os.path.realpath(os.path.join(directory, name))
+        if os.path.dirname(path) != directory:
+            return None
+        return path if os.path.isfile(path) else None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def job_manager() -> JobManager:
+    """Process-wide JobManager, created on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -1,12 +1,27 @@
+import asyncio
 import subprocess
 import json
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Body
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from response_encoding import FastJSONResponse, CompressionMiddleware
+import rate_limiter
+import deadline
+from profiling import phase
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Resume background jobs left queued or running by a previous server process
+    from job_queue import job_manager
+    job_manager().recover()
+    yield
+    job_manager().shutdown()
+
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -17,12 +32,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large result payloads (gzip/brotli, negotiated via Accept-Encoding)
+app.add_middleware(CompressionMiddleware)
+
 BRIDGE_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), 'bridge_script.js')
+REQUEST_DEADLINE = float(os.environ.get('REQUEST_DEADLINE', 60))  # Default /api/search budget in seconds
 
 class SearchRequest(BaseModel):
     api_name: str
     query: str
     params: Optional[Dict[str, Any]] = {}
+    deadline: Optional[float] = None  # Seconds; defaults to REQUEST_DEADLINE
 
 def call_js_api(api_name, query, **kwargs):
     """
@@ -45,17 +65,29 @@ def call_js_api(api_name, query, **kwargs):
         }
     }
 
+    if deadline.expired():
+        return {"results": [], "error": "Deadline budget exhausted", "partial": True}
+
     try:
-        # Run the node script
-        process = subprocess.Popen(
-            ['node', BRIDGE_SCRIPT_PATH],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        stdout, stderr = process.communicate(input=json.dumps(payload))
+        # Run the node script (bridge calls share the batch runner's per-API concurrency cap)
+        with rate_limiter.concurrency_slot(f"bridge:{api_name.lower()}"):
+            with phase('node_spawn'):
+                process = subprocess.Popen(
+                    ['node', BRIDGE_SCRIPT_PATH],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
+            
+            with phase('bridge_call'):
+                try:
+                    stdout, stderr = process.communicate(input=json.dumps(payload), timeout=deadline.remaining())
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.communicate()
+                    print(f"Node bridge call for {api_name} stopped at the deadline")
+                    return {"results": [], "error": "Deadline budget exhausted", "partial": True}
         
         # Always print stderr for debugging
         if stderr:
@@ -65,7 +97,8 @@ def call_js_api(api_name, query, **kwargs):
             raise Exception(f"Node script execution failed: {stderr}")
             
         try:
-            response = json.loads(stdout)
+            with phase('bridge_parse'):
+                response = json.loads(stdout)
         except json.JSONDecodeError:
             raise Exception(f"Invalid JSON from Node script: {stdout}")
 
@@ -78,37 +111,66 @@ def call_js_api(api_name, query, **kwargs):
         print(f"Error calling {api_name}: {e}")
         return {"results": [], "error": str(e)}
 
-from patentsview_service import search_patents
+import patentsview_service
 from keyword_extractor import extract_keywords
+from dedup import deduplicate, DEFAULT_THRESHOLD
+from local_index import LocalIndex
+from job_queue import job_manager, parse_steps_csv, InvalidJob, JobQueueFull
 
 class KeywordExtractionRequest(BaseModel):
     data: list
     source: str
 
+class LocalSearchRequest(BaseModel):
+    query: str
+    limit: int = 20
+    api_name: Optional[str] = None
+
+class JobRequest(BaseModel):
+    steps: Optional[List[Dict[str, Any]]] = None  # Rows with input_apis.csv columns
+    csv: Optional[str] = None                     # Or the CSV text itself
+    options: Dict[str, Any] = {}                  # workflow_orchestrator options, e.g. {"output_format": "parquet"}
+
+class DedupRequest(BaseModel):
+    data: list
+    threshold: float = DEFAULT_THRESHOLD
+
+def _search_response(result):
+    """Uniform /api/search body; 'partial' is set when the deadline cut the search short."""
+    if isinstance(result, dict) and 'results' in result:
+        body = {"results": result['results'], "total": result.get('total', len(result['results']))}
+        if result.get('partial'):
+            body["partial"] = True
+        return FastJSONResponse(body)
+    return FastJSONResponse({"results": result})
+
 @app.post("/api/search")
 async def search_endpoint(request: SearchRequest):
     try:
         kwargs = request.params
         print(f"DEBUG: Received Request - API: {request.api_name}, Query: {request.query}, Params: {kwargs}")
         
-        if request.api_name.upper() == "USPTO":
-            start_year = int(kwargs.get('start_year')) if kwargs.get('start_year') else None
-            end_year = int(kwargs.get('end_year')) if kwargs.get('end_year') else None
+        # Every upstream call below shares this request's time budget
+        with deadline.budget(request.deadline or REQUEST_DEADLINE):
+            if request.api_name.upper() == "USPTO":
+                start_year = int(kwargs.get('start_year')) if kwargs.get('start_year') else None
+                end_year = int(kwargs.get('end_year')) if kwargs.get('end_year') else None
+                
+                # A direct query: an interactive search's results and total must not depend
+                # on what else is in flight (map steps merge theirs via patentsview_planner)
+                result = await asyncio.to_thread(
+                    patentsview_service.search_patents,
+                    keywords=request.query,
+                    start_year=start_year,
+                    end_year=end_year,
+                    size=100
+                )
+                return _search_response(result)
             
-            result = search_patents(
-                keywords=request.query,
-                start_year=start_year,
-                end_year=end_year,
-                size=100
-            )
-            return {"results": result['results'], "total": result.get('total', len(result['results']))}
-        
-        results = call_js_api(request.api_name, request.query, **kwargs)
-        
-        if isinstance(results, dict) and 'results' in results:
-            return {"results": results['results'], "total": results.get('total', len(results['results']))}
+            # The Node bridge subprocess blocks: run it off the event loop (the deadline context goes along)
+            results = await asyncio.to_thread(call_js_api, request.api_name, request.query, **kwargs)
         
-        return {"results": results}
+        return _search_response(results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -116,13 +178,66 @@ async def search_endpoint(request: SearchRequest):
 async def extract_keywords_endpoint(request: KeywordExtractionRequest):
     try:
         print(f"DEBUG: Extracting keywords from {len(request.data)} items, source: {request.source}")
-        keywords_str = extract_keywords(request.data, request.source)
+        keywords_str = await asyncio.to_thread(extract_keywords, request.data, request.source)
         keywords_list = [k.strip() for k in keywords_str.split(",") if k.strip()]
         print(f"DEBUG: Extracted keywords: {keywords_list}")
         return {"keywords": keywords_list, "count": len(keywords_list)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/dedup")
+async def dedup_endpoint(request: DedupRequest):
+    try:
+        # MinHash signatures are CPU-bound: keep other requests served meanwhile
+        results = await asyncio.to_thread(deduplicate, request.data, request.threshold)
+        print(f"DEBUG: Dedup {len(request.data)} -> {len(results)} items")
+        return FastJSONResponse({"results": results, "total": len(results), "removed": len(request.data) - len(results)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/local-search")
+async def local_search_endpoint(request: LocalSearchRequest):
+    try:
+        hits = await asyncio.to_thread(
+            lambda: LocalIndex().search(request.query, limit=request.limit, api_name=request.api_name))
+        return FastJSONResponse({"results": hits, "total": len(hits)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/jobs", status_code=202)
+async def create_job_endpoint(request: JobRequest):
+    steps = request.steps if request.steps is not None else parse_steps_csv(request.csv or "")
+    steps = [{k: ("" if v is None else str(v)) for k, v in step.items()} for step in steps]
+    try:
+        job_id = await asyncio.to_thread(job_manager().submit, steps, request.options)
+    except InvalidJob as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}
+
+@app.get("/api/jobs")
+async def list_jobs_endpoint(limit: int = 50):
+    return {"jobs": await asyncio.to_thread(job_manager().list, limit)}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_endpoint(job_id: str):
+    job = await asyncio.to_thread(job_manager().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job['status'] == 'completed':
+        job['outputs'] = [
+            {**f, 'url': f"/api/jobs/{job_id}/outputs/{f['name']}"} for f in await asyncio.to_thread(job_manager().outputs, job_id)
+        ]
+    return job
+
+@app.get("/api/jobs/{job_id}/outputs/{name}")
+async def get_job_output_endpoint(job_id: str, name: str):
+    path = await asyncio.to_thread(job_manager().output_path, job_id, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Output {name} not found for job {job_id}")
+    return FileResponse(path, filename=name)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -2,30 +2,58 @@ import csv
 import json
 import os
 
+from result_table import ResultTable
+
 def convert_json_to_csv(data, output_file):
     """
     Converts a list of dictionaries (JSON data) to a CSV file.
     
     Args:
-        data (list): List of dictionaries.
+        data (list): List of dictionaries, or a ResultTable (written column by column).
         output_file (str): Path to the output CSV file.
     """
     if not data:
         print(f"No data to write to {output_file}")
         return
 
-    # Collect all unique keys for headers
-    headers = set()
-    for item in data:
-        headers.update(item.keys())
-    
-    headers = sorted(list(headers))
+    if isinstance(data, ResultTable):
+        headers = sorted(data.names)
+    else:
+        # Collect all unique keys for headers
+        headers = set()
+        for item in data:
+            headers.update(item.keys())
+        headers = sorted(list(headers))
     
     try:
         with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(data)
+            if isinstance(data, ResultTable):
+                writer = csv.writer(f)
+                writer.writerow(headers)
+                writer.writerows(zip(*(data.column(h) for h in headers)))
+            else:
+                writer = csv.DictWriter(f, fieldnames=headers)
+                writer.writeheader()
+                writer.writerows(data)
         print(f"Successfully converted to {output_file}")
     except Exception as e:
         print(f"Error converting to CSV: {e}")
+
+def convert_step_output_to_csv(input_file, output_file):
+    """
+    Exports a saved step output (JSON, Parquet or Arrow) to CSV.
+    Columnar files are memory-mapped rather than parsed as JSON text.
+    
+    Args:
+        input_file (str): Path to the step output file.
+        output_file (str): Path to the output CSV file.
+    """
+    from columnar_output import load_step_output
+    convert_json_to_csv(load_step_output(input_file), output_file)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("Usage: python json_to_csv.py <step_output.(json|parquet|arrow)> <output.csv>")
+        sys.exit(1)
+    convert_step_output_to_csv(sys.argv[1], sys.argv[2])
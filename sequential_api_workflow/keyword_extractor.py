@@ -1,12 +1,51 @@
 import re
 from collections import Counter
 
+from result_table import ResultTable
+
+TITLE_FIELDS = ('Title', 'title', 'patent_title', 'Molecule Name')
+ABSTRACT_FIELDS = ('Abstract', 'abstract', 'patent_abstract')
+
+def _first_values(data_list, fields):
+    """
+    Per record, the first non-empty value among `fields` ("" if none).
+    A ResultTable is read column by column instead of record by record.
+    """
+    if isinstance(data_list, ResultTable):
+        columns = [data_list.column(f) for f in fields if f in data_list]
+        if not columns:
+            return [""] * len(data_list)
+        return [next((v for v in values if v), "") for values in zip(*columns)]
+    return [next((item.get(f) for f in fields if item.get(f)), "") for item in data_list]
+
+def keywords_ready(data_list, source_api):
+    """
+    True when extract_keywords(data_list, source_api) is final: appending more records
+    (results arrive best-first) cannot change it. This holds for the first ICD-11 hit,
+    the first OpenTargets disease ID and the top 5 genes or pathways. Keywords drawn
+    from text (PubMed, patents, PDFs) need the complete result set.
+    """
+    if not data_list:
+        return False
+
+    source = source_api.lower().strip()
+    if source == 'icd11':
+        return True
+    if source == 'opentargets':
+        first_item = data_list[0]
+        if 'id' in first_item and str(first_item['id']).startswith(('EFO_', 'MONDO_', 'Orphanet_')):
+            return True
+        return 'symbol' in first_item and len(data_list) >= 5
+    if source == 'reactome':
+        return len(data_list) >= 5
+    return False
+
 def extract_keywords(data_list, source_api):
     """
     Extracts potential keywords for the next step from the output of the current step.
     
     Args:
-        data_list (list): List of result dictionaries from the API.
+        data_list (list): List of result dictionaries (or a ResultTable) from the API.
         source_api (str): The API that generated these results.
         
     Returns:
@@ -52,11 +91,8 @@ def extract_keywords(data_list, source_api):
         return ", ".join(pathways)
 
     # --- Default Text Extraction (PubMed, Patents) ---
-    text_content = []
-    for item in data_list:
-        title = item.get('Title') or item.get('title') or item.get('patent_title') or item.get('Molecule Name') or ""
-        abstract = item.get('Abstract') or item.get('abstract') or item.get('patent_abstract') or ""
-        text_content.append(f"{title} {abstract}")
+    text_content = [f"{title} {abstract}" for title, abstract in
+                    zip(_first_values(data_list, TITLE_FIELDS), _first_values(data_list, ABSTRACT_FIELDS))]
 
     full_text = " ".join(text_content).lower()
     words = re.findall(r'\b[a-z]{4,}\b', full_text)
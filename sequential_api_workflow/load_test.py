@@ -0,0 +1,237 @@
+"""
+Load test: js_api_wrapper.app under a realistic request mix.
+
+Sends an open-loop (Poisson arrival) mix of /api/search (per API) and
+/api/extract-keywords requests at a target rate and reports throughput, error rate and
+p50/p95/p99 latency per request type. By default the app is started in-process on a
+free port with the Node bridge and PatentsView stubbed: they sleep for a simulated
+upstream latency and return records cycled from the sample step outputs in
+workflow_outputs/. Use --url to target a running server instead (nothing is stubbed).
+
+Results are saved as JSON so runs can be compared across changes.
+
+Usage:
+    python load_test.py --rate 50 --duration 30
+    python load_test.py --rate 200 --mix pubmed=5,uspto=2,extract-keywords=1 --upstream-ms 80
+    python load_test.py --url http://localhost:8000 --rate 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+import js_api_wrapper
+import patentsview_service
+from bench_response_encoding import load_sample
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load_test_results')
+DEFAULT_MIX = 'pubmed=4,pubchem=1,uspto=2,patentsview=1,extract-keywords=2'
+DEFAULT_RATE = 20.0           # Requests per second
+DEFAULT_DURATION = 20.0       # Seconds
+DEFAULT_UPSTREAM_MS = 150.0   # Median simulated upstream latency
+DEFAULT_RECORDS = 100         # Records per stubbed search response
+MAX_IN_FLIGHT = 1000
+QUERIES = ['type 2 diabetes', 'ABCC8', 'insulin resistance', 'CRISPR gene editing', 'KRAS inhibitor',
+           'breast cancer', 'metformin', 'GLP-1 receptor agonist']
+
+
+def parse_mix(text):
+    """'pubmed=4,extract-keywords=1' -> {'pubmed': 4.0, 'extract-keywords': 1.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip().lower()] = float(weight or 1)
+    return mix
+
+
+def install_stubs(upstream_ms, records):
+    """Replace the Node bridge and PatentsView client with local fakes of similar latency."""
+    samples = {
+        'PubMed': load_sample('PubMed', records),
+        'PatentsView': load_sample('PatentsView', records),
+    }
+
+    def upstream_delay():
+        # Log-normal latency with the requested median and a realistic right tail
+        time.sleep(random.lognormvariate(0, 0.5) * upstream_ms / 1000)
+
+    def fake_call_js_api(api_name, query, **kwargs):
+        upstream_delay()
+        source = samples['PatentsView'] if api_name.lower() in ('uspto', 'patentsview') else samples['PubMed']
+        return {'results': source, 'total': len(source)}
+
+    def fake_search_patents(keywords, start_year=None, end_year=None, page=1, size=100, since=None, extra_fields=None):
+        upstream_delay()
+        return {'results': samples['PatentsView'][:size], 'total': len(samples['PatentsView'])}
+
+    js_api_wrapper.call_js_api = fake_call_js_api
+    patentsview_service.search_patents = fake_search_patents
+    return samples
+
+
+def start_server():
+    """Serve the app in a background thread on a free local port; returns its base URL."""
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    # Lifespan off: the load test must not recover or run background jobs
+    server = uvicorn.Server(uvicorn.Config(js_api_wrapper.app, host='127.0.0.1', port=port,
+                                           log_level='warning', access_log=False, lifespan='off'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def build_request(kind, keyword_data):
+    """(path, JSON body) for one request of the given kind."""
+    if kind == 'extract-keywords':
+        source = random.choice(list(keyword_data))
+        return '/api/extract-keywords', {'data': keyword_data[source], 'source': source}
+    api_name = {'uspto': 'USPTO', 'patentsview': 'PatentsView', 'pubmed': 'PubMed', 'pubchem': 'PubChem'}.get(kind, kind)
+    return '/api/search', {'api_name': api_name, 'query': random.choice(QUERIES), 'params': {}}
+
+
+async def run_load(base_url, mix, rate, duration, keyword_data, timeout):
+    """
+    Open-loop load: request start times follow a Poisson process at `rate`, independent
+    of how quickly responses come back (so server slowdowns show up as latency).
+
+    Returns:
+        list: (kind, latency seconds, status code or None, start offset) per request.
+    """
+    kinds, weights = list(mix), list(mix.values())
+    samples = []
+    in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+    limits = httpx.Limits(max_connections=MAX_IN_FLIGHT, max_keepalive_connections=MAX_IN_FLIGHT)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def one(kind, offset):
+            path, body = build_request(kind, keyword_data)
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            finally:
+                in_flight.release()
+            samples.append((kind, time.perf_counter() - started, status, offset))
+
+        tasks = []
+        t0 = time.perf_counter()
+        next_at = 0.0
+        while next_at < duration:
+            delay = t0 + next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            tasks.append(asyncio.create_task(one(random.choices(kinds, weights)[0], next_at)))
+            next_at += random.expovariate(rate)
+        await asyncio.gather(*tasks)
+    return samples
+
+
+def summarize(samples, wall):
+    """Per-kind and overall throughput, error rate and latency percentiles (ms)."""
+    groups = defaultdict(list)
+    for sample in samples:
+        groups[sample[0]].append(sample)
+        groups['all'].append(sample)
+
+    report = {}
+    for kind, group in groups.items():
+        latencies = np.array([s[1] for s in group]) * 1000
+        errors = sum(1 for s in group if s[2] is None or s[2] >= 400)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        report[kind] = {
+            'requests': len(group),
+            'errors': errors,
+            'error_rate': errors / len(group),
+            'throughput_rps': (len(group) - errors) / wall,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'max_ms': float(latencies.max()),
+        }
+    return report
+
+
+def print_report(report, wall):
+    print(f"\nCompleted in {wall:.1f}s")
+    print(f"  {'request':<18}{'count':>7}{'err %':>7}{'ok/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for kind in sorted(report, key=lambda k: (k == 'all', k)):
+        r = report[kind]
+        print(f"  {kind:<18}{r['requests']:>7}{100 * r['error_rate']:>7.1f}{r['throughput_rps']:>8.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the FastAPI wrapper.")
+    parser.add_argument('--url', help="Target a running server instead of an in-process one with stubbed upstreams")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Target requests per second")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="Seconds of load")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Weighted request mix, e.g. pubmed=4,extract-keywords=1")
+    parser.add_argument('--upstream-ms', type=float, default=DEFAULT_UPSTREAM_MS, help="Median stubbed upstream latency")
+    parser.add_argument('--records', type=int, default=DEFAULT_RECORDS, help="Records per stubbed search response")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, help="Random seed for a repeatable request sequence")
+    parser.add_argument('--output', help="Result JSON path (default: load_test_results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    if httpx is None:
+        raise SystemExit("load_test.py requires httpx (pip install httpx)")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    mix = parse_mix(args.mix)
+    samples = install_stubs(args.upstream_ms, args.records) if not args.url else {
+        'PubMed': load_sample('PubMed', args.records),
+        'PatentsView': load_sample('PatentsView', args.records),
+    }
+    keyword_data = {'pubmed': samples['PubMed'], 'patentsview': samples['PatentsView']}
+    base_url = args.url or start_server()
+
+    print(f"Load test: {args.rate:g} req/s for {args.duration:g}s against {base_url}")
+    print(f"  mix: {', '.join(f'{k}={v:g}' for k, v in mix.items())}"
+          + ("" if args.url else f"; stubbed upstream median {args.upstream_ms:g} ms"))
+    started = time.perf_counter()
+    results = asyncio.run(run_load(base_url, mix, args.rate, args.duration, keyword_data, args.timeout))
+    wall = time.perf_counter() - started
+
+    report = summarize(results, wall)
+    print_report(report, wall)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'config': {
+                'url': args.url, 'stubbed': not args.url, 'rate': args.rate, 'duration': args.duration,
+                'mix': mix, 'upstream_ms': args.upstream_ms, 'records': args.records, 'seed': args.seed,
+            },
+            'wall_seconds': wall,
+            'results': report,
+        }, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
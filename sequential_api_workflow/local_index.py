@@ -0,0 +1,308 @@
+"""
+Local Full-Text Index
+SQLite FTS5 index over accumulated workflow outputs and exported spreadsheets.
+
+Step outputs (JSON/Parquet/Arrow) and .xlsx/.csv exports are ingested incrementally:
+files whose size and modification time are unchanged are skipped. Searches are ranked
+with BM25 and return each hit's source step and fetch date, with no network round-trip.
+
+Usage:
+    python local_index.py ingest                      # index workflow_outputs/
+    python local_index.py ingest exports/*.xlsx       # index specific files or directories
+    python local_index.py query "insulin resistance" --limit 10
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from columnar_output import load_step_output
+from dedup import TITLE_FIELDS, ABSTRACT_FIELDS, normalize_id
+
+INDEX_PATH = os.environ.get('LOCAL_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.local_index', 'local_index.sqlite'))
+DEFAULT_SOURCE_DIR = os.path.join(os.path.dirname(__file__), 'workflow_outputs')
+INDEXABLE_EXTENSIONS = ('.json', '.parquet', '.arrow', '.xlsx', '.csv')
+SPREADSHEET_EXTENSIONS = ('.xlsx', '.csv')
+# BM25 column weights: title, abstract, other text fields
+BM25_WEIGHTS = (10.0, 1.0, 2.0)
+# Version of the doc_key scheme; indexes built with an older one are cleared and re-ingested
+KEY_VERSION = 1
+
+_STEP_FILE_RE = re.compile(r'^(step_\d+_(?P<api>.+?))_output\.\w+$')
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    doc_key TEXT UNIQUE NOT NULL,
+    title TEXT,
+    abstract TEXT,
+    extra TEXT,
+    api_name TEXT,
+    source_step TEXT,
+    source_file TEXT,
+    fetched_at TEXT,
+    record TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, abstract, extra,
+    content='documents', content_rowid='id',
+    tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, title, abstract, extra) VALUES (new.id, new.title, new.abstract, new.extra);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, title, abstract, extra) VALUES ('delete', old.id, old.title, old.abstract, old.extra);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, title, abstract, extra) VALUES ('delete', old.id, old.title, old.abstract, old.extra);
+    INSERT INTO documents_fts(rowid, title, abstract, extra) VALUES (new.id, new.title, new.abstract, new.extra);
+END;
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    records INTEGER,
+    ingested_at TEXT
+);
+"""
+
+
+def _text(record: Dict[str, Any], fields) -> str:
+    for field in fields:
+        value = record.get(field)
+        if value:
+            return str(value)
+    return ""
+
+
+def _extra_text(record: Dict[str, Any]) -> str:
+    """All other short text fields (authors, MeSH terms, symbols, names...)."""
+    skip = set(TITLE_FIELDS) | set(ABSTRACT_FIELDS)
+    parts = []
+    for key, value in record.items():
+        if key in skip or value in (None, ''):
+            continue
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(v) for v in value if v)
+        elif isinstance(value, str):
+            parts.append(value)
+    return " ".join(parts)
+
+
+def _doc_key(record: Dict[str, Any]) -> str:
+    """Type-prefixed ID (see dedup.normalize_id), else a hash of the whole record."""
+    rid = normalize_id(record)
+    if rid:
+        return rid
+    digest = hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"sha1:{digest}"
+
+
+def _load_records(path: str) -> List[Dict[str, Any]]:
+    if path.endswith(('.json', '.parquet', '.arrow')):
+        return load_step_output(path)
+    import pandas as pd
+    df = pd.read_excel(path) if path.endswith('.xlsx') else pd.read_csv(path)
+    return df.where(df.notna(), None).to_dict(orient='records')
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching all of its words."""
+    return " ".join(f'"{token}"' for token in _TOKEN_RE.findall(text))
+
+
+class LocalIndex:
+    """
+    Incremental FTS5 index stored in a single SQLite file.
+
+    Args:
+        path: SQLite database path (created on first use).
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < KEY_VERSION:
+                # Keys without an ID type could merge a PMID and a patent: rebuild on the next ingest
+                conn.execute("DELETE FROM documents")
+                conn.execute("DELETE FROM ingested_files")
+                conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one transaction, closed afterwards."""
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ingest_records(self, records: List[Dict[str, Any]], source_file: str, api_name: str = '',
+                       source_step: str = '', fetched_at: Optional[str] = None) -> int:
+        """
+        Upsert records (dictionaries or ResultTable rows); a document seen again takes
+        the latest source and fetch date.
+        """
+        fetched_at = fetched_at or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        records = [dict(r) for r in records if r]
+        rows = [(
+            _doc_key(r),
+            _text(r, TITLE_FIELDS) or _text(r, ('name', 'symbol')),
+            _text(r, ABSTRACT_FIELDS),
+            _extra_text(r),
+            api_name, source_step, source_file, fetched_at,
+            json.dumps(r, default=str),
+        ) for r in records]
+
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT INTO documents (doc_key, title, abstract, extra, api_name, source_step, source_file, fetched_at, record)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(doc_key) DO UPDATE SET
+                    title=excluded.title, abstract=excluded.abstract, extra=excluded.extra,
+                    api_name=excluded.api_name, source_step=excluded.source_step,
+                    source_file=excluded.source_file, fetched_at=excluded.fetched_at, record=excluded.record
+            """, rows)
+        return len(rows)
+
+    def ingest_file(self, path: str, force: bool = False) -> int:
+        """
+        Index one step output or spreadsheet. Unchanged files are skipped.
+
+        Returns:
+            int: Number of records ingested (0 when skipped).
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._connect() as conn:
+            seen = conn.execute("SELECT size, mtime FROM ingested_files WHERE path = ?", (path,)).fetchone()
+        if seen and not force and seen['size'] == stat.st_size and seen['mtime'] == stat.st_mtime:
+            return 0
+
+        match = _STEP_FILE_RE.match(os.path.basename(path))
+        source_step = match.group(1) if match else os.path.splitext(os.path.basename(path))[0]
+        api_name = match.group('api') if match else ''
+        fetched_at = datetime.fromtimestamp(stat.st_mtime, timezone.utc).strftime('%Y-%m-%d')
+
+        count = self.ingest_records(_load_records(path), path, api_name, source_step, fetched_at)
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO ingested_files (path, size, mtime, records, ingested_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (path, stat.st_size, stat.st_mtime, count, datetime.now(timezone.utc).isoformat()))
+        print(f"Indexed {count} records from {path}")
+        return count
+
+    def ingest_paths(self, paths: List[str], force: bool = False) -> int:
+        """
+        Index files and directories (recursively). Inside directories only step outputs and
+        spreadsheets are picked up, not the stores kept next to them (indexes, snapshots);
+        CSVs paired with a step JSON are skipped.
+        """
+        files = []
+        for p in paths:
+            if os.path.isdir(p):
+                for root, _, names in os.walk(p):
+                    files.extend(os.path.join(root, n) for n in sorted(names)
+                                 if _STEP_FILE_RE.match(n) or n.endswith(SPREADSHEET_EXTENSIONS))
+            else:
+                files.append(p)
+
+        total = 0
+        for f in files:
+            if not f.endswith(INDEXABLE_EXTENSIONS):
+                continue
+            if f.endswith('.csv') and _STEP_FILE_RE.match(os.path.basename(f)) \
+                    and os.path.exists(f[:-4] + '.json'):
+                continue  # Same records as the step's JSON output
+            try:
+                total += self.ingest_file(f, force=force)
+            except Exception as e:
+                print(f"Skipping {f}: {e}")
+        return total
+
+    def search(self, query: str, limit: int = 20, api_name: Optional[str] = None,
+               raw: bool = False) -> List[Dict[str, Any]]:
+        """
+        BM25-ranked full-text search.
+
+        Args:
+            query: Free text (all words must match) or, with raw=True, FTS5 query syntax.
+            limit: Maximum number of hits.
+            api_name: Optional filter on the source API (e.g. "PubMed").
+            raw: Pass the query to FTS5 unchanged.
+        Returns:
+            list: Hits with title, snippet, score, api_name, source_step, fetched_at and the record.
+        """
+        match = query if raw else fts_query(query)
+        if not match:
+            return []
+
+        sql = f"""
+            SELECT d.title, d.api_name, d.source_step, d.source_file, d.fetched_at, d.record,
+                   snippet(documents_fts, -1, '[', ']', '...', 16) AS snippet,
+                   bm25(documents_fts, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score
+            FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+            WHERE documents_fts MATCH ?
+        """
+        params: List[Any] = [match]
+        if api_name:
+            sql += " AND lower(d.api_name) = lower(?)"
+            params.append(api_name)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [{
+            'title': row['title'],
+            'snippet': row['snippet'],
+            'score': round(-row['score'], 4),
+            'api_name': row['api_name'],
+            'source_step': row['source_step'],
+            'source_file': row['source_file'],
+            'fetched_at': row['fetched_at'],
+            'record': json.loads(row['record']),
+        } for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local full-text index over workflow outputs.")
+    parser.add_argument('--index', default=INDEX_PATH, help="SQLite index path")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help="Index step outputs and spreadsheets")
+    ingest.add_argument('paths', nargs='*', default=[DEFAULT_SOURCE_DIR])
+    ingest.add_argument('--force', action='store_true', help="Re-index unchanged files")
+
+    query = sub.add_parser('query', help="Search the index")
+    query.add_argument('text')
+    query.add_argument('--limit', type=int, default=10)
+    query.add_argument('--api', help="Only hits from this API")
+    args = parser.parse_args(argv)
+
+    index = LocalIndex(args.index)
+    if args.command == 'ingest':
+        print(f"Ingested {index.ingest_paths(args.paths, force=args.force)} records into {args.index}")
+    else:
+        hits = index.search(args.text, limit=args.limit, api_name=args.api)
+        for i, hit in enumerate(hits, 1):
+            print(f"{i:>3}. [{hit['score']:.2f}] {hit['title']}")
+            print(f"     {hit['source_step']} (fetched {hit['fetched_at']})  {hit['snippet']}")
+        if not hits:
+            print("No matches.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,32 @@
-import requests
+import os
+
+import numpy as np
+
+import deadline
+import opentargets_snapshot
+import resilience
+from result_table import ResultTable
 
 BASE_URL = 'https://api.platform.opentargets.org/api/v4/graphql'
+# Gene associations from 'api' (Platform GraphQL), 'local' (a downloaded release imported
+# with opentargets_snapshot.py) or 'auto' (the local snapshot once imported, else the API).
+# 'auto' is opt-in: a snapshot is pinned to its release, so importing one shouldn't change
+# results unless asked to. Disease name search always uses the API.
+BACKENDS = ('api', 'local', 'auto')
+BACKEND = os.environ.get('OPENTARGETS_BACKEND', 'api')
+
+def resolve_backend(backend=None):
+    """
+    The backend an association lookup will use: 'api' or 'local'.
+    Args:
+        backend (str): One of BACKENDS (default: OPENTARGETS_BACKEND env var, else 'api').
+    """
+    backend = (backend or BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown OpenTargets backend '{backend}'. Choose from {', '.join(BACKENDS)}")
+    if backend == 'auto':
+        return 'local' if os.path.exists(os.path.join(opentargets_snapshot.SNAPSHOT_DIR, 'index.arrow')) else 'api'
+    return backend
 
 def search_disease(disease_name):
     """
@@ -9,6 +35,8 @@ def search_disease(disease_name):
         disease_name (str): Name of the disease.
     Returns:
         dict: The first hit containing id and name, or None.
+    Raises:
+        deadline.DeadlineExceeded: The deadline budget ran out before an answer.
     """
     query = """
         query Search($queryString: String!) {
@@ -22,7 +50,7 @@ def search_disease(disease_name):
     """
     
     try:
-        response = requests.post(BASE_URL, json={
+        response = resilience.post(BASE_URL, key='opentargets.search', hedge=resilience.HEDGE_REQUESTS, json={
             'query': query,
             'variables': {'queryString': disease_name}
         })
@@ -35,66 +63,145 @@ def search_disease(disease_name):
             return hits[0] # {'id': 'EFO_0000384', 'name': "Crohn's disease"}
         return None
         
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         if 'response' in locals() and response is not None:
             print(f"OpenTargets Search Error Response: {response.text}")
         print(f"OpenTargets Search Error: {e}")
         return None
 
-def get_disease_gene_associations(efo_id, limit=10):
-    """
-    Get genes associated with a disease.
-    Args:
-        efo_id (str): The EFO ID of the disease.
-        limit (int): Number of associations to return.
-    Returns:
-        list: List of dictionaries containing gene details.
-    """
-    query = """
-        query DiseaseAssociations($efoId: String!, $size: Int!) {
-            disease(efoId: $efoId) {
-                id
-                name
-                associatedTargets(page: { size: $size, index: 0 }) {
-                    rows {
-                        target {
-                            id
-                            approvedSymbol
-                            approvedName
-                        }
-                        score
+ASSOCIATION_PAGE_SIZE = 100
+# Column order of the datatype score arrays
+DATATYPES = ('genetic_association', 'somatic_mutation', 'known_drug', 'affected_pathway',
+             'literature', 'rna_expression', 'animal_model')
+
+ASSOCIATIONS_QUERY = """
+    query DiseaseAssociations($efoId: String!, $index: Int!, $size: Int!) {
+        disease(efoId: $efoId) {
+            associatedTargets(page: { index: $index, size: $size }) {
+                count
+                rows {
+                    target {
+                        id
+                        approvedSymbol
+                        approvedName
                     }
+                    score%s
                 }
             }
         }
+    }
+"""
+DATATYPE_FIELDS = """
+                    datatypeScores {
+                        id
+                        score
+                    }"""
+
+def iter_disease_gene_associations(efo_id, k=None, min_score=0.0, datatype_scores=False,
+                                   page_size=ASSOCIATION_PAGE_SIZE):
     """
+    Stream gene associations for a disease, highest overall score first.
     
-    try:
-        response = requests.post(BASE_URL, json={
+    Pages are fetched lazily; fetching stops as soon as k genes have been yielded or
+    a score drops below min_score (rows arrive sorted by score, so nothing after it qualifies).
+    
+    Args:
+        efo_id (str): The EFO/MONDO/Orphanet ID of the disease.
+        k (int): Maximum number of associations (None for no limit).
+        min_score (float): Stop at the first association scoring below this.
+        datatype_scores (bool): Also request per-datatype scores; each record then has a
+                                'datatypeScores' list aligned with DATATYPES (0.0 where absent).
+        page_size (int): Associations per GraphQL request.
+    Yields:
+        dict: geneId, symbol, name, score, diseaseId (and datatypeScores).
+    """
+    query = ASSOCIATIONS_QUERY % (DATATYPE_FIELDS if datatype_scores else "")
+    if k is not None:
+        page_size = min(page_size, k)
+    yielded = 0
+    index = 0
+    
+    while k is None or yielded < k:
+        response = resilience.post(BASE_URL, key='opentargets.associations', hedge=resilience.HEDGE_REQUESTS, json={
             'query': query,
-            'variables': {'efoId': efo_id, 'size': limit}
+            'variables': {'efoId': efo_id, 'index': index, 'size': page_size}
         })
         response.raise_for_status()
         
-        data = response.json()
-        rows = data.get('data', {}).get('disease', {}).get('associatedTargets', {}).get('rows', [])
+        associated = ((response.json().get('data') or {}).get('disease') or {}).get('associatedTargets') or {}
+        rows = associated.get('rows', [])
         
-        results = []
         for row in rows:
+            score = row.get('score') or 0.0
+            if score < min_score:
+                return
             target = row.get('target', {})
-            results.append({
+            record = {
                 'geneId': target.get('id'),
                 'symbol': target.get('approvedSymbol'),
                 'name': target.get('approvedName'),
-                'score': row.get('score'),
+                'score': score,
                 'diseaseId': efo_id # Keep context
-            })
-            
-        return results
+            }
+            if datatype_scores:
+                by_type = {d.get('id'): d.get('score') or 0.0 for d in row.get('datatypeScores') or []}
+                record['datatypeScores'] = [by_type.get(datatype, 0.0) for datatype in DATATYPES]
+            yield record
+            yielded += 1
+            if k is not None and yielded >= k:
+                return
         
+        index += 1
+        if len(rows) < page_size or index * page_size >= associated.get('count', 0):
+            return
+
+def get_disease_gene_associations(efo_id, limit=10, min_score=0.0, datatype_scores=False, backend=None):
+    """
+    Get the top genes associated with a disease.
+    Args:
+        efo_id (str): The EFO ID of the disease.
+        limit (int): Maximum number of associations to return (None for all).
+        min_score (float): Only associations scoring at least this much.
+        datatype_scores (bool): Include per-datatype score lists (see iter_disease_gene_associations).
+        backend (str): 'api', 'local' or 'auto' (see resolve_backend).
+    Returns:
+        ResultTable: One row of gene details per association. If a later page fails,
+              the associations fetched so far are returned. If the deadline budget runs
+              out, a dict with those as 'results' and 'partial': True.
+    """
+    if resolve_backend(backend) == 'local':
+        try:
+            return opentargets_snapshot.default_snapshot().associations(
+                efo_id, k=limit, min_score=min_score, datatype_scores=datatype_scores)
+        except Exception as e:
+            print(f"OpenTargets Snapshot Error: {e}")
+            return ResultTable()
+
+    results = ResultTable()
+    try:
+        for record in iter_disease_gene_associations(efo_id, k=limit, min_score=min_score,
+                                                     datatype_scores=datatype_scores):
+            results.append(record)
+    except deadline.DeadlineExceeded as e:
+        print(f"OpenTargets: deadline reached after {len(results)} associations")
+        return {'results': results, 'total': len(results), 'partial': True, 'error': str(e)}
     except Exception as e:
         print(f"OpenTargets Associations Error: {e}")
-        return []
+    return results
+
+def datatype_score_matrix(associations):
+    """
+    Datatype scores of associations fetched with datatype_scores=True as a float32 array
+    of shape (len(associations), len(DATATYPES)), for vectorized ranking.
+    """
+    if isinstance(associations, ResultTable):
+        scores = associations.column('datatypeScores')
+    else:
+        scores = [a.get('datatypeScores') for a in associations]
+    return np.array([s or [0.0] * len(DATATYPES) for s in scores],
+                    dtype=np.float32).reshape(len(associations), len(DATATYPES))
 
 if __name__ == "__main__":
     # Test
@@ -103,3 +210,5 @@ if __name__ == "__main__":
     if d:
         genes = get_disease_gene_associations(d['id'], 5)
         print(f"Top 5 Genes: {genes}")
+        strong = get_disease_gene_associations(d['id'], limit=None, min_score=0.5, datatype_scores=True)
+        print(f"{len(strong)} genes score >= 0.5; datatype score matrix {datatype_score_matrix(strong).shape}")
@@ -0,0 +1,273 @@
+"""
+OpenTargets Association Snapshot
+Local query engine over a downloaded OpenTargets Platform data release.
+
+import_release() reads these datasets of a release (Parquet, as downloaded from
+https://platform.opentargets.org/downloads):
+  - association_overall_direct: diseaseId, targetId, score
+  - targets: id, approvedSymbol, approvedName
+  - association_by_datatype_direct (optional): diseaseId, targetId, datatypeId, score
+
+It joins target symbols and names with Arrow compute kernels, sorts by disease and
+descending score (multi-threaded), and writes uncompressed Arrow IPC partitions cut at
+disease boundaries, plus an index of each disease's partition, row offset and row
+count. A query memory-maps the partition and slices the disease's rows: top-N is a
+prefix and min_score a binary search on the sorted scores, so no rows outside the
+answer are decoded. associations_many() answers many diseases on a thread pool.
+
+Results have the same shape as opentargets_client.get_disease_gene_associations.
+
+Usage:
+    python opentargets_snapshot.py import --associations release/association_overall_direct \\
+        --targets release/targets [--datatypes release/association_by_datatype_direct]
+    python opentargets_snapshot.py query EFO_0001360 --top 10 --min-score 0.3
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import opentargets_client  # DATATYPES; imports this module for its local backend
+from result_table import ResultTable
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+SNAPSHOT_DIR = os.environ.get('OPENTARGETS_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.opentargets_snapshot'))
+ROWS_PER_PARTITION = 1_000_000
+QUERY_WORKERS = os.cpu_count() or 4
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The OpenTargets snapshot requires pyarrow (pip install pyarrow)")
+
+
+def _datatype_column(datatype: str) -> str:
+    return f"dt_{datatype}"
+
+
+def _read(path: str, columns: List[str]) -> "pa.Table":
+    return ds.dataset(path, format='parquet').to_table(columns=columns)
+
+
+def import_release(associations: str, targets: str, datatypes: Optional[str] = None,
+                   directory: str = SNAPSHOT_DIR, release: str = '') -> int:
+    """
+    Build (or rebuild) the snapshot from a downloaded release.
+
+    Args:
+        associations: Parquet file or directory of association_overall_direct.
+        targets: Parquet file or directory of targets.
+        datatypes: Optional association_by_datatype_direct, for datatype_scores queries.
+        directory: Output directory.
+        release: Release label stored with the snapshot, e.g. "24.06".
+    Returns:
+        int: Number of diseases indexed.
+    """
+    _require_pyarrow()
+    started = time.perf_counter()
+    assoc = _read(associations, ['diseaseId', 'targetId', 'score'])
+    target_table = _read(targets, ['id', 'approvedSymbol', 'approvedName'])
+    positions = pc.index_in(assoc['targetId'], value_set=target_table['id'])
+    table = pa.table({
+        'diseaseId': assoc['diseaseId'],
+        'geneId': assoc['targetId'],
+        'symbol': pc.take(target_table['approvedSymbol'], positions),
+        'name': pc.take(target_table['approvedName'], positions),
+        'score': pc.cast(assoc['score'], pa.float64()),
+    })
+
+    if datatypes:
+        by_type = _read(datatypes, ['diseaseId', 'targetId', 'datatypeId', 'score'])
+        for datatype in opentargets_client.DATATYPES:
+            scores = by_type.filter(pc.equal(by_type['datatypeId'], datatype))
+            scores = pa.table({'diseaseId': scores['diseaseId'], 'geneId': scores['targetId'],
+                               _datatype_column(datatype): pc.cast(scores['score'], pa.float64())})
+            table = table.join(scores, keys=['diseaseId', 'geneId'], join_type='left outer')
+            # Datatypes without evidence for a pair score 0.0, as in the GraphQL API
+            column = _datatype_column(datatype)
+            table = table.set_column(table.schema.get_field_index(column), column,
+                                     pc.fill_null(table[column], pa.scalar(0.0, pa.float64())))
+
+    table = table.sort_by([('diseaseId', 'ascending'), ('score', 'descending')])
+
+    # Rows of a disease are contiguous after the sort: find where each run starts
+    disease_codes = pc.dictionary_encode(table['diseaseId']).combine_chunks()
+    codes = disease_codes.indices.to_numpy()
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1]).astype(np.int64)
+    counts = np.diff(np.concatenate([starts, [len(codes)]]))
+    disease_ids = disease_codes.dictionary.take(pa.array(codes[starts])).to_pylist()
+
+    # Partitions start at the first disease starting past each ROWS_PER_PARTITION boundary
+    partition = starts // ROWS_PER_PARTITION
+    _, first = np.unique(partition, return_index=True)
+    partition_starts = starts[first]
+    partition = np.searchsorted(partition_starts, starts, side='right') - 1
+
+    tmp = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    bounds = np.concatenate([partition_starts, [len(codes)]])
+    for p in range(len(partition_starts)):
+        part = table.slice(int(bounds[p]), int(bounds[p + 1] - bounds[p])).drop_columns(['diseaseId'])
+        with pa_ipc.new_file(os.path.join(tmp, f"part-{p:05d}.arrow"), part.schema) as writer:
+            writer.write_table(part)
+    index = pa.table({
+        'diseaseId': pa.array(disease_ids, type=pa.string()),
+        'partition': pa.array(partition, type=pa.int32()),
+        'offset': pa.array(starts - partition_starts[partition], type=pa.int64()),
+        'count': pa.array(counts, type=pa.int64()),
+    })
+    with pa_ipc.new_file(os.path.join(tmp, 'index.arrow'), index.schema) as writer:
+        writer.write_table(index)
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'release': release, 'datatypes': bool(datatypes), 'rows': table.num_rows,
+                   'partitions': len(partition_starts), 'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(os.path.dirname(os.path.abspath(directory)), exist_ok=True)
+    os.replace(tmp, directory)
+    print(f"OpenTargets snapshot: {len(disease_ids)} diseases, {table.num_rows} associations, "
+          f"{len(partition_starts)} partitions in {time.perf_counter() - started:.1f}s -> {directory}")
+    return len(disease_ids)
+
+
+class AssociationSnapshot:
+    """
+    Args:
+        directory: Snapshot directory written by import_release().
+    """
+
+    def __init__(self, directory: str = SNAPSHOT_DIR):
+        _require_pyarrow()
+        if not os.path.exists(os.path.join(directory, 'index.arrow')):
+            raise FileNotFoundError(f"OpenTargets snapshot not found at {directory} "
+                                    f"(build it with: python opentargets_snapshot.py import ...)")
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        index = pa_ipc.open_file(pa.memory_map(os.path.join(directory, 'index.arrow'), 'r')).read_all()
+        self._index = {
+            disease_id: (partition, offset, count)
+            for disease_id, partition, offset, count in zip(
+                index['diseaseId'].to_pylist(), index['partition'].to_pylist(),
+                index['offset'].to_pylist(), index['count'].to_pylist())
+        }
+        self._partitions: Dict[int, "pa.Table"] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, disease_id):
+        return disease_id in self._index
+
+    def _partition(self, partition: int) -> "pa.Table":
+        with self._lock:
+            table = self._partitions.get(partition)
+            if table is None:
+                path = os.path.join(self.directory, f"part-{partition:05d}.arrow")
+                table = pa_ipc.open_file(pa.memory_map(path, 'r')).read_all()  # Zero-copy over the mapping
+                self._partitions[partition] = table
+            return table
+
+    def associations(self, disease_id: str, k: Optional[int] = 10, min_score: float = 0.0,
+                     datatype_scores: bool = False) -> ResultTable:
+        """
+        Top associations of a disease, highest score first.
+
+        Args and result match opentargets_client.get_disease_gene_associations
+        (limit is k); an unknown disease gives an empty table.
+        """
+        location = self._index.get(disease_id)
+        if location is None:
+            return ResultTable()
+        if datatype_scores and not self.meta.get('datatypes'):
+            raise ValueError("This snapshot was imported without --datatypes")
+        partition, offset, count = location
+        rows = self._partition(partition).slice(offset, count)
+
+        n = count
+        if min_score > 0:
+            # Scores are descending: count those >= min_score by bisecting the negated scores
+            n = int(np.searchsorted(-rows['score'].to_numpy(), -min_score, side='right'))
+        if k is not None:
+            n = min(n, k)
+        rows = rows.slice(0, n)
+
+        columns = {
+            'geneId': rows['geneId'].to_pylist(),
+            'symbol': rows['symbol'].to_pylist(),
+            'name': rows['name'].to_pylist(),
+            'score': rows['score'].to_pylist(),
+            'diseaseId': [disease_id] * n,
+        }
+        if datatype_scores:
+            matrix = np.column_stack([rows[_datatype_column(d)].to_numpy() for d in opentargets_client.DATATYPES])
+            columns['datatypeScores'] = matrix.reshape(n, len(opentargets_client.DATATYPES)).tolist()
+        return ResultTable.from_columns(columns)
+
+    def associations_many(self, disease_ids: List[str], k: Optional[int] = 10, min_score: float = 0.0,
+                          datatype_scores: bool = False, workers: int = QUERY_WORKERS) -> Dict[str, ResultTable]:
+        """Top associations of many diseases, queried on a thread pool; disease ID -> table."""
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            tables = executor.map(lambda d: self.associations(d, k, min_score, datatype_scores), disease_ids)
+            return dict(zip(disease_ids, tables))
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def default_snapshot() -> AssociationSnapshot:
+    """Process-wide AssociationSnapshot at SNAPSHOT_DIR, opened on first use."""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = AssociationSnapshot()
+        return _snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenTargets association snapshot.")
+    parser.add_argument('--dir', default=SNAPSHOT_DIR, help="Snapshot directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+    import_cmd = sub.add_parser('import', help="Import a downloaded release (Parquet)")
+    import_cmd.add_argument('--associations', required=True, help="association_overall_direct path")
+    import_cmd.add_argument('--targets', required=True, help="targets path")
+    import_cmd.add_argument('--datatypes', help="association_by_datatype_direct path (for datatype scores)")
+    import_cmd.add_argument('--release', default='', help="Release label, e.g. 24.06")
+    query_cmd = sub.add_parser('query', help="Top associations of one or more diseases")
+    query_cmd.add_argument('disease_ids', nargs='+')
+    query_cmd.add_argument('--top', type=int, default=10)
+    query_cmd.add_argument('--min-score', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        import_release(args.associations, args.targets, args.datatypes, args.dir, args.release)
+        return
+    snapshot = AssociationSnapshot(args.dir)
+    started = time.perf_counter()
+    results = snapshot.associations_many(args.disease_ids, args.top, args.min_score)
+    elapsed = (time.perf_counter() - started) * 1000
+    for disease_id, table in results.items():
+        print(f"{disease_id}: {len(table)} genes")
+        for row in table:
+            print(f"  {row['score']:.3f}  {row['symbol'] or row['geneId']:<12} {row['name'] or ''}")
+    print(f"Answered {len(results)} diseases in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Patent Full-Text Store
+Local, compressed, content-addressed store for USPTO full-text XML.
+
+Raw XML is streamed to disk gzip-compressed under its SHA-256 (identical documents
+are stored once), and a SQLite index maps patent IDs to content hashes. Claims and
+description are extracted with a streaming lxml parser target: text is collected from
+parser events as the compressed file is read in chunks, so no element tree is built
+and memory stays bounded however large the patent is. Later exports of the same patent
+read from disk instead of downloading and parsing it again.
+
+Usage:
+    python patent_fulltext_store.py 11234567 --chars 500
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from lxml import etree
+
+import rate_limiter
+
+FULLTEXT_BASE_URL = "https://developer.uspto.gov/ibd-api/v1/patent/grant/"
+STORE_DIR = os.environ.get('FULLTEXT_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.fulltext_store'))
+CHUNK_SIZE = 1 << 16
+COMPRESS_LEVEL = 6
+SECTIONS = ('claims', 'description')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fulltext (
+    patent_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    raw_bytes INTEGER,
+    stored_bytes INTEGER,
+    url TEXT,
+    fetched_at TEXT
+);
+"""
+
+
+class _SectionTextTarget:
+    """
+    lxml parser target collecting the text nodes inside <claims> and <description>.
+
+    Text nodes are joined with single spaces, like " ".join(root.xpath("//claims//text()")).
+    """
+
+    def __init__(self):
+        self.depth = {name: 0 for name in SECTIONS}
+        self.pieces = {name: [] for name in SECTIONS}
+        self._buffer: List[str] = []
+
+    def _flush(self):
+        if self._buffer:
+            text = "".join(self._buffer)
+            for name in SECTIONS:
+                if self.depth[name]:
+                    self.pieces[name].append(text)
+            self._buffer = []
+
+    def start(self, tag, attrib):
+        self._flush()
+        name = etree.QName(tag).localname
+        if name in self.depth:
+            self.depth[name] += 1
+
+    def end(self, tag):
+        self._flush()
+        name = etree.QName(tag).localname
+        if name in self.depth:
+            self.depth[name] -= 1
+
+    def data(self, text):
+        if any(self.depth.values()):
+            self._buffer.append(text)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        self._flush()
+        return tuple(" ".join(self.pieces[name]).strip() for name in SECTIONS)
+
+
+def parse_sections(stream) -> Tuple[str, str]:
+    """
+    Stream-parse a full-text XML document.
+
+    Args:
+        stream: Binary file object (e.g. gzip.open(...)).
+    Returns:
+        (claims, description) text.
+    """
+    parser = etree.XMLParser(target=_SectionTextTarget(), resolve_entities=False,
+                             no_network=True, huge_tree=True)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        parser.feed(chunk)
+    return parser.close()
+
+
+class FullTextStore:
+    """
+    Args:
+        directory: Holds index.sqlite and the objects/ tree of gzip-compressed XML.
+    """
+
+    def __init__(self, directory: str = STORE_DIR):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self.db_path = os.path.join(directory, 'index.sqlite')
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one transaction, closed afterwards."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.directory, 'objects', sha256[:2], f"{sha256}.xml.gz")
+
+    def get(self, patent_id: str) -> Optional[str]:
+        """Path of the stored XML for a patent, or None if it has not been fetched."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT sha256 FROM fulltext WHERE patent_id = ?", (patent_id,)).fetchone()
+        if row is None:
+            return None
+        path = self.object_path(row[0])
+        return path if os.path.exists(path) else None
+
+    def fetch(self, patent_id: str, refresh: bool = False) -> Optional[str]:
+        """
+        Stored XML path for a patent, downloading it first if needed.
+
+        The response body is streamed through the hasher and compressor, never held in memory.
+
+        Returns:
+            str: Path of the gzip-compressed XML, or None when the patent has no full text.
+        """
+        if not refresh:
+            path = self.get(patent_id)
+            if path:
+                return path
+
+        url = f"{FULLTEXT_BASE_URL}{patent_id}"
+        response = rate_limiter.get(url, headers={"Accept": "application/xml"}, timeout=30, stream=True)
+        with response:
+            if response.status_code != 200:
+                return None
+            digest = hashlib.sha256()
+            raw_bytes = 0
+            tmp = os.path.join(self.directory, f".{patent_id}.{os.getpid()}.tmp")
+            with gzip.open(tmp, 'wb', compresslevel=COMPRESS_LEVEL) as out:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    raw_bytes += len(chunk)
+                    out.write(chunk)
+
+        sha256 = digest.hexdigest()
+        path = self.object_path(sha256)
+        if os.path.exists(path):
+            os.remove(tmp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fulltext (patent_id, sha256, raw_bytes, stored_bytes, url, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (patent_id, sha256, raw_bytes, os.path.getsize(path), url, datetime.now(timezone.utc).isoformat()),
+            )
+        return path
+
+    def full_text(self, patent_id: str, refresh: bool = False) -> Tuple[str, str, str]:
+        """
+        Claims and description of a patent, from the store when available.
+
+        Returns:
+            (claims, description, url); empty strings when the patent has no full text.
+        """
+        url = f"{FULLTEXT_BASE_URL}{patent_id}"
+        path = self.fetch(patent_id, refresh=refresh)
+        if path is None:
+            return "", "", url
+        with gzip.open(path, 'rb') as stream:
+            claims, description = parse_sections(stream)
+        return claims, description, url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch (or read from the local store) a patent's full text.")
+    parser.add_argument('patent_id')
+    parser.add_argument('--refresh', action='store_true', help="Download again even if stored")
+    parser.add_argument('--chars', type=int, default=300, help="Characters of each section to print")
+    args = parser.parse_args(argv)
+
+    claims, description, url = FullTextStore().full_text(args.patent_id, refresh=args.refresh)
+    print(f"{url}\n\nClaims ({len(claims)} chars):\n{claims[:args.chars]}\n\n"
+          f"Description ({len(description)} chars):\n{description[:args.chars]}")
+
+
+if __name__ == "__main__":
+    main()
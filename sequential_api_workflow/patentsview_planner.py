@@ -0,0 +1,156 @@
+"""
+PatentsView Query Planner
+Merges related keyword searches over the same date window into one upstream query.
+
+`_text_any` already ORs the words of a keyword string, so several keyword sets can be
+searched at once with the union of their words (and the union of requested fields).
+Each returned patent is then assigned back to every keyword set sharing a word stem
+with its title, abstract, or assignee, so "inhibitors" still counts for a set searching
+"inhibitor" as it does upstream. No set is re-queried on its own: a merge costs at most
+MAX_MERGED_PAGES requests however many sets it answers. Stemming here is a light
+suffix stripper, not PatentsView's analyzer, and only the first assignee is returned,
+so a patent the upstream index matched through other forms or assignees can go
+unassigned (counted in the log).
+"""
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import patentsview_service
+
+MAX_MERGED_SETS = 20          # Keyword sets per merged query
+MAX_MERGED_PAGES = 10         # Pages of 100 per merged query; a rare keyword set next to a common one may get fewer results
+PAGE_SIZE = 100
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+# (suffix, replacement), longest first; applied once per word
+_SUFFIXES = (('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'), ('iveness', 'ive'),
+             ('ations', 'ate'), ('ation', 'ate'), ('ments', ''), ('ment', ''), ('ness', ''),
+             ('ings', ''), ('ing', ''), ('sses', 'ss'), ('ies', 'y'), ('ied', 'y'),
+             ('ers', ''), ('er', ''), ('ed', ''), ('es', ''), ('ly', ''), ('s', ''))
+
+_stats_lock = threading.Lock()
+_stats = {'searches': 0, 'upstream_requests': 0}
+
+
+def keyword_tokens(keywords: str) -> List[str]:
+    """Lowercase words of a keyword string, in order, without duplicates."""
+    return list(dict.fromkeys(_TOKEN_RE.findall((keywords or '').lower())))
+
+
+def stem(word: str) -> str:
+    """Strip one common English suffix: 'devices' and 'device' -> 'devic'."""
+    if word.endswith(('ss', 'us', 'is')) or len(word) <= 3:
+        return word
+    for suffix, replacement in _SUFFIXES:
+        base = word[:-len(suffix)]
+        if word.endswith(suffix) and len(base) >= 3 and not base.isdigit():
+            word = base + replacement
+            break
+    return word[:-1] if word.endswith('e') and len(word) > 4 else word  # 'device' and 'devices' meet at 'devic'
+
+
+def _record_stems(record: Dict[str, Any]) -> set:
+    text = " ".join(str(record.get(field) or '') for field in ('title', 'abstract', 'assignee'))
+    return {stem(t) for t in _TOKEN_RE.findall(text.lower())}
+
+
+def _count(searches: int, upstream_requests: int):
+    with _stats_lock:
+        _stats['searches'] += searches
+        _stats['upstream_requests'] += upstream_requests
+
+
+def stats() -> Dict[str, int]:
+    """Searches answered and upstream requests made by the planner so far."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def search_merged(searches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Answer several searches over one date window with a single merged query.
+
+    Args:
+        searches: Dicts with 'keywords' and optional 'start_year', 'end_year', 'size'
+                  and 'extra_fields'. All must share start_year and end_year.
+    Returns:
+        list: One {'results', 'total'} dict per search, in order. Results keep
+              PatentsView's newest-first order. 'total' counts the assigned patents
+              (a lower bound when the set reached its size).
+    """
+    first = searches[0]
+    if len(searches) == 1:
+        _count(1, 1)
+        return [patentsview_service.search_patents(
+            first['keywords'], first.get('start_year'), first.get('end_year'),
+            size=first.get('size', PAGE_SIZE), extra_fields=first.get('extra_fields'))]
+
+    stem_sets = [{stem(t) for t in keyword_tokens(s['keywords'])} for s in searches]
+    merged_keywords = " ".join(dict.fromkeys(t for s in searches for t in keyword_tokens(s['keywords'])))
+    extra_fields = list(dict.fromkeys(f for s in searches for f in s.get('extra_fields') or []))
+    sizes = [s.get('size', PAGE_SIZE) for s in searches]
+    assigned: List[List[Dict[str, Any]]] = [[] for _ in searches]
+    unassigned = 0
+
+    print(f"PatentsView planner: {len(searches)} searches merged into one query")
+    page = 1
+    while True:
+        result = patentsview_service.search_patents(
+            merged_keywords, first.get('start_year'), first.get('end_year'),
+            page=page, size=PAGE_SIZE, extra_fields=extra_fields)
+        if result.get('error'):
+            _count(len(searches), page)
+            return [{'results': assigned[i], 'total': len(assigned[i]), 'error': result['error']}
+                    for i in range(len(searches))]
+
+        batch = result.get('results', [])
+        for record in batch:
+            stems = _record_stems(record)
+            claimed = False
+            for i, wanted in enumerate(stem_sets):
+                if wanted & stems:
+                    claimed = True
+                    if len(assigned[i]) < sizes[i]:
+                        assigned[i].append(record)
+            unassigned += not claimed
+
+        if all(len(a) >= n for a, n in zip(assigned, sizes)):
+            break
+        if len(batch) < PAGE_SIZE or page * PAGE_SIZE >= result.get('total', 0) or page >= MAX_MERGED_PAGES:
+            break
+        page += 1
+
+    if unassigned:
+        print(f"PatentsView planner: {unassigned} patents matched no keyword set locally and were skipped")
+    _count(len(searches), page)
+    return [{'results': a, 'total': len(a)} for a in assigned]
+
+
+def plan(searches: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Group search indexes into mergeable batches: same date window, at most MAX_MERGED_SETS each.
+    """
+    by_window = defaultdict(list)
+    for i, s in enumerate(searches):
+        by_window[(s.get('start_year'), s.get('end_year'))].append(i)
+    groups = []
+    for indexes in by_window.values():
+        groups.extend(indexes[i:i + MAX_MERGED_SETS] for i in range(0, len(indexes), MAX_MERGED_SETS))
+    return groups
+
+
+def search_many(searches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Run many searches with as few upstream queries as possible.
+
+    Returns:
+        list: One {'results', 'total'} dict per search, in the order given.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(searches)
+    for group in plan(searches):
+        for i, result in zip(group, search_merged([searches[i] for i in group])):
+            results[i] = result
+    return results
+
@@ -3,6 +3,8 @@ PatentsView API Service
 Provides search functionality using the PatentsView API for rich patent metadata.
 """
 import requests
+import resilience
+from result_table import ResultTable
 from typing import List, Dict, Any, Optional
 
 # API Configuration
@@ -16,27 +18,27 @@ HEADERS = {
 }
 
 
-def search_patents(
+DEFAULT_FIELDS = [
+    "patent_id",
+    "patent_title",
+    "patent_date",
+    "patent_abstract",
+    "assignees.assignee_organization",
+    "inventors.inventor_name_first",
+    "inventors.inventor_name_last"
+]
+
+
+def build_query(
     keywords: str,
     start_year: Optional[int] = None,
     end_year: Optional[int] = None,
-    page: int = 1,
-    size: int = 100
+    since: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    Search patents using PatentsView API.
-    
-    Args:
-        keywords: Search keywords (space-separated for OR, can include phrases)
-        start_year: Start year for date filter (optional)
-        end_year: End year for date filter (optional)
-        page: Page number for pagination
-        size: Number of results per page (max 100)
-    
-    Returns:
-        Dictionary with 'results' list and 'total' count
+    Build the PatentsView "q" clause: date window plus keywords matched against
+    title, abstract, and assignee.
     """
-    # Build the query
     query_conditions = []
     
     # Add date filters if provided
@@ -44,6 +46,8 @@ def search_patents(
         query_conditions.append({"_gte": {"patent_date": f"{start_year}-01-01"}})
     if end_year:
         query_conditions.append({"_lte": {"patent_date": f"{end_year}-12-31"}})
+    if since:
+        query_conditions.append({"_gte": {"patent_date": since}})
     
     # Add keyword search across title, abstract, and assignee
     if keywords:
@@ -57,23 +61,70 @@ def search_patents(
     
     # Build full query
     if len(query_conditions) > 1:
-        query = {"_and": query_conditions}
+        return {"_and": query_conditions}
     elif len(query_conditions) == 1:
-        query = query_conditions[0]
-    else:
-        query = {}
+        return query_conditions[0]
+    return {}
+
+
+def transform_patent(p: Dict[str, Any], extra_fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Convert one PatentsView patent to the consistent frontend format."""
+    # Get first assignee
+    assignees = p.get("assignees", [])
+    assignee = assignees[0].get("assignee_organization") if assignees else None
+    
+    # Get inventors
+    inventors = p.get("inventors", [])
+    inventor_names = [
+        f"{inv.get('inventor_name_first', '')} {inv.get('inventor_name_last', '')}".strip()
+        for inv in inventors
+    ]
     
+    record = {
+        "patent_id": p.get("patent_id"),
+        "title": p.get("patent_title"),
+        "abstract": p.get("patent_abstract"),
+        "assignee": assignee,
+        "date": p.get("patent_date"),
+        "year": p.get("patent_date", "")[:4] if p.get("patent_date") else None,
+        "inventors": inventor_names,
+        "google_patents_url": f"https://patents.google.com/patent/US{p.get('patent_id')}"
+    }
+    # Extra requested fields are passed through under their top-level name
+    for field in extra_fields or []:
+        top = field.split(".")[0]
+        if top in p and top not in record:
+            record[top] = p[top]
+    return record
+
+
+def search_patents(
+    keywords: str,
+    start_year: Optional[int] = None,
+    end_year: Optional[int] = None,
+    page: int = 1,
+    size: int = 100,
+    since: Optional[str] = None,
+    extra_fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Search patents using PatentsView API.
+    
+    Args:
+        keywords: Search keywords (space-separated for OR, can include phrases)
+        start_year: Start year for date filter (optional)
+        end_year: End year for date filter (optional)
+        page: Page number for pagination
+        size: Number of results per page (max 100)
+        since: Only patents granted on or after this date (YYYY-MM-DD), for incremental refreshes
+        extra_fields: PatentsView fields to request in addition to DEFAULT_FIELDS
+    
+    Returns:
+        Dictionary with 'results' (a ResultTable) and 'total' count
+    """
     request_body = {
-        "q": query,
-        "f": [
-            "patent_id",
-            "patent_title",
-            "patent_date",
-            "patent_abstract",
-            "assignees.assignee_organization",
-            "inventors.inventor_name_first",
-            "inventors.inventor_name_last"
-        ],
+        "q": build_query(keywords, start_year, end_year, since),
+        "f": list(dict.fromkeys(DEFAULT_FIELDS + list(extra_fields or []))),
         "o": {
             "size": min(size, 100),
             "page": page,
@@ -83,11 +134,11 @@ def search_patents(
     
     try:
         print(f"DEBUG PatentsView: Searching for '{keywords}' ({start_year}-{end_year})")
-        response = requests.post(
+        response = resilience.post(
             PATENTSVIEW_URL,
+            key='patentsview.search',
             headers=HEADERS,
-            json=request_body,
-            timeout=30
+            json=request_body
         )
         response.raise_for_status()
         
@@ -98,29 +149,7 @@ def search_patents(
         print(f"DEBUG PatentsView: Found {len(patents)} patents (total: {total})")
         
         # Transform to consistent format for frontend
-        results = []
-        for p in patents:
-            # Get first assignee
-            assignees = p.get("assignees", [])
-            assignee = assignees[0].get("assignee_organization") if assignees else None
-            
-            # Get inventors
-            inventors = p.get("inventors", [])
-            inventor_names = [
-                f"{inv.get('inventor_name_first', '')} {inv.get('inventor_name_last', '')}".strip()
-                for inv in inventors
-            ]
-            
-            results.append({
-                "patent_id": p.get("patent_id"),
-                "title": p.get("patent_title"),
-                "abstract": p.get("patent_abstract"),
-                "assignee": assignee,
-                "date": p.get("patent_date"),
-                "year": p.get("patent_date", "")[:4] if p.get("patent_date") else None,
-                "inventors": inventor_names,
-                "google_patents_url": f"https://patents.google.com/patent/US{p.get('patent_id')}"
-            })
+        results = ResultTable.from_records(transform_patent(p, extra_fields) for p in patents)
         
         return {"results": results, "total": total}
         
@@ -0,0 +1,159 @@
+"""
+PDF Ingestion
+Parallel, cached page-level text extraction for protocol and patent PDFs.
+
+Pages are extracted across worker processes and yielded in page order as a generator.
+Extracted text is cached per (file SHA-256, page), so re-reading a PDF - or a copy of it
+under another name - only extracts pages that were not seen before.
+
+Usage:
+    python pdf_ingest.py protocol.pdf             # print page text
+    python pdf_ingest.py protocol.pdf --keywords  # top keywords for the next workflow step
+"""
+import argparse
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pypdf
+
+from keyword_extractor import extract_keywords
+
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pdf_cache'))
+PAGES_PER_TASK = 8
+PARALLEL_MIN_PAGES = 16       # Smaller documents are extracted in-process
+MAX_WORKERS = os.cpu_count() or 2
+
+_worker_reader = None
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir: str, file_hash: str, page: int) -> str:
+    return os.path.join(cache_dir, file_hash[:2], file_hash, f"{page:05d}.txt")
+
+
+def _read_cached(cache_dir: Optional[str], file_hash: str, page: int) -> Optional[str]:
+    if not cache_dir:
+        return None
+    path = _cache_path(cache_dir, file_hash, page)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _write_cached(cache_dir: Optional[str], file_hash: str, page: int, text: str):
+    if not cache_dir:
+        return
+    path = _cache_path(cache_dir, file_hash, page)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _extract(reader: pypdf.PdfReader, page: int) -> str:
+    try:
+        return reader.pages[page].extract_text() or ""
+    except Exception as e:
+        print(f"PDF: could not extract page {page + 1}: {e}")
+        return ""
+
+
+def _init_worker(path: str):
+    # Each worker parses the document once and reuses it for all its pages
+    global _worker_reader
+    _worker_reader = pypdf.PdfReader(path)
+
+
+def _extract_pages(pages: List[int]) -> List[Tuple[int, str]]:
+    return [(page, _extract(_worker_reader, page)) for page in pages]
+
+
+def iter_pdf_pages(path: str, workers: int = MAX_WORKERS,
+                   cache_dir: Optional[str] = PDF_CACHE_DIR) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for every page, in order. Page numbers start at 1.
+
+    Args:
+        path: PDF file.
+        workers: Worker processes for uncached pages (1 extracts in-process).
+        cache_dir: Page text cache directory, or None to disable caching.
+    """
+    file_hash = file_sha256(path)
+    reader = pypdf.PdfReader(path)
+    page_count = len(reader.pages)
+
+    cached: Dict[int, str] = {}
+    missing = []
+    for page in range(page_count):
+        text = _read_cached(cache_dir, file_hash, page)
+        if text is None:
+            missing.append(page)
+        else:
+            cached[page] = text
+
+    if len(missing) < PARALLEL_MIN_PAGES or workers <= 1:
+        for page in range(page_count):
+            if page not in cached:
+                cached[page] = _extract(reader, page)
+                _write_cached(cache_dir, file_hash, page, cached[page])
+            yield page + 1, cached.pop(page)
+        return
+
+    chunks = [missing[i:i + PAGES_PER_TASK] for i in range(0, len(missing), PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             initializer=_init_worker, initargs=(path,)) as executor:
+        futures = {chunk[0]: executor.submit(_extract_pages, chunk) for chunk in chunks}
+        for page in range(page_count):
+            if page not in cached:
+                # Wait for the chunk holding this page; later chunks keep extracting meanwhile
+                for extracted_page, text in futures.pop(page).result():
+                    cached[extracted_page] = text
+                    _write_cached(cache_dir, file_hash, extracted_page, text)
+            yield page + 1, cached.pop(page)
+
+
+def pdf_records(path: str, **kwargs) -> Iterator[Dict[str, object]]:
+    """
+    Yield one record per non-empty page, shaped for keyword_extractor and the workflow
+    ('abstract' holds the page text).
+    """
+    source = os.path.basename(path)
+    for page, text in iter_pdf_pages(path, **kwargs):
+        if text.strip():
+            yield {'title': '', 'abstract': text, 'page': page, 'source_file': source}
+
+
+def extract_pdf_keywords(path: str, **kwargs) -> str:
+    """Comma-separated top keywords of a PDF, as extract_keywords returns them."""
+    return extract_keywords(list(pdf_records(path, **kwargs)), 'pdf')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract text from a PDF, page by page.")
+    parser.add_argument('path')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--keywords', action='store_true', help="Print extracted keywords instead of text")
+    args = parser.parse_args(argv)
+
+    cache_dir = None if args.no_cache else PDF_CACHE_DIR
+    if args.keywords:
+        print(extract_pdf_keywords(args.path, workers=args.workers, cache_dir=cache_dir))
+        return
+    for _, text in iter_pdf_pages(args.path, workers=args.workers, cache_dir=cache_dir):
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Pipelined Workflow Execution
+Runs workflow steps concurrently, connected by bounded keyword queues.
+
+The sequential runner starts step N+1 only after step N has fetched every record,
+written its outputs and extracted keywords. Here every step runs in its own thread
+and passes its keywords to the next step through a queue once they are final:
+keyword_extractor.keywords_ready() knows when a prefix of the results already
+determines them (the first ICD-11 hit, the first OpenTargets disease ID, the top 5
+genes or pathways). PubMed and OpenTargets association steps are streamed record by
+record, so the next step can start while the rest is still being fetched. Each step
+then dedups, saves and indexes its full result set while later steps run. Steps
+with keywords in the CSV don't wait at all.
+
+Step outputs match the sequential runner, except that cross-step --dedup sees steps
+in the order they finish. A --deadline covers the whole run rather than being shared
+out per step, and --profile is ignored (its phase timings are per thread).
+
+Usage:
+    python workflow_orchestrator.py --pipeline
+"""
+import os
+import queue
+import threading
+import time
+
+import deadline
+from columnar_output import save_step_output, find_step_output, load_step_output
+from dedup import Deduplicator
+from incremental import IncrementalStore, FETCHERS as INCREMENTAL_APIS
+from keyword_extractor import extract_keywords, keywords_ready
+from local_index import LocalIndex
+from result_table import ResultTable
+import workflow_orchestrator as orchestrator
+
+QUEUE_SIZE = 1  # Each step hands exactly one keyword string downstream
+
+
+class _Shared:
+    """State shared by all step threads of one run, with the locks that guard it."""
+
+    def __init__(self, args, on_step):
+        self.args = args
+        self.deduplicator = Deduplicator(threshold=args.dedup_threshold) if args.dedup else None
+        self.local_index = LocalIndex() if args.index else None
+        self.incremental_store = IncrementalStore() if getattr(args, 'incremental', False) else None
+        self.dedup_lock = threading.Lock()
+        self.index_lock = threading.Lock()
+        self.progress_lock = threading.Lock()
+        self.on_step = on_step
+
+    def report(self, entry):
+        if self.on_step:
+            with self.progress_lock:
+                self.on_step(entry)
+
+
+def _fetch(api_name, search_query, step, shared, step_kwargs, emit):
+    """
+    Fetch a step's records, emitting keywords early once they are final.
+
+    Returns:
+        (records, partial): records is a ResultTable or list of records.
+    """
+    args = shared.args
+    api_lower = api_name.lower()
+    step_mode = (step.get('mode') or '').strip().lower()
+
+    if step_mode == 'map':
+        concurrency = int(step.get('concurrency') or args.map_concurrency)
+        records = orchestrator.execute_map_step(api_name, search_query, concurrency, **step_kwargs)
+        return records, deadline.expired()
+    if shared.incremental_store and api_lower in INCREMENTAL_APIS:
+        print(f"  -> Incremental refresh...")
+        result = shared.incremental_store.refresh(api_name, search_query)
+        if result.get('error'):
+            print(f"  -> Refresh failed ({result['error']}); continuing with the stored results.")
+        return result['results'], bool(result.get('partial'))
+
+    # Dedup may drop records from any prefix, so deduplicated steps can't emit early
+    early = not (shared.deduplicator and api_lower in orchestrator.DEDUP_APIS)
+    records = ResultTable()
+    try:
+        for record in orchestrator.stream_step(api_name, search_query, **step_kwargs):
+            records.append(record)
+            if early and keywords_ready(records, api_name):
+                emit(extract_keywords(records, api_name))
+    except deadline.DeadlineExceeded:
+        print(f"  -> {api_name}: deadline reached after {len(records)} records")
+        return records, True
+    return records, False
+
+
+def _run_step(i, step, inbox, outbox, shared, summary):
+    """Body of one step thread. Always puts exactly one keyword string into outbox."""
+    args = shared.args
+    api_name = (step.get('api_name') or '').strip()
+    csv_keywords = (step.get('keywords') or '').strip()
+    started = time.perf_counter()
+    emitted = False
+
+    def emit(keywords):
+        nonlocal emitted
+        if not emitted:
+            emitted = True
+            if outbox is not None:
+                outbox.put(keywords)
+            if keywords:
+                print(f"  -> Step {i+1} ({api_name}): passing keywords to the next step: '{keywords}'")
+
+    def finish(status, records=0, partial=False):
+        summary[i] = {'step': i+1, 'api_name': api_name, 'status': status, 'records': records,
+                      'seconds': round(time.perf_counter() - started, 3), 'partial': partial}
+        shared.report(summary[i])
+
+    try:
+        # Keywords from the CSV win; otherwise wait for the previous step's
+        upstream_keywords = inbox.get() if inbox is not None and not csv_keywords else ""
+        search_query = csv_keywords or upstream_keywords
+        if not search_query:
+            print(f"\n[WARNING] Step {i+1} ({api_name}): No keywords found in CSV and no keywords generated from previous step.")
+            finish('skipped')
+            return
+        if deadline.expired():
+            print(f"\nStep {i+1} ({api_name}): skipped, workflow deadline reached.")
+            finish('deadline', partial=True)
+            return
+
+        started = time.perf_counter()
+        shared.report({'step': i+1, 'api_name': api_name, 'status': 'running', 'records': 0, 'seconds': 0.0})
+        print(f"\nStep {i+1}: Calling {api_name} with keywords from {'CSV' if csv_keywords else 'Previous Step'}: '{search_query}'")
+
+        step_name = f"step_{i+1}_{api_name}"
+        existing_output = find_step_output(args.output_dir, step_name) if args.resume else None
+        partial = False
+        if existing_output:
+            print(f"  -> Step {i+1}: resuming from saved output: {existing_output}")
+            records = load_step_output(existing_output)
+        else:
+            records, partial = _fetch(api_name, search_query, step, shared,
+                                      orchestrator.step_kwargs_for(api_name, args), emit)
+
+        if shared.deduplicator and records and api_name.lower() in orchestrator.DEDUP_APIS:
+            before = len(records)
+            with shared.dedup_lock:
+                records = shared.deduplicator.deduplicate(records)
+            print(f"  -> Step {i+1} dedup: {before} -> {len(records)} records")
+
+        if not records:
+            print(f"  -> No results returned from {api_name}.")
+            emit("")
+            finish('partial' if partial else 'empty', partial=partial)
+            return
+
+        print(f"  -> Step {i+1} ({api_name}): received {len(records)} records.")
+        emit(extract_keywords(records, api_name))
+        if not existing_output:
+            output_path = save_step_output(records, args.output_dir, step_name, args.output_format)
+            if shared.local_index:
+                with shared.index_lock:
+                    shared.local_index.ingest_file(output_path)
+        finish('resumed' if existing_output else ('partial' if partial else 'ok'), len(records), partial)
+    finally:
+        emit("")
+
+
+def run_pipelined_workflow(steps, args, on_step=None):
+    """
+    Runs a workflow chain with overlapping steps.
+
+    Args:
+        steps (list): Step rows as read by read_input_csv.
+        args (Namespace): Options from workflow_orchestrator.parse_args.
+        on_step (callable): Optional progress callback (see workflow_orchestrator.run_workflow).
+                            Calls are serialized but may arrive out of step order.
+    Returns:
+        list: One summary per step, in step order, as from run_workflow.
+    Raises:
+        Exception: The first error raised by a step, after all steps have finished.
+    """
+    os.makedirs(args.output_dir, exist_ok=True)
+    if getattr(args, 'profile', False):
+        print("Note: --profile is ignored with --pipeline")
+
+    shared = _Shared(args, on_step)
+    summary = [None] * len(steps)
+    errors = []
+    queues = [queue.Queue(maxsize=QUEUE_SIZE) for _ in steps[1:]]
+
+    def run(i, step):
+        try:
+            _run_step(i, step, queues[i-1] if i > 0 else None, queues[i] if i < len(queues) else None,
+                      shared, summary)
+        except Exception as e:
+            print(f"Step {i+1} failed: {e}")
+            errors.append(e)
+            if summary[i] is None:
+                summary[i] = {'step': i+1, 'api_name': (step.get('api_name') or '').strip(), 'status': 'error',
+                              'records': 0, 'seconds': 0.0, 'partial': False}
+
+    with deadline.budget(getattr(args, 'deadline', None)):
+        threads = [threading.Thread(target=deadline.propagate(run), args=(i, step), name=f"step-{i+1}", daemon=True)
+                   for i, step in enumerate(steps)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return summary
@@ -0,0 +1,205 @@
+"""
+Workflow Profiling
+Per-step wall/CPU time, phase breakdown and peak memory for `workflow_orchestrator.py --profile`.
+
+Code on the hot path marks phases with `profiling.phase(name)` (Node spawn, bridge call,
+JSON dump, CSV conversion, keyword extraction, ...). Outside a profiled step this is a
+no-op. Phase times are exclusive: time spent in a nested phase is not counted again in
+its parent, so "fetch" is the time in the API client itself. The active profiler is a
+context variable, so unprofiled runs in other threads never report into it; map-step
+worker threads inherit it through deadline.propagate(), and their phases are summed
+across threads and can add up to more than the step's wall time.
+
+Each step can also write a cProfile stats file (view with `python -m pstats` or
+snakeviz) or a collapsed-stack file (flamegraph.pl / speedscope input).
+
+CPU time, tracemalloc peaks and cProfile are process-wide or per-thread, so only one
+step is profiled at a time per process: StepProfiler.step raises ProfilerBusy while
+another is running. CPU time includes every thread of the process, while cProfile stats
+only see the step's own thread (worker-thread time is not attributed there).
+"""
+import contextvars
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+PROFILE_FORMATS = ('pstats', 'collapsed')
+SAMPLE_INTERVAL = 0.005       # Seconds between stack samples for collapsed output
+
+_run_lock = threading.Lock()  # Held while a step is profiled
+_active: contextvars.ContextVar = contextvars.ContextVar('profiler', default=None)  # StepProfiler recording the current step
+_local = threading.local()
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a step is profiled while another profiled step is running."""
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the enclosed time to a named phase of the current profiled step."""
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    if stack:
+        stack[-1][1] += time.perf_counter() - stack[-1][2]
+    entry = [name, 0.0, time.perf_counter()]
+    stack.append(entry)
+    try:
+        yield
+    finally:
+        stack.pop()
+        now = time.perf_counter()
+        profiler._add_phase(name, entry[1] + now - entry[2])
+        if stack:
+            stack[-1][2] = now
+
+
+class _StackSampler(threading.Thread):
+    """Samples every thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.counts = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class StepProfiler:
+    """
+    Collects per-step timings for one workflow run.
+
+    Args:
+        output_dir: Directory for per-step profile files (None: no files).
+        profile_format: 'pstats', 'collapsed' or None (timings only).
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, profile_format: Optional[str] = None):
+        if profile_format not in (None,) + PROFILE_FORMATS:
+            raise ValueError(f"Unknown profile format '{profile_format}'. Choose from {', '.join(PROFILE_FORMATS)}")
+        self.output_dir = output_dir
+        self.profile_format = profile_format
+        self.steps: List[Dict[str, Any]] = []
+        self._phases = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def _add_phase(self, name: str, seconds: float):
+        with self._lock:
+            self._phases[name] += seconds
+
+    @contextmanager
+    def step(self, step_name: str):
+        """
+        Profile one workflow step; the timings are appended to self.steps.
+
+        Raises:
+            ProfilerBusy: Another step is being profiled in this process.
+        """
+        if not _run_lock.acquire(blocking=False):
+            raise ProfilerBusy("Another workflow step is being profiled in this process; "
+                               "profiled runs can't overlap")
+        try:
+            with self._profile_step(step_name):
+                yield
+        finally:
+            _run_lock.release()
+
+    @contextmanager
+    def _profile_step(self, step_name: str):
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._phases = defaultdict(float)
+
+        profile = cProfile.Profile() if self.profile_format == 'pstats' else None
+        sampler = _StackSampler() if self.profile_format == 'collapsed' else None
+        if sampler:
+            sampler.start()
+        token = _active.set(self)
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            _active.reset(token)
+            if sampler:
+                sampler.stop()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            entry = {
+                'step': step_name,
+                'wall': wall,
+                'cpu': cpu,
+                'peak_mb': peak / 2 ** 20,
+                'phases': dict(self._phases),
+            }
+            if self.output_dir and (profile or sampler):
+                os.makedirs(self.output_dir, exist_ok=True)
+                if profile:
+                    entry['file'] = os.path.join(self.output_dir, f"{step_name}.prof")
+                    profile.dump_stats(entry['file'])
+                else:
+                    entry['file'] = os.path.join(self.output_dir, f"{step_name}.collapsed")
+                    sampler.write(entry['file'])
+            self.steps.append(entry)
+
+    def print_report(self):
+        if not self.steps:
+            return
+        phase_names = list(dict.fromkeys(name for s in self.steps for name in s['phases']))
+        widths = [max(10, len(n) + 2) for n in phase_names]
+        print("\nStep profile (seconds; phases are exclusive time):")
+        header = f"  {'step':<28}{'wall':>8}{'cpu':>8}{'peak MB':>9}" + "".join(f"{n:>{w}}" for n, w in zip(phase_names, widths))
+        print(header)
+        for s in self.steps:
+            row = f"  {s['step']:<28}{s['wall']:>8.2f}{s['cpu']:>8.2f}{s['peak_mb']:>9.1f}"
+            row += "".join(f"{s['phases'].get(n, 0.0):>{w}.3f}" for n, w in zip(phase_names, widths))
+            print(row)
+        print("  (cpu counts every thread in the process; phases in map-step worker threads are summed)")
+        files = [s['file'] for s in self.steps if s.get('file')]
+        if files:
+            print(f"  Profiles written to {os.path.dirname(files[0])}")
+            if self.profile_format == 'pstats':
+                print("  cProfile stats cover each step's own thread only: time in worker threads is not attributed")
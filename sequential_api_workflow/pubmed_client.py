@@ -0,0 +1,280 @@
+"""
+PubMed E-utilities Client
+Native replacement for the Node bridge's PubMed search, built for large pulls.
+
+ESearch runs once with usehistory=y; records are then fetched from the NCBI history
+server in large EFetch batches, several batches in flight at once (the shared rate
+limiter keeps us within NCBI's 3 req/s, or 10 req/s with NCBI_API_KEY). Each batch's
+XML is parsed incrementally, article by article, into the same record shape as the
+Backend's PubMed export (Title, Authors, Abstract, DOI/PMID, MeSH columns, ...).
+
+EFetch can't page past the 10,000th record of a search, so larger pulls split the
+date range into windows that each match at most that many records, newest first.
+"""
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+import deadline
+import rate_limiter
+import resilience
+from result_table import ResultTable
+
+EUTILS_BASE = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils'
+NCBI_API_KEY = os.environ.get('NCBI_API_KEY')
+NCBI_TOOL = 'project-lr-workflow'
+NCBI_EMAIL = os.environ.get('NCBI_EMAIL')
+
+MAX_RESULTS = 100
+EFETCH_BATCH_SIZE = 500
+FETCH_CONCURRENCY = 3
+MESH_COLUMNS = 5
+HISTORY_LIMIT = 10000  # Records EFetch can page through per search (retstart stops at 9,999)
+
+
+def _params(**params) -> Dict[str, Any]:
+    params['tool'] = NCBI_TOOL
+    if NCBI_EMAIL:
+        params['email'] = NCBI_EMAIL
+    if NCBI_API_KEY:
+        params['api_key'] = NCBI_API_KEY
+    return params
+
+
+def _text(elem: Optional[ET.Element]) -> str:
+    """All text inside an element, including inline markup like <i> and <sup>."""
+    return "".join(elem.itertext()).strip() if elem is not None else ""
+
+
+def parse_article(article: ET.Element, term: str, date_from: str = '', date_to: str = '') -> Dict[str, Any]:
+    """
+    Convert one <PubmedArticle> element into a workflow record.
+    """
+    citation = article.find('MedlineCitation')
+    art = citation.find('Article')
+
+    authors = art.findall('AuthorList/Author')
+    author_names = "; ".join(
+        f"{a.findtext('LastName', '')} {a.findtext('ForeName', '')}".strip() for a in authors
+    )
+    first_author = authors[0] if authors else None
+
+    pub_date = art.find('Journal/JournalIssue/PubDate')
+    year = ''
+    if pub_date is not None:
+        year = pub_date.findtext('Year') or (pub_date.findtext('MedlineDate') or '')[:4]
+    year = int(year) if year.isdigit() else year
+
+    pmid = citation.findtext('PMID', '')
+    entrez = next((d for d in article.findall('PubmedData/History/PubMedPubDate')
+                   if d.get('PubStatus') == 'entrez'), None)
+    entry_date = ''
+    if entrez is not None and entrez.findtext('Year'):
+        entry_date = "{}/{:0>2}/{:0>2}".format(entrez.findtext('Year'), entrez.findtext('Month', '1'),
+                                             entrez.findtext('Day', '1'))
+    doi = next((i.text for i in article.findall('PubmedData/ArticleIdList/ArticleId')
+                if i.get('IdType') == 'doi' and i.text), '')
+
+    headings = citation.findall('MeshHeadingList/MeshHeading')
+    major_topics = [_text(h.find('DescriptorName')) for h in headings
+                    if h.find('DescriptorName') is not None and h.find('DescriptorName').get('MajorTopicYN') == 'Y']
+    subheadings = ["; ".join(_text(q) for q in h.findall('QualifierName')) for h in headings]
+    subheadings = [s for s in subheadings if s]
+    all_terms = [t for t in (_text(h.find('DescriptorName')) for h in headings) if t]
+
+    record = {
+        'Title': _text(art.find('ArticleTitle')),
+        'Authors': author_names,
+        'Publication Year': year,
+        'Abstract': " ".join(_text(a) for a in art.findall('Abstract/AbstractText')),
+        'DOI/PMID': doi or pmid,
+        'Source': 'PubMed',
+        'Search Term': term,
+        'Date From': date_from or '',
+        'Date To': date_to or '',
+        'Textword': term,
+        'Entry Date': entry_date,
+        'Author First Name': first_author.findtext('ForeName', '') if first_author is not None else '',
+        'Author Last Name': first_author.findtext('LastName', '') if first_author is not None else '',
+    }
+    for i in range(MESH_COLUMNS):
+        record[f'MeSH Major Topic {i + 1}'] = major_topics[i] if i < len(major_topics) else ''
+        record[f'MeSH Subheading {i + 1}'] = subheadings[i] if i < len(subheadings) else ''
+        record[f'MeSH Term {i + 1}'] = all_terms[i] if i < len(all_terms) else ''
+    return record
+
+
+def iter_articles(stream, term: str, date_from: str = '', date_to: str = '') -> Iterator[Dict[str, Any]]:
+    """
+    Incrementally parse an EFetch XML stream, yielding one record per article.
+    Each article's element tree is released as soon as it has been converted.
+    """
+    context = ET.iterparse(stream, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == 'PubmedArticle':
+            try:
+                yield parse_article(elem, term, date_from, date_to)
+            except Exception as e:
+                print(f"PubMed: skipping unparseable article: {e}")
+            root.clear()
+
+
+def esearch(term: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+            datetype: str = 'pdat') -> Dict[str, Any]:
+    """
+    Run ESearch on the history server.
+
+    Returns:
+        dict: {'count', 'webenv', 'query_key'}
+    """
+    params = _params(db='pubmed', term=term, usehistory='y', retmax=0, retmode='json')
+    if date_from or date_to:
+        params.update(datetype=datetype, mindate=date_from or '1800', maxdate=date_to or '3000')
+    response = resilience.get(f"{EUTILS_BASE}/esearch.fcgi", key='pubmed.esearch', params=params)
+    response.raise_for_status()
+    result = response.json().get('esearchresult', {})
+    return {
+        'count': int(result.get('count', 0)),
+        'webenv': result.get('webenv'),
+        'query_key': result.get('querykey'),
+    }
+
+
+def _fetch_batch(history: Dict[str, Any], retstart: int, retmax: int,
+                 term: str, date_from: str, date_to: str) -> List[Dict[str, Any]]:
+    params = _params(db='pubmed', WebEnv=history['webenv'], query_key=history['query_key'],
+                     retstart=retstart, retmax=retmax, retmode='xml')
+
+    def attempt(timeout):
+        response = rate_limiter.request('GET', f"{EUTILS_BASE}/efetch.fcgi",
+                                       params=params, stream=True, timeout=timeout)
+        if response.status_code in resilience.RETRY_STATUSES:
+            raise resilience.TransientHTTPError(f"EFetch {response.status_code}", response=response)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with response:
+            return list(iter_articles(response.raw, term, date_from, date_to))
+
+    return resilience.call_with_retry(attempt, 'pubmed.efetch')
+
+
+def _parse_date(value: str, end: bool = False) -> date:
+    """A YYYY, YYYY/MM or YYYY/MM/DD bound as a date (the last day of its period when end=True)."""
+    parts = [int(p) for p in value.replace('-', '/').split('/')]
+    if len(parts) >= 3:
+        return date(*parts[:3])
+    year, month = parts[0], parts[1] if len(parts) == 2 else (12 if end else 1)
+    if not end:
+        return date(year, month, 1)
+    return date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+
+
+def date_windows(query: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                 datetype: str = 'pdat') -> Iterator[Dict[str, Any]]:
+    """
+    ESearch histories over consecutive date ranges, newest first, each matching at most
+    HISTORY_LIMIT records. Ranges are halved until they fit, searched lazily as consumed.
+    Records without a date of the datetype are not in any window.
+    """
+    stack = [(_parse_date(date_from or '1800'), _parse_date(date_to, end=True) if date_to else date.today())]
+    while stack:
+        start, end = stack.pop()
+        history = esearch(query, start.strftime('%Y/%m/%d'), end.strftime('%Y/%m/%d'), datetype)
+        if history['count'] > HISTORY_LIMIT and start < end:
+            middle = start + (end - start) // 2
+            stack.append((start, middle))
+            stack.append((middle + timedelta(days=1), end))  # Popped first
+            continue
+        if history['count'] > HISTORY_LIMIT:
+            print(f"PubMed: {history['count']} matches on {start}, only the first {HISTORY_LIMIT} can be fetched")
+        if history['count']:
+            yield history
+
+
+def _iter_history(history: Dict[str, Any], total: int, query: str, date_from: str, date_to: str,
+                  batch_size: int, concurrency: int) -> Iterator[Dict[str, Any]]:
+    """The first `total` records of one ESearch history, fetched in concurrent batches."""
+    starts = list(range(0, total, batch_size))
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(starts)))) as executor:
+        batches = executor.map(
+            deadline.propagate(lambda start: _fetch_batch(history, start, min(batch_size, total - start),
+                                                          query, date_from, date_to)),
+            starts,
+        )
+        for batch in batches:
+            yield from batch
+
+
+def iter_pubmed(query: str, max_results: int = MAX_RESULTS, date_from: Optional[str] = None,
+                date_to: Optional[str] = None, datetype: str = 'pdat',
+                batch_size: int = EFETCH_BATCH_SIZE, concurrency: int = FETCH_CONCURRENCY,
+                history: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream PubMed records for a query, in PubMed's relevance order (within each date
+    window when more than HISTORY_LIMIT records are requested).
+
+    Args:
+        query: PubMed search term.
+        max_results: Maximum number of records (None for everything that matches).
+        date_from / date_to: Optional date bounds (YYYY, YYYY/MM or YYYY/MM/DD).
+        datetype: Date field the bounds apply to ('pdat' publication, 'edat' entry date).
+        batch_size: Records per EFetch request.
+        concurrency: EFetch batches in flight at once.
+        history: Result of a previous esearch() call, to skip searching again.
+    Yields:
+        dict: One record per article.
+    """
+    history = history or esearch(query, date_from, date_to, datetype)
+    total = history['count'] if max_results is None else min(history['count'], max_results)
+    if total == 0:
+        return
+    print(f"PubMed: {history['count']} matches, fetching {total} in batches of {batch_size}")
+    if total <= HISTORY_LIMIT:
+        yield from _iter_history(history, total, query, date_from or '', date_to or '', batch_size, concurrency)
+        return
+
+    remaining = total
+    for window in date_windows(query, date_from, date_to, datetype):
+        count = min(window['count'], remaining, HISTORY_LIMIT)
+        yield from _iter_history(window, count, query, date_from or '', date_to or '', batch_size, concurrency)
+        remaining -= count
+        if remaining <= 0:
+            return
+
+
+def search_pubmed(query: str, max_results: int = MAX_RESULTS, date_from: Optional[str] = None,
+                  date_to: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Search PubMed and return all records at once.
+
+    Returns:
+        dict: {'results': ResultTable, 'total': match count}. If a request fails or the
+              deadline budget runs out mid-way, the records fetched so far are returned
+              with 'partial': True and 'error' holds the message.
+    """
+    results = ResultTable()
+    history = None
+    try:
+        history = esearch(query, date_from, date_to, kwargs.get('datetype', 'pdat'))
+        for record in iter_pubmed(query, max_results, date_from, date_to, history=history, **kwargs):
+            results.append(record)
+        return {'results': results, 'total': history['count']}
+    except deadline.DeadlineExceeded as e:
+        print(f"PubMed: deadline reached after {len(results)} records")
+        return {'results': results, 'total': len(results), 'partial': True, 'error': str(e)}
+    except (requests.exceptions.RequestException, ET.ParseError) as e:
+        print(f"PubMed Error after {len(results)} records: {e}")
+        return {'results': results, 'total': history['count'] if history else len(results),
+                'partial': True, 'error': str(e)}
+
+
+if __name__ == "__main__":
+    result = search_pubmed("type 2 diabetes ABCC8", max_results=5)
+    print(f"Found {result['total']} matches")
+    for r in result['results']:
+        print(f"  - {r['DOI/PMID']}: {r['Title'][:60]}")
@@ -0,0 +1,210 @@
+"""
+Shared Rate Limiter
+Process-wide, per-host token buckets with AIMD rate adaptation.
+
+Every outbound HTTP call should go through `request` (or `get`/`post`). Each host
+starts at its documented ceiling; a 429/503 halves the rate (multiplicative decrease)
+and pauses the host for any Retry-After period, and each success adds back a small
+step (additive increase) up to the ceiling.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+import deadline
+
+# Requests per second: (starting rate, ceiling). Ceilings follow each provider's documented limits.
+HOST_LIMITS = {
+    'eutils.ncbi.nlm.nih.gov': (10.0, 10.0) if os.environ.get('NCBI_API_KEY') else (3.0, 3.0),
+    'pubchem.ncbi.nlm.nih.gov': (5.0, 5.0),
+    'search.patentsview.org': (0.75, 0.75),  # 45 requests/minute per API key
+    'developer.uspto.gov': (2.0, 4.0),
+    'api.platform.opentargets.org': (10.0, 20.0),
+    'reactome.org': (5.0, 10.0),
+    'id.who.int': (5.0, 10.0),
+    'icdaccessmanagement.who.int': (1.0, 2.0),
+}
+DEFAULT_LIMIT = (5.0, 10.0)
+
+MIN_RATE = 0.05               # Never back off below one request per 20 seconds
+DECREASE_FACTOR = 0.5         # Multiplicative decrease on 429/503
+INCREASE_FRACTION = 0.05      # Additive increase per success, as a fraction of the ceiling
+THROTTLE_STATUSES = (429, 503)
+THROTTLE_RETRIES = 3          # Re-sends after a throttled response before giving up
+DEFAULT_TIMEOUT = 30
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP-date) into seconds from now.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class HostBucket:
+    """Token bucket for a single host whose refill rate adapts with AIMD."""
+
+    def __init__(self, rate: float, max_rate: float):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.tokens = 1.0
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> float:
+        # Allow a burst of up to one second's worth of requests
+        return max(1.0, self.rate)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Block until a request may be sent to this host.
+
+        Raises:
+            DeadlineExceeded: The current deadline budget ends before the wait would.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.requests += 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            left = deadline.remaining()
+            if left is not None and left < wait:
+                time.sleep(max(left, 0.0))
+                raise deadline.DeadlineExceeded(f"Deadline budget ends during a {wait:.1f}s rate-limit wait")
+            time.sleep(wait)
+
+    def record(self, status_code: int, retry_after: Optional[float] = None):
+        """Feed a response status back into the rate (AIMD) and Retry-After pause."""
+        with self._lock:
+            if status_code in THROTTLE_STATUSES:
+                self.throttled += 1
+                self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+                self.tokens = min(self.tokens, 0.0)
+                pause = retry_after if retry_after is not None else 1.0 / self.rate
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            elif status_code < 500:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * INCREASE_FRACTION)
+
+
+class RateLimiter:
+    """Registry of per-host buckets, shared by every client in the process."""
+
+    def __init__(self, host_limits: Dict[str, tuple] = None, default_limit: tuple = DEFAULT_LIMIT):
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.default_limit = default_limit
+        self.rate_scale = 1.0
+        self.slots = {}
+        self._buckets: Dict[str, HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure_shared(self, slots: Dict[str, object] = None, rate_scale: float = 1.0):
+        """
+        Share limits with other processes (used by batch_runner).
+
+        Args:
+            slots: Semaphores (e.g. multiprocessing.Manager proxies) capping concurrent
+                   in-flight requests per host or other key, across all processes.
+            rate_scale: Fraction of each host's rate this process may use, e.g. 1/workers.
+        """
+        with self._lock:
+            self.slots = dict(slots or {})
+            self.rate_scale = rate_scale
+            self._buckets.clear()
+
+    def bucket(self, host: str) -> HostBucket:
+        with self._lock:
+            if host not in self._buckets:
+                rate, max_rate = self.host_limits.get(host, self.default_limit)
+                self._buckets[host] = HostBucket(rate * self.rate_scale, max_rate * self.rate_scale)
+            return self._buckets[host]
+
+    def stats(self) -> Dict[str, dict]:
+        """Current rate and request/throttle counts per host."""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {
+            host: {'rate': round(b.rate, 3), 'requests': b.requests, 'throttled': b.throttled}
+            for host, b in buckets.items()
+        }
+
+
+limiter = RateLimiter()
+
+
+@contextmanager
+def concurrency_slot(key: str):
+    """Hold one of the shared concurrency slots for key, if any are configured."""
+    semaphore = limiter.slots.get(key)
+    if semaphore is None:
+        yield
+        return
+    semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Rate-limited drop-in for `requests.request`.
+
+    Waits for a token from the host's bucket, reports the response status back to
+    the limiter, and re-sends throttled (429/503) requests after their Retry-After
+    pause up to THROTTLE_RETRIES times. The last response is returned either way.
+    The timeout is capped by the surrounding deadline budget, if any (see deadline.py).
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    host = urlparse(url).hostname or ''
+    bucket = limiter.bucket(host)
+
+    for attempt in range(THROTTLE_RETRIES + 1):
+        bucket.acquire()
+        with concurrency_slot(host):
+            kwargs['timeout'] = deadline.cap(kwargs['timeout'])
+            response = requests.request(method, url, **kwargs)
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        bucket.record(response.status_code, retry_after)
+        if response.status_code not in THROTTLE_STATUSES or attempt == THROTTLE_RETRIES:
+            return response
+        print(f"Rate limited by {host} ({response.status_code}); "
+              f"now {bucket.rate:.2f} req/s, retrying")
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
@@ -1,30 +1,75 @@
+import os
 import requests
+import deadline
+import reactome_index
+import resilience
+from result_table import ResultTable
 
 BASE_URL = 'https://reactome.org/ContentService'
+# 'api' (ContentService search per entity), 'local' (mapping-file index, see reactome_index.py)
+# or 'auto' (the local index once it has been built, else the API). Opt-in: the two rank
+# pathways differently, so building an index doesn't change results unless asked to.
+BACKENDS = ('api', 'local', 'auto')
+BACKEND = os.environ.get('REACTOME_BACKEND', 'api')
+MAX_PATHWAYS = 20
 
-def get_pathways_for_entity(identifier):
+def resolve_backend(backend=None):
+    """
+    The backend a lookup will use: 'api' or 'local'.
+    Args:
+        backend (str): One of BACKENDS (default: REACTOME_BACKEND env var, else 'api').
+    """
+    backend = (backend or BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown Reactome backend '{backend}'. Choose from {', '.join(BACKENDS)}")
+    if backend == 'auto':
+        return 'local' if os.path.exists(os.path.join(reactome_index.INDEX_DIR, 'keys.npy')) else 'api'
+    return backend
+
+def get_pathways_for_entity(identifier, backend=None, species=None, limit=MAX_PATHWAYS):
     """
     Get pathways for a given entity (e.g., Gene Symbol).
     Args:
-        identifier (str): Gene symbol or ID (e.g. "PTEN").
+        identifier (str): Gene symbol or ID (e.g. "PTEN"), or a comma-separated list.
+        backend (str): 'api', 'local' or 'auto' (see resolve_backend).
+        species (str): Local backend only: species filter (default reactome_index.DEFAULT_SPECIES, '' for all).
+        limit (int): Maximum pathways returned (None for all).
     Returns:
-        list: List of pathway dictionaries.
+        ResultTable: One row per pathway. If the deadline budget runs out mid-way, a dict
+                     with the pathways found so far as 'results' and 'partial': True.
     """
+    # Handle comma-separated list
+    if ',' in identifier:
+        entities = [e.strip() for e in identifier.split(',') if e.strip()]
+    else:
+        entities = [identifier]
+
+    if resolve_backend(backend) == 'local':
+        try:
+            return reactome_index.default_index().pathways_for(
+                entities, reactome_index.DEFAULT_SPECIES if species is None else species, limit)
+        except Exception as e:
+            print(f"Reactome Local Index Error: {e}")
+            return ResultTable()
+
     try:
-        # Handle comma-separated list
-        if ',' in identifier:
-            entities = [e.strip() for e in identifier.split(',')]
-        else:
-            entities = [identifier]
-            
-        all_pathways = []
+        all_pathways = ResultTable()
         seen_ids = set()
 
         for entity in entities:
             # Search for the entity first to handle symbols
             url = f"{BASE_URL}/search/query?query={requests.utils.quote(entity)}&cluster=true"
             
-            response = requests.get(url)
+            # Retries transient failures; one entity failing for good doesn't drop the others
+            try:
+                response = resilience.get(url, key='reactome.search', hedge=resilience.HEDGE_REQUESTS)
+            except deadline.DeadlineExceeded as e:
+                print(f"Reactome: deadline reached after {len(all_pathways)} pathways")
+                results = all_pathways[:limit]
+                return {'results': results, 'total': len(results), 'partial': True, 'error': str(e)}
+            except requests.exceptions.RequestException as e:
+                print(f"Reactome Error for '{entity}': {e}")
+                continue
             if response.status_code != 200:
                 continue
             
@@ -44,11 +89,11 @@ def get_pathways_for_entity(identifier):
                             })
                             seen_ids.add(st_id)
         
-        return all_pathways[:20] # Return top 20 matches
+        return all_pathways[:limit] # Return top matches
         
     except Exception as e:
         print(f"Reactome Error: {e}")
-        return []
+        return ResultTable()
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,275 @@
+"""
+Local Reactome Index
+Memory-mapped gene -> pathway index built from Reactome's bulk mapping files.
+
+Reactome publishes identifier-to-pathway mappings at https://reactome.org/download-data:
+  - NCBI2Reactome.txt, UniProt2Reactome.txt, Ensembl2Reactome.txt (and the _All_Levels
+    variants): tab-separated identifier, pathway stId, URL, pathway name, evidence code,
+    species.
+  - ReactomePathways.gmt: pathway name, stId, then the gene symbols in it (human only).
+
+build() merges any of these into a directory of numpy arrays: the sorted identifiers
+(fixed-width bytes), per-identifier offsets into a pathway entry array, and each
+pathway's species code, plus a small JSON table of pathway stIds and names. Arrays are
+opened with mmap, so only the pages a lookup touches are read, and thousands of genes
+are looked up at once with a vectorized binary search.
+
+Usage:
+    python reactome_index.py build ReactomePathways.gmt NCBI2Reactome.txt
+    python reactome_index.py lookup PTEN TP53 ASGR1 --species "Homo sapiens"
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from result_table import ResultTable
+
+INDEX_DIR = os.environ.get('REACTOME_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.reactome_index'))
+DEFAULT_SPECIES = os.environ.get('REACTOME_SPECIES', 'Homo sapiens')  # '' for all species
+GMT_SPECIES = 'Homo sapiens'
+
+
+def normalize_key(identifier: str) -> str:
+    """Identifiers match case-insensitively: 'pten' finds 'PTEN'."""
+    return identifier.strip().upper()
+
+
+def read_mapping(path: str, gmt_species: str = GMT_SPECIES) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Read a Reactome mapping file.
+
+    Yields:
+        (identifier, stId, pathway name, species) per mapping line.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f, delimiter='\t'):
+            if path.endswith('.gmt'):
+                if len(row) >= 3:
+                    for gene in row[2:]:
+                        if gene:
+                            yield gene, row[1], row[0], gmt_species
+            elif len(row) >= 6 and row[0] and not row[0].startswith('#'):
+                yield row[0], row[1], row[3], row[5]
+
+
+def build(sources: Iterable[str], directory: str = INDEX_DIR, gmt_species: str = GMT_SPECIES) -> int:
+    """
+    Build (or rebuild) the index from one or more mapping files.
+
+    Returns:
+        int: Number of distinct identifiers indexed.
+    """
+    sources = list(sources)
+    key_ids: Dict[str, int] = {}
+    pathway_ids: Dict[str, int] = {}
+    pathways: List[List[str]] = []
+    species_ids: Dict[str, int] = {}
+    pair_key, pair_pathway = array('i'), array('i')
+
+    for source in sources:
+        for identifier, st_id, name, species in read_mapping(source, gmt_species):
+            key = normalize_key(identifier)
+            if not key or not st_id:
+                continue
+            if st_id not in pathway_ids:
+                pathway_ids[st_id] = len(pathways)
+                pathways.append([st_id, name, species])
+            species_ids.setdefault(species, len(species_ids))
+            pair_key.append(key_ids.setdefault(key, len(key_ids)))
+            pair_pathway.append(pathway_ids[st_id])
+
+    if not key_ids:
+        raise ValueError(f"No mappings found in {', '.join(sources)}")
+
+    # Sort identifiers, then group each identifier's pathways (duplicates from several
+    # evidence codes or files collapse) in pathway first-seen order
+    keys = list(key_ids)
+    order = np.argsort(np.array(keys, dtype=object))
+    rank = np.empty(len(keys), dtype=np.int64)
+    rank[order] = np.arange(len(keys))
+    pairs = np.unique(rank[np.frombuffer(pair_key, dtype=np.int32)] * len(pathways)
+                      + np.frombuffer(pair_pathway, dtype=np.int32))
+    entries = (pairs % len(pathways)).astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(pairs // len(pathways), minlength=len(keys)))]).astype(np.int64)
+    sorted_keys = np.array([keys[i].encode('utf-8') for i in order])
+
+    tmp = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, 'keys.npy'), sorted_keys)
+    np.save(os.path.join(tmp, 'offsets.npy'), offsets)
+    np.save(os.path.join(tmp, 'entries.npy'), entries)
+    np.save(os.path.join(tmp, 'pathway_species.npy'),
+            np.array([species_ids[p[2]] for p in pathways], dtype=np.int16))
+    np.save(os.path.join(tmp, 'pathway_sizes.npy'),
+            np.bincount(entries, minlength=len(pathways)).astype(np.int32))
+    with open(os.path.join(tmp, 'pathways.json'), 'w', encoding='utf-8') as f:
+        json.dump({'pathways': [p[:2] for p in pathways], 'species': list(species_ids),
+                   'sources': [os.path.basename(s) for s in sources],
+                   'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(os.path.dirname(os.path.abspath(directory)), exist_ok=True)
+    os.replace(tmp, directory)
+    print(f"Reactome index: {len(keys)} identifiers, {len(pathways)} pathways, "
+          f"{len(entries)} mappings, {len(species_ids)} species -> {directory}")
+    return len(keys)
+
+
+class ReactomeIndex:
+    """
+    Args:
+        directory: Index directory written by build().
+    """
+
+    def __init__(self, directory: str = INDEX_DIR):
+        if not os.path.exists(os.path.join(directory, 'keys.npy')):
+            raise FileNotFoundError(f"Reactome index not found at {directory} "
+                                    f"(build it with: python reactome_index.py build <mapping files>)")
+        self.directory = directory
+        self._keys = np.load(os.path.join(directory, 'keys.npy'), mmap_mode='r')
+        self._offsets = np.load(os.path.join(directory, 'offsets.npy'), mmap_mode='r')
+        self._entries = np.load(os.path.join(directory, 'entries.npy'), mmap_mode='r')
+        self._pathway_species = np.load(os.path.join(directory, 'pathway_species.npy'), mmap_mode='r')
+        sizes_path = os.path.join(directory, 'pathway_sizes.npy')
+        if os.path.exists(sizes_path):
+            self._pathway_sizes = np.load(sizes_path, mmap_mode='r')
+        else:  # Index built before sizes were stored
+            self._pathway_sizes = np.bincount(self._entries, minlength=len(self._pathway_species))
+        with open(os.path.join(directory, 'pathways.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.species = meta['species']
+        pathway_species = np.asarray(self._pathway_species).tolist()
+        self._rows = [(st_id, name, self.species[code]) for (st_id, name), code in zip(meta['pathways'], pathway_species)]
+        self.sources = meta.get('sources', [])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _positions(self, keys: List[str]) -> np.ndarray:
+        """Index of each key in the sorted key array, or -1 when absent."""
+        encoded = [k.encode('utf-8') for k in keys]
+        width = self._keys.dtype.itemsize
+        # Longer keys can't be present, and would be truncated to a false match
+        query = np.array([e if len(e) <= width else b'' for e in encoded], dtype=self._keys.dtype)
+        pos = np.searchsorted(self._keys, query)
+        pos = np.minimum(pos, len(self._keys) - 1)
+        found = (self._keys[pos] == query) & (query != b'')
+        return np.where(found, pos, -1)
+
+    def _gather(self, identifiers: List[str], species: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Flat (identifier index, pathway index) arrays for all mappings of the identifiers,
+        grouped by identifier in input order.
+        """
+        empty = np.empty(0, dtype=np.int64)
+        if species and species not in self.species:
+            return empty, empty
+        pos = self._positions([normalize_key(i) for i in identifiers])
+        owners = np.flatnonzero(pos >= 0)
+        starts = np.asarray(self._offsets[pos[owners]])
+        lengths = np.asarray(self._offsets[pos[owners] + 1]) - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return empty, empty
+        # Positions starts[i] .. starts[i] + lengths[i] - 1 for every found identifier, concatenated
+        first = np.cumsum(lengths) - lengths
+        flat = np.repeat(starts - first, lengths) + np.arange(total)
+        pathways = np.asarray(self._entries[flat]).astype(np.int64)
+        owner = np.repeat(owners, lengths)
+        if species:
+            keep = np.asarray(self._pathway_species[pathways]) == self.species.index(species)
+            owner, pathways = owner[keep], pathways[keep]
+        return owner, pathways
+
+    def lookup(self, identifiers: List[str], species: Optional[str] = DEFAULT_SPECIES) -> Dict[str, List[Tuple[str, str, str]]]:
+        """
+        Pathways of many identifiers at once.
+
+        Args:
+            identifiers: Gene symbols or other identifiers, matched case-insensitively.
+            species: Keep only pathways of this species ('' or None for all).
+        Returns:
+            dict: identifier -> list of (stId, name, species); unknown identifiers map to [].
+        """
+        owner, pathways = self._gather(identifiers, species)
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(owner, minlength=len(identifiers)))]).tolist()
+        rows = [self._rows[p] for p in pathways.tolist()]
+        return {identifier: rows[bounds[i]:bounds[i + 1]] for i, identifier in enumerate(identifiers)}
+
+    def pathways_for(self, identifiers: List[str], species: Optional[str] = DEFAULT_SPECIES,
+                     limit: Optional[int] = None) -> ResultTable:
+        """
+        Rows shaped like reactome_client.get_pathways_for_entity: stId, name, species and
+        associatedGene, each pathway listed once (for the first identifier that has it).
+
+        Pathways are ordered by how many of the identifiers they contain (most first),
+        then by size (fewest mapped identifiers first, so specific lower-level pathways
+        come before broad top-level ones), then by first appearance. The order only
+        depends on the index contents, so `limit` keeps the same pathways every time.
+        """
+        owner, pathways = self._gather(identifiers, species)
+        unique, first = np.unique(pathways, return_index=True)
+        # Distinct identifiers per pathway ("PTEN, pten" counts once)
+        _, key = np.unique([normalize_key(i) for i in identifiers], return_inverse=True)
+        pairs = np.unique(pathways * len(identifiers) + key[owner])
+        hits = np.bincount(np.searchsorted(unique, pairs // len(identifiers)), minlength=len(unique))
+        order = np.lexsort((first, np.asarray(self._pathway_sizes[unique]), -hits))
+        first = first[order][:limit]
+        rows = [self._rows[p] for p in pathways[first].tolist()]
+        return ResultTable.from_columns({
+            'stId': [r[0] for r in rows],
+            'name': [r[1] for r in rows],
+            'species': [r[2] for r in rows],
+            'associatedGene': [identifiers[i] for i in owner[first].tolist()],
+        })
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def default_index() -> ReactomeIndex:
+    """Process-wide ReactomeIndex at INDEX_DIR, opened on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ReactomeIndex()
+        return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Reactome gene -> pathway index.")
+    parser.add_argument('--index', default=INDEX_DIR, help="Index directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help="Import Reactome mapping files (*2Reactome*.txt, .gmt)")
+    build_cmd.add_argument('sources', nargs='+')
+    build_cmd.add_argument('--gmt-species', default=GMT_SPECIES, help="Species of pathways read from .gmt files")
+    lookup_cmd = sub.add_parser('lookup', help="Pathways of one or more identifiers")
+    lookup_cmd.add_argument('identifiers', nargs='+')
+    lookup_cmd.add_argument('--species', default=DEFAULT_SPECIES, help="Species filter ('' for all)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        build(args.sources, args.index, args.gmt_species)
+        return
+    index = ReactomeIndex(args.index)
+    started = time.perf_counter()
+    found = index.lookup(args.identifiers, args.species)
+    elapsed = (time.perf_counter() - started) * 1000
+    for identifier, pathways in found.items():
+        print(f"{identifier}: {len(pathways)} pathways")
+        for st_id, name, species in pathways[:10]:
+            print(f"  {st_id:<16} {name} ({species})")
+    print(f"Looked up {len(found)} identifiers in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
-import pypdf
 import sys
+from pdf_ingest import iter_pdf_pages
 
-try:
-    reader = pypdf.PdfReader("../../workflow.pdf")
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    print(text)
-except Exception as e:
-    print(f"Error reading PDF: {e}")
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "../../workflow.pdf"
+    try:
+        # Pages are extracted in parallel (and cached) but printed in order
+        for _, text in iter_pdf_pages(path):
+            print(text)
+    except Exception as e:
+        print(f"Error reading PDF: {e}")
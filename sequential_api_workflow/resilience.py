@@ -0,0 +1,194 @@
+"""
+Resilience Layer
+Retries with jittered exponential backoff, per-call deadlines and hedged requests
+for the idempotent upstream calls (OpenTargets GraphQL, Reactome/ICD-11/PatentsView REST).
+
+Hedging: once a call has been outstanding for longer than the p95 latency observed
+for its key, a duplicate is sent and whichever response arrives first is used.
+"""
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Optional
+
+import requests
+
+import deadline as deadline_module
+import rate_limiter
+from deadline import DeadlineExceeded
+
+RETRY_ATTEMPTS = 4
+BACKOFF_BASE = 0.5            # Seconds; attempt n sleeps uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n))
+BACKOFF_MAX = 8.0
+CALL_DEADLINE = 60.0          # Total seconds per call, across retries and hedges
+ATTEMPT_TIMEOUT = 30.0        # Upper bound for a single HTTP attempt
+HEDGE_REQUESTS = os.environ.get('HEDGE_REQUESTS', '1') != '0'
+HEDGE_MIN_SAMPLES = 20        # Latency samples needed before the p95 is trusted
+HEDGE_DEFAULT_DELAY = 2.0     # Hedge delay while there is not enough history
+HEDGE_MIN_DELAY = 0.1
+LATENCY_WINDOW = 200
+# Throttling (429/503) is retried only by rate_limiter.request, after its Retry-After pauses;
+# retrying it here as well would multiply the sends of one call against the shared bucket
+RETRY_STATUSES = (500, 502, 504)
+
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError)
+
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='hedge')
+_lock = threading.Lock()
+_latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+_stats: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {'calls': 0, 'retries': 0, 'failures': 0, 'hedges_sent': 0, 'hedges_won': 0}
+)
+
+
+class TransientHTTPError(requests.exceptions.HTTPError):
+    """Raised for retryable HTTP statuses (5xx gateway errors; see RETRY_STATUSES)."""
+
+
+def _count(key: str, field: str, n: int = 1):
+    with _lock:
+        _stats[key][field] += n
+
+
+def record_latency(key: str, seconds: float):
+    with _lock:
+        _latencies[key].append(seconds)
+
+
+def hedge_delay(key: str) -> float:
+    """Delay before a hedge is sent: the observed p95 latency for this key."""
+    with _lock:
+        samples = sorted(_latencies[key])
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, samples[int(0.95 * (len(samples) - 1))])
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Per-key counters: calls, retries, failures, hedges_sent, hedges_won."""
+    with _lock:
+        return {key: dict(counts) for key, counts in _stats.items()}
+
+
+def print_report():
+    report = stats()
+    if not report:
+        return
+    print("\nUpstream calls:")
+    print(f"  {'key':<28}{'calls':>7}{'retries':>9}{'failures':>10}{'hedges':>8}{'won':>6}")
+    for key, c in sorted(report.items()):
+        print(f"  {key:<28}{c['calls']:>7}{c['retries']:>9}{c['failures']:>10}{c['hedges_sent']:>8}{c['hedges_won']:>6}")
+
+
+def _hedged(fn: Callable[[float], object], key: str, timeout: float):
+    """Run fn, sending a duplicate after the hedge delay; return the first success."""
+    fn = deadline_module.propagate(fn)
+    primary = _hedge_pool.submit(fn, timeout)
+    done, _ = wait([primary], timeout=min(hedge_delay(key), timeout))
+    if done:
+        return primary.result()
+
+    _count(key, 'hedges_sent')
+    hedge = _hedge_pool.submit(fn, timeout)
+    pending = {primary, hedge}
+    errors = []
+    while pending:
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded(f"{key}: no response within {timeout:.1f}s")
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    _count(key, 'hedges_won')
+                return future.result()
+            errors.append(future.exception())
+    raise errors[0]
+
+
+def call_with_retry(fn: Callable[[float], object], key: str, attempts: int = RETRY_ATTEMPTS,
+                    deadline: float = CALL_DEADLINE, hedge: bool = False):
+    """
+    Call fn(timeout) with jittered exponential backoff until it succeeds or the deadline passes.
+
+    Args:
+        fn: Idempotent callable taking the per-attempt timeout in seconds.
+        key: Name used for latency tracking and stats, e.g. "opentargets.search".
+        attempts: Maximum number of attempts.
+        deadline: Total time budget in seconds for all attempts, further capped by any
+                  surrounding deadline budget (see deadline.py).
+        hedge: Send a duplicate request once the attempt exceeds the key's p95 latency.
+    Returns:
+        Whatever fn returns.
+    Raises:
+        The last retryable error, or DeadlineExceeded.
+    """
+    _count(key, 'calls')
+    deadline_at = time.monotonic() + deadline
+    budget_at = deadline_module.current()
+    bounded_by_budget = budget_at is not None and budget_at < deadline_at
+    if bounded_by_budget:
+        deadline_at = budget_at
+    last_error = None
+    out_of_time = False
+
+    for attempt in range(attempts):
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            out_of_time = True
+            break
+        timeout = min(ATTEMPT_TIMEOUT, remaining)
+        started = time.monotonic()
+        try:
+            result = _hedged(fn, key, timeout) if hedge else fn(timeout)
+            record_latency(key, time.monotonic() - started)
+            return result
+        except RETRYABLE_ERRORS + (TransientHTTPError,) as e:
+            last_error = e
+
+        if attempt == attempts - 1:
+            break
+        sleep = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        if time.monotonic() + sleep >= deadline_at:
+            out_of_time = True
+            break
+        _count(key, 'retries')
+        print(f"{key}: attempt {attempt + 1} failed ({last_error}); retrying in {sleep:.2f}s")
+        time.sleep(sleep)
+
+    _count(key, 'failures')
+    if out_of_time and bounded_by_budget and not isinstance(last_error, DeadlineExceeded):
+        # The workflow/request budget ran out, not just this call's own deadline
+        raise DeadlineExceeded(f"{key}: deadline budget exhausted") from last_error
+    raise last_error or DeadlineExceeded(f"{key}: deadline of {deadline:.1f}s exceeded")
+
+
+def request(method: str, url: str, key: Optional[str] = None, attempts: int = RETRY_ATTEMPTS,
+            deadline: float = CALL_DEADLINE, hedge: bool = False, **kwargs) -> requests.Response:
+    """
+    Rate-limited, retried (and optionally hedged) HTTP request for idempotent calls.
+
+    Retryable statuses (RETRY_STATUSES) raise TransientHTTPError once attempts are
+    exhausted; other responses, including throttled ones rate_limiter gave up on, are
+    returned for the caller to handle.
+    """
+    key = key or url
+
+    def attempt(timeout):
+        response = rate_limiter.request(method, url, timeout=timeout, **kwargs)
+        if response.status_code in RETRY_STATUSES:
+            raise TransientHTTPError(f"{response.status_code} from {url}", response=response)
+        return response
+
+    return call_with_retry(attempt, key, attempts=attempts, deadline=deadline, hedge=hedge)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
@@ -0,0 +1,179 @@
+"""
+Response Encoding
+Fast JSON serialization and negotiated gzip/brotli compression for the FastAPI wrapper.
+"""
+import gzip
+import json
+from typing import Any, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+from result_table import ResultTable, jsonable
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip is always available
+    brotli = None
+
+# Responses smaller than this are sent uncompressed (compression overhead isn't worth it)
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def _default(obj: Any) -> Any:
+    """ResultTables and row views as plain lists and dicts; anything else as its string."""
+    try:
+        return jsonable(obj)
+    except TypeError:
+        return str(obj)
+
+
+def _dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS, default=_default)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _dumps_table(table: ResultTable) -> bytes:
+    # Row dicts exist for one RECORD_CHUNK at a time; each chunk's array is spliced in without its brackets
+    return b"[" + b",".join(body for body in (_dumps(chunk)[1:-1] for chunk in table.iter_record_chunks()) if body) + b"]"
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content to compact UTF-8 JSON bytes.
+
+    Uses orjson when installed, otherwise the standard json module. A ResultTable given
+    directly or as a value of a top-level dict is encoded RECORD_CHUNK rows at a time,
+    so row dictionaries for the whole table never exist at once (tables nested deeper
+    are converted whole by the default hook).
+    """
+    if isinstance(content, ResultTable):
+        return _dumps_table(content)
+    if isinstance(content, dict) and any(isinstance(v, ResultTable) for v in content.values()):
+        return b"{" + b",".join(
+            _dumps(str(key)) + b":" + (_dumps_table(value) if isinstance(value, ResultTable) else _dumps(value))
+            for key, value in content.items()
+        ) + b"}"
+    return _dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that renders with `dumps`.
+
+    Return it directly from an endpoint to also skip FastAPI's jsonable_encoder pass.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported content-coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Raw header value, e.g. "gzip, deflate, br;q=0.9".
+    Returns:
+        "br", "gzip" or None if neither is acceptable.
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    def q(coding):
+        return accepted.get(coding, accepted.get("*", 0.0))
+
+    candidates = []
+    if brotli is not None and q("br") > 0:
+        candidates.append((q("br"), 1, "br"))
+    if q("gzip") > 0:
+        candidates.append((q("gzip"), 0, "gzip"))
+    if not candidates:
+        return None
+    return max(candidates)[2]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with the given content-coding ("br" or "gzip")."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses buffered responses above a size threshold.
+
+    Streaming responses (more than one body chunk) and responses that already
+    carry a Content-Encoding are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                if "content-encoding" in Headers(raw=message["headers"]):
+                    passthrough = True
+                    await send(start_message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streaming body: don't buffer it, send as-is
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
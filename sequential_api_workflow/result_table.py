@@ -0,0 +1,228 @@
+"""
+Result Tables
+Column-oriented container for API results passed between workflow stages.
+
+A ResultTable keeps one Python list per field instead of one dictionary per record,
+so a 100k-record step holds a few dozen lists rather than 100k dicts that each repeat
+every key. Client normalizers append into it; keyword extraction, the JSON/CSV/Arrow
+writers and the API response encoder read its columns directly.
+
+Rows are still available as read-only RowView mappings, so code written for lists of
+dictionaries keeps working: len(), indexing, slicing, iteration, record.get(...),
+'key' in record and {**record}. A record that lacks a field (as opposed to holding
+None) is remembered, so rows round-trip to the same dictionaries they came from.
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+RECORD_CHUNK = 1000   # Rows materialized at a time when records must become dicts (JSON)
+
+
+class RowView(Mapping):
+    """Read-only dictionary view of one ResultTable row."""
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: 'ResultTable', index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key):
+        column = self._table._columns[key]
+        absent = self._table._absent.get(key)
+        if absent and self._index in absent:
+            raise KeyError(key)
+        return column[self._index]
+
+    def __iter__(self):
+        absent = self._table._absent
+        for name in self._table._columns:
+            if not (absent.get(name) and self._index in absent[name]):
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._table._record(self._index)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class ResultTable:
+    """
+    Records stored as columns.
+
+    Args:
+        columns: Field names to start with (optional; fields are added as they appear).
+    """
+
+    def __init__(self, columns: Optional[Iterable[str]] = None):
+        self._columns: Dict[str, List[Any]] = {name: [] for name in columns or ()}
+        self._absent: Dict[str, set] = {}
+        self._length = 0
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping]) -> 'ResultTable':
+        table = cls()
+        table.extend(records)
+        return table
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, List[Any]]) -> 'ResultTable':
+        """Table over equal-length column lists (used as-is, not copied)."""
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("ResultTable columns must all have the same length")
+        table = cls()
+        table._columns = dict(columns)
+        table._length = lengths.pop() if lengths else 0
+        return table
+
+    @classmethod
+    def concat(cls, parts: Iterable[Any]) -> 'ResultTable':
+        """One table from several ResultTables and/or lists of records, in order."""
+        table = cls()
+        for part in parts:
+            table.extend(part)
+        return table
+
+    @property
+    def names(self) -> List[str]:
+        """Field names in first-seen order."""
+        return list(self._columns)
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def _add_column(self, name: str):
+        self._columns[name] = [None] * self._length
+        if self._length:
+            self._absent[name] = set(range(self._length))
+
+    def append(self, record: Mapping):
+        """Add one record (any mapping, e.g. a freshly normalized dict)."""
+        index = self._length
+        for name in record:
+            if name not in self._columns:
+                self._add_column(name)
+        for name, column in self._columns.items():
+            if name in record:
+                column.append(record[name])
+            else:
+                column.append(None)
+                self._absent.setdefault(name, set()).add(index)
+        self._length += 1
+
+    def extend(self, records: Any):
+        """Add records from another ResultTable (column by column) or any iterable of mappings."""
+        if not isinstance(records, ResultTable):
+            for record in records:
+                self.append(record)
+            return
+        offset = self._length
+        for name in records._columns:
+            if name not in self._columns:
+                self._add_column(name)
+        for name, column in self._columns.items():
+            if name in records._columns:
+                column.extend(records._columns[name])
+                if records._absent.get(name):
+                    self._absent.setdefault(name, set()).update(i + offset for i in records._absent[name])
+            else:
+                column.extend([None] * records._length)
+                self._absent.setdefault(name, set()).update(range(offset, offset + records._length))
+        self._length += records._length
+
+    def column(self, name: str) -> List[Any]:
+        """
+        Values of one field for every row (None where a record lacks it).
+
+        The returned list is the table's own storage; treat it as read-only.
+        """
+        column = self._columns.get(name)
+        return column if column is not None else [None] * self._length
+
+    def with_column(self, name: str, value: Any) -> 'ResultTable':
+        """
+        New table with a constant field added. Columns are shallow-copied, so appending
+        to either table leaves the other intact.
+        """
+        table = self._select(list)
+        table._columns.pop(name, None)
+        table._absent.pop(name, None)
+        table._columns[name] = [value] * self._length
+        return table
+
+    def take(self, indices: Iterable[int]) -> 'ResultTable':
+        """New table with the given rows, in the given order."""
+        indices = list(indices)
+        table = self._select(lambda column: [column[i] for i in indices], len(indices))
+        for name, absent in self._absent.items():
+            rows = {j for j, i in enumerate(indices) if i in absent}
+            if rows:
+                table._absent[name] = rows
+        return table
+
+    def _select(self, pick, length: Optional[int] = None) -> 'ResultTable':
+        table = ResultTable()
+        table._columns = {name: pick(column) for name, column in self._columns.items()}
+        if length is None:
+            table._absent = {name: set(rows) for name, rows in self._absent.items()}
+        table._length = self._length if length is None else length
+        return table
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(self._length)))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ResultTable index out of range")
+        return RowView(self, index)
+
+    def __iter__(self) -> Iterator[RowView]:
+        for index in range(self._length):
+            yield RowView(self, index)
+
+    def _record(self, index: int) -> Dict[str, Any]:
+        return {name: column[index] for name, column in self._columns.items()
+                if not (self._absent.get(name) and index in self._absent[name])}
+
+    def iter_record_chunks(self, size: int = RECORD_CHUNK) -> Iterator[List[Dict[str, Any]]]:
+        """Rows as plain dictionaries, at most `size` at a time."""
+        names = list(self._columns)
+        columns = list(self._columns.values())
+        has_absent = any(self._absent.values())
+        for start in range(0, self._length, size):
+            stop = min(start + size, self._length)
+            if has_absent:
+                yield [self._record(i) for i in range(start, stop)]
+            else:
+                yield [dict(zip(names, row)) for row in zip(*(c[start:stop] for c in columns))]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """All rows as a list of plain dictionaries."""
+        return [record for chunk in self.iter_record_chunks() for record in chunk]
+
+    def __repr__(self):
+        return f"ResultTable({self._length} rows: {', '.join(self._columns)})"
+
+
+def jsonable(obj: Any) -> Any:
+    """
+    `default=` hook for json/orjson: ResultTables and RowViews become plain lists and dicts.
+
+    Raises:
+        TypeError: For any other unsupported object, as the encoders expect.
+    """
+    if isinstance(obj, ResultTable):
+        return obj.to_records()
+    if isinstance(obj, RowView):
+        return obj.to_dict()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,7 +1,6 @@
-import requests
 import pandas as pd
-import time
-from lxml import etree
+import rate_limiter
+from patent_fulltext_store import FullTextStore, FULLTEXT_BASE_URL
 
 # =============================
 # CONFIG
@@ -9,7 +8,6 @@ from lxml import etree
 PATENTSVIEW_API_KEY = "gHnGYUVo.LvuL5K0YiHqVbDjB4biYicrzb8xiQmgi"
 
 PATENTSVIEW_URL = "https://search.patentsview.org/api/v1/patent/"
-FULLTEXT_BASE_URL = "https://developer.uspto.gov/ibd-api/v1/patent/grant/"
 
 HEADERS = {
     "X-Api-Key": PATENTSVIEW_API_KEY,
@@ -20,19 +18,17 @@ HEADERS = {
 # =============================
 # FETCH FULL TEXT (CLAIMS + DESCRIPTION)
 # =============================
+_fulltext_store = None
+
 def fetch_full_text(patent_id):
+    # Raw XML is kept compressed on disk, so repeat exports skip the download
+    global _fulltext_store
     url = f"{FULLTEXT_BASE_URL}{patent_id}"
 
     try:
-        r = requests.get(url, headers={"Accept": "application/xml"}, timeout=30)
-        if r.status_code != 200:
-            return "", "", url
-
-        root = etree.fromstring(r.content)
-        claims = " ".join(root.xpath("//claims//text()"))
-        description = " ".join(root.xpath("//description//text()"))
-
-        return claims.strip(), description.strip(), url
+        if _fulltext_store is None:
+            _fulltext_store = FullTextStore()
+        return _fulltext_store.full_text(patent_id)
 
     except Exception as e:
         print(f" Full text error for {patent_id}: {e}")
@@ -75,7 +71,7 @@ def search_uspto_fulltext_excel(keywords, year, page=1, size=5):
     }
 
     print("\n Searching USPTO patents...")
-    response = requests.post(
+    response = rate_limiter.post(
         PATENTSVIEW_URL,
         headers=HEADERS,
         json=query,
@@ -93,7 +89,6 @@ def search_uspto_fulltext_excel(keywords, year, page=1, size=5):
         print(f" Fetching full text {idx}/{len(patents)} → {patent_id}")
 
         claims, description, fulltext_url = fetch_full_text(patent_id)
-        time.sleep(0.6)  # rate-limit safety
 
         rows.append({
             "Patent ID": patent_id,
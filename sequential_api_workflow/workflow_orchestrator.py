@@ -1,18 +1,37 @@
+import argparse
 import csv
-import json
 import os
 import sys
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+import requests
 from js_api_wrapper import call_js_api
 from keyword_extractor import extract_keywords
-from json_to_csv import convert_json_to_csv
+from columnar_output import OUTPUT_FORMATS, save_step_output, find_step_output, load_step_output
+import resilience
+import deadline
+from dedup import Deduplicator, DEFAULT_THRESHOLD
+from local_index import LocalIndex
+from profiling import StepProfiler, phase, PROFILE_FORMATS
+from incremental import IncrementalStore, FETCHERS as INCREMENTAL_APIS
+from result_table import ResultTable
 
 # New Python Clients
 import opentargets_client
 import icd11_client
 import reactome_client
+import pubmed_client
+import pdf_ingest
+import entity_memo
+import patentsview_planner
 
 INPUT_FILE = 'input_apis.csv'
 OUTPUT_DIR = 'workflow_outputs'
+MAP_CONCURRENCY = 4
+DEDUP_APIS = {'pubmed', 'uspto', 'patentsview'}
+STEP_RESERVE = 5.0            # Seconds of a --deadline budget held back for each later step
+MIN_STEP_BUDGET = 0.5         # Steps with less budget left than this are skipped
 
 def read_input_csv(file_path):
     steps = []
@@ -31,15 +50,38 @@ def execute_step(api_name, query, **kwargs):
     Dispatcher to call the appropriate API client (JS Bridge or Python)
     """
     api_lower = api_name.lower().strip()
+    memo_mode = kwargs.pop('memo', 'use')
     
-    if api_lower in ['pubmed', 'pubchem', 'uspto', 'patentsview']:
+    if api_lower == 'pubmed':
+        print(f"  -> Executing via Python PubMed E-utilities Client...")
+        return pubmed_client.search_pubmed(
+            query,
+            max_results=kwargs.get('maxResults') or pubmed_client.MAX_RESULTS,
+            date_from=kwargs.get('dateFrom'),
+            date_to=kwargs.get('dateTo')
+        )
+        
+    elif api_lower in ['pubchem', 'uspto', 'patentsview']:
         print(f"  -> Executing via Node.js bridge...")
         return call_js_api(api_name, query, **kwargs)
         
     elif api_lower == 'icd11':
-        print(f"  -> Executing via Python ICD-11 Client...")
         # Expecting query to be disease name
-        return icd11_client.search_icd11(query)
+        if icd11_client.resolve_backend(kwargs.get('backend')) == 'local':
+            # The offline index answers faster than the memo would
+            print(f"  -> Executing via offline ICD-11 index...")
+            hits = icd11_client.search_icd11(query, backend='local')
+            if memo_mode != 'off' and isinstance(hits, list):
+                # Later disease searches for these titles are memoized under the codes
+                entity_memo.default_memo().link_icd11(hits, 'icd11.local')
+            return hits
+        print(f"  -> Executing via Python ICD-11 Client...")
+        # Known diseases are answered from the memo
+        return entity_memo.default_memo().cached(
+            'icd11', entity_memo.normalize_name(query), lambda: icd11_client.search_icd11(query, backend='api'),
+            query=query, source='icd11.search', mode=memo_mode,
+            cacheable=lambda hits: bool(hits) and not any(h.get('note') for h in hits)
+        )
         
     elif api_lower == 'opentargets':
         print(f"  -> Executing via Python OpenTargets Client...")
@@ -50,34 +92,272 @@ def execute_step(api_name, query, **kwargs):
         # For now, let's assume if it starts with EFO_, it's an ID for association search
         # Otherwise it's a search for ID.
         if query.startswith('EFO_') or query.startswith('MONDO_') or query.startswith('Orphanet_'):
-            return opentargets_client.get_disease_gene_associations(query)
+            # Top-k by score; pages stop as soon as k genes are found or scores fall below minScore
+            limit = kwargs.get('topK', 10)
+            min_score = kwargs.get('minScore') or 0.0
+            if opentargets_client.resolve_backend(kwargs.get('backend')) == 'local':
+                # Snapshot queries are cheaper than a memo round trip
+                return opentargets_client.get_disease_gene_associations(query, limit=limit, min_score=min_score,
+                                                                        backend='local')
+            return entity_memo.default_memo().cached(
+                'genes', entity_memo.genes_key(query, limit, min_score),
+                lambda: opentargets_client.get_disease_gene_associations(query, limit=limit, min_score=min_score,
+                                                                         backend='api'),
+                query=query, source='opentargets.associations', mode=memo_mode
+            )
         else:
             # If search returns a hit, we might want to return that hit
-            hit = opentargets_client.search_disease(query)
+            try:
+                memo = entity_memo.default_memo()
+                # Keyed by the ICD-11 code when the query is the title of a memoized ICD-11 hit
+                hit = memo.cached(
+                    'efo', memo.efo_key(query), lambda: opentargets_client.search_disease(query),
+                    query=query, source='opentargets.search', mode=memo_mode
+                )
+            except deadline.DeadlineExceeded as e:
+                return {'results': [], 'total': 0, 'partial': True, 'error': str(e)}
             return [hit] if hit else []
             
     elif api_lower == 'reactome':
         print(f"  -> Executing via Python Reactome Client...")
         # Expecting Gene Symbol or ID
-        return reactome_client.get_pathways_for_entity(query)
+        return reactome_client.get_pathways_for_entity(query, backend=kwargs.get('backend'))
+        
+    elif api_lower == 'pdf':
+        print(f"  -> Extracting text from PDF...")
+        # Expecting a file path; one record per page feeds keyword extraction
+        return list(pdf_ingest.pdf_records(query))
         
     else:
         print(f"  -> Unknown API: {api_name}")
         return []
 
-def main():
-    # Ensure output directory exists
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
+def stream_step(api_name, query, **kwargs):
+    """
+    Like execute_step, but yields records one at a time as they arrive.
 
-    print("--- Starting Sequential API Workflow ---")
+    PubMed and OpenTargets gene association lookups are streamed from their paged APIs
+    (associations answered from the local snapshot arrive at once); other APIs are called with execute_step and their records yielded afterwards.
+    Raises deadline.DeadlineExceeded when the budget runs out mid-stream.
+    """
+    api_lower = api_name.lower().strip()
+
+    if api_lower == 'pubmed':
+        print(f"  -> Streaming via Python PubMed E-utilities Client...")
+        try:
+            yield from pubmed_client.iter_pubmed(
+                query,
+                max_results=kwargs.get('maxResults') or pubmed_client.MAX_RESULTS,
+                date_from=kwargs.get('dateFrom'),
+                date_to=kwargs.get('dateTo')
+            )
+        except deadline.DeadlineExceeded:
+            raise
+        except requests.exceptions.RequestException as e:
+            print(f"PubMed Error: {e}")
+        return
+
+    if (api_lower == 'opentargets' and query.startswith(('EFO_', 'MONDO_', 'Orphanet_'))
+            and opentargets_client.resolve_backend(kwargs.get('backend')) == 'api'):
+        print(f"  -> Streaming via Python OpenTargets Client...")
+        limit = kwargs.get('topK', 10)
+        min_score = kwargs.get('minScore') or 0.0
+        memo_mode = kwargs.get('memo', 'use')
+        memo = entity_memo.default_memo()
+        key = entity_memo.genes_key(query, limit, min_score)
+        cached = memo.get('genes', key) if memo_mode == 'use' else None
+        if cached is not None:
+            print(f"  -> Memo hit: genes '{key}' (source opentargets.associations)")
+            yield from cached
+            return
+        records = []
+        try:
+            for record in opentargets_client.iter_disease_gene_associations(query, k=limit, min_score=min_score):
+                records.append(record)
+                yield record
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"OpenTargets Associations Error: {e}")
+            return
+        if records and memo_mode != 'off':
+            memo.put('genes', key, records, query, 'opentargets.associations')
+        return
+
+    result = execute_step(api_name, query, **kwargs)
+    yield from (result.get('results', []) if isinstance(result, dict) else (result or []))
+    if isinstance(result, dict) and result.get('partial'):
+        raise deadline.DeadlineExceeded(result.get('error') or "Deadline budget exhausted")
+
+def step_kwargs_for(api_name, args):
+    """Client options for a step, taken from the command-line options."""
+    api_lower = api_name.lower()
+    if api_lower == 'pubmed':
+        return {'maxResults': args.pubmed_max_results}
+    if api_lower == 'opentargets':
+        return {'topK': getattr(args, 'opentargets_top_k', 10),
+                'minScore': getattr(args, 'opentargets_min_score', 0.0),
+                'memo': getattr(args, 'memo', 'use'),
+                'backend': getattr(args, 'opentargets_backend', None)}
+    if api_lower == 'icd11':
+        return {'memo': getattr(args, 'memo', 'use'), 'backend': getattr(args, 'icd11_backend', None)}
+    if api_lower == 'reactome':
+        return {'backend': getattr(args, 'reactome_backend', None)}
+    return {}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the sequential API workflow defined in input_apis.csv.")
+    parser.add_argument('--input', default=INPUT_FILE, help="Workflow definition CSV (api_name,keywords; optional mode and concurrency "
+                             "columns, see input_apis_map_example.csv for a map step)")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help="Directory for step outputs")
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='json',
+                        help="json (pretty JSON + CSV), parquet or arrow (typed, compressed, memory-mappable)")
+    parser.add_argument('--pubmed-max-results', type=int, default=pubmed_client.MAX_RESULTS,
+                        help="Maximum PubMed records per query (fetched in batches from the NCBI history server)")
+    parser.add_argument('--map-concurrency', type=int, default=MAP_CONCURRENCY,
+                        help="Default concurrent calls for steps with mode 'map' (overridable per step via the 'concurrency' column)")
+    parser.add_argument('--opentargets-top-k', type=int, default=10,
+                        help="Maximum gene associations per disease ID (fetched page by page, best score first)")
+    parser.add_argument('--opentargets-min-score', type=float, default=0.0,
+                        help="Stop fetching OpenTargets associations once the overall score drops below this")
+    parser.add_argument('--opentargets-backend', choices=opentargets_client.BACKENDS,
+                        help="OpenTargets gene associations: 'api' (Platform GraphQL), 'local' (release snapshot "
+                             "imported with opentargets_snapshot.py) or 'auto' (local once imported); default from "
+                             "OPENTARGETS_BACKEND, else api")
+    parser.add_argument('--icd11-backend', choices=icd11_client.BACKENDS,
+                        help="ICD-11 lookups: 'api' (WHO ICD-API), 'local' (offline index built with icd11_index.py) "
+                             "or 'auto' (local once built); default from ICD11_BACKEND, else api")
+    parser.add_argument('--reactome-backend', choices=reactome_client.BACKENDS,
+                        help="Reactome lookups: 'api' (ContentService search per gene), 'local' (mapping-file index "
+                             "built with reactome_index.py) or 'auto' (local once built); default from REACTOME_BACKEND, else api")
+    parser.add_argument('--memo', choices=entity_memo.MEMO_MODES, default='use',
+                        help="Entity resolution memo for ICD-11/OpenTargets steps: 'use' skips calls for fresh "
+                             "mappings, 'refresh' re-fetches and updates them, 'off' bypasses it (see entity_memo.py)")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Drop exact-ID and near-duplicate literature/patent records, within and across steps")
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated title+abstract Jaccard similarity treated as a near-duplicate")
+    parser.add_argument('--index', action='store_true',
+                        help="Add each step's output to the local full-text index (see local_index.py)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reuse existing step outputs in the output directory instead of calling the API again")
+    parser.add_argument('--incremental', action='store_true',
+                        help="PubMed/PatentsView steps fetch only records newer than the query's stored watermark "
+                             "and merge them into its saved result set (see incremental.py)")
+    parser.add_argument('--deadline', type=float,
+                        help="Time budget in seconds for the whole workflow, shared out across steps and passed "
+                             "down to every HTTP and Node bridge call; steps cut short return partial results")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Run steps concurrently: a step starts as soon as the previous step's keywords are "
+                             "final (e.g. its first hit) while that step keeps fetching and saving (see pipeline.py)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Record per-step wall/CPU time, phase breakdown and peak memory; print a table at the end")
+    parser.add_argument('--profile-output', choices=PROFILE_FORMATS,
+                        help="With --profile, also write a cProfile stats file or a collapsed-stack flamegraph file "
+                             "per step to <output-dir>/profiles")
+    return parser.parse_args(argv)
+
+def split_keywords(query):
+    """Split a comma-joined keyword string into unique, non-empty keywords (order preserved)."""
+    return list(dict.fromkeys(k.strip() for k in query.split(',') if k.strip()))
+
+def execute_map_step(api_name, query, concurrency=MAP_CONCURRENCY, **kwargs):
+    """
+    Fan-out ("map") execution: runs the API once per keyword, concurrently.
+    
+    Args:
+        api_name (str): API to call for every keyword.
+        query (str): Comma-separated keywords, e.g. extracted gene symbols.
+        concurrency (int): Maximum number of calls in flight.
+    Returns:
+        ResultTable: Merged results in keyword order; each record is tagged with
+                     'sourceKeyword' so its provenance survives the merge.
+    """
+    keywords = split_keywords(query)
+    if not keywords:
+        return ResultTable()
+
+    def tag(records, keyword):
+        table = records if isinstance(records, ResultTable) else ResultTable.from_records(records)
+        return table.with_column('sourceKeyword', keyword)
+
+    print(f"  -> Map step: {len(keywords)} keywords, concurrency {concurrency}")
+
+    def run_one(keyword):
+        if deadline.expired():
+            return ResultTable()
+        result = execute_step(api_name, keyword, **kwargs)
+        records = result.get('results', []) if isinstance(result, dict) else (result or [])
+        return tag(records, keyword)
+
+    if api_name.lower().strip() == 'patentsview':
+        # Keywords share merged PatentsView queries instead of one request each
+        results = patentsview_planner.search_many([{'keywords': k} for k in keywords])
+        per_keyword = [tag(r.get('results', []), k) for k, r in zip(keywords, results)]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(keywords)))) as executor:
+            per_keyword = list(executor.map(deadline.propagate(run_one), keywords))
+
+    for keyword, records in zip(keywords, per_keyword):
+        print(f"     '{keyword}': {len(records)} records")
+    return ResultTable.concat(per_keyword)
+
+def run_workflow(steps, args, on_step=None):
+    """
+    Runs a workflow chain.
     
-    steps = read_input_csv(INPUT_FILE)
+    Args:
+        steps (list): Step rows as read by read_input_csv (api_name, keywords, mode, ...).
+        args (Namespace): Options from parse_args (output_dir, output_format, resume, ...).
+        on_step (callable): Optional progress callback, called with a step summary when
+                            a step starts (status 'running') and when it finishes.
+    Returns:
+        list: One summary per step: step, api_name, status, records, seconds, partial.
+              With args.deadline, a step whose budget ran out keeps what it fetched
+              (status 'partial') and later steps continue from those keywords; steps
+              reached after the budget is spent get status 'deadline'.
+    """
+    if getattr(args, 'pipeline', False):
+        import pipeline  # Imports this module
+        return pipeline.run_pipelined_workflow(steps, args, on_step)
+
+    # Ensure output directory exists
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    summary = []
     current_keywords = ""
+    deduplicator = Deduplicator(threshold=args.dedup_threshold) if args.dedup else None
+    local_index = LocalIndex() if args.index else None
+    incremental_store = IncrementalStore() if getattr(args, 'incremental', False) else None
+    profiler = None
+    if getattr(args, 'profile', False):
+        profiler = StepProfiler(os.path.join(args.output_dir, 'profiles'), args.profile_output)
+    workflow_budget = getattr(args, 'deadline', None)
+    workflow_deadline_at = time.monotonic() + workflow_budget if workflow_budget else None
     
     for i, step in enumerate(steps):
-        api_name = step.get('api_name', '').strip()
-        csv_keywords = step.get('keywords', '').strip()
+        api_name = (step.get('api_name') or '').strip()
+        csv_keywords = (step.get('keywords') or '').strip()
+        step_mode = (step.get('mode') or '').strip().lower()
+        step_started = time.perf_counter()
+        
+        # Share the remaining workflow budget: this step may use all but a reserve for each later step
+        step_budget = None
+        if workflow_deadline_at is not None:
+            left = workflow_deadline_at - time.monotonic()
+            steps_left = len(steps) - i
+            if left < MIN_STEP_BUDGET:
+                print(f"\nStep {i+1} ({api_name}): skipped, workflow deadline reached.")
+                summary.append({'step': i+1, 'api_name': api_name, 'status': 'deadline', 'records': 0,
+                                'seconds': 0.0, 'partial': True})
+                if on_step:
+                    on_step(summary[-1])
+                continue
+            step_budget = max(left / steps_left, left - STEP_RESERVE * (steps_left - 1))
+        if on_step:
+            on_step({'step': i+1, 'api_name': api_name, 'status': 'running', 'records': 0, 'seconds': 0.0})
+        step_kwargs = step_kwargs_for(api_name, args)
         
         # Determine keywords to use
         if csv_keywords:
@@ -91,41 +371,105 @@ def main():
         else:
             print(f"\n[WARNING] Step {i+1} ({api_name}): No keywords found in CSV and no keywords generated from previous step.")
             print("Please address this gap in the input or logic.")
+            summary.append({'step': i+1, 'api_name': api_name, 'status': 'skipped', 'records': 0, 'seconds': 0.0})
+            if on_step:
+                on_step(summary[-1])
             continue
 
-        # Execute API call
-        result = execute_step(api_name, search_query)
+        step_name = f"step_{i+1}_{api_name}"
+        with deadline.budget(step_budget), (profiler.step(step_name) if profiler else nullcontext()):
+            result = None
+            existing_output = find_step_output(args.output_dir, step_name) if args.resume else None
         
-        # Check for results
-        results_list = result.get('results', []) if isinstance(result, dict) else result
-        
-        if not results_list:
-             print(f"  -> No results returned from {api_name}.")
-             # We assume we continue? Or stop? 
-             # For now, we continue, but next step might fail without keywords.
-             current_keywords = "" # Reset keywords if no data to extract from
-        else:
-            count = len(results_list)
-            print(f"  -> Success! Received {count} records.")
-            
-            # Save JSON
-            json_filename = os.path.join(OUTPUT_DIR, f"step_{i+1}_{api_name}_output.json")
-            with open(json_filename, 'w', encoding='utf-8') as jf:
-                json.dump(results_list, jf, indent=2)
+            if existing_output:
+                print(f"  -> Resuming from saved output: {existing_output}")
+                with phase('load'):
+                    results_list = load_step_output(existing_output)
+            elif step_mode == 'map':
+                # Fan out: one call per keyword, merged with provenance tags
+                concurrency = int(step.get('concurrency') or args.map_concurrency)
+                with phase('fetch'):
+                    results_list = execute_map_step(api_name, search_query, concurrency, **step_kwargs)
+            elif incremental_store and api_name.lower() in INCREMENTAL_APIS:
+                # Delta fetch since the stored watermark, merged into the saved result set
+                print(f"  -> Incremental refresh...")
+                with phase('fetch'):
+                    result = incremental_store.refresh(api_name, search_query)
+                results_list = result['results']
+            else:
+                # Execute API call
+                with phase('fetch'):
+                    result = execute_step(api_name, search_query, **step_kwargs)
             
-            # Convert to CSV
-            csv_filename = os.path.join(OUTPUT_DIR, f"step_{i+1}_{api_name}_output.csv")
-            convert_json_to_csv(results_list, csv_filename)
+                # Check for results
+                results_list = result.get('results', []) if isinstance(result, dict) else result
             
-            # Extract keywords for next step
-            extracted = extract_keywords(results_list, api_name)
-            if extracted:
-                current_keywords = extracted
-                print(f"  -> Extracted new keywords for next step: '{current_keywords}'")
+            # Map steps skip the keywords left when their budget runs out
+            step_partial = bool(isinstance(result, dict) and result.get('partial')) or \
+                (step_mode == 'map' and not existing_output and deadline.expired())
+            step_error = result.get('error') if isinstance(result, dict) else None
+            if step_partial:
+                print(f"  -> {f'Step incomplete ({step_error})' if step_error else 'Step budget exhausted'}; "
+                      f"continuing with partial results.")
+        
+            if deduplicator and results_list and api_name.lower() in DEDUP_APIS:
+                before = len(results_list)
+                with phase('dedup'):
+                    results_list = deduplicator.deduplicate(results_list)
+                print(f"  -> Dedup: {before} -> {len(results_list)} records")
+        
+            if not results_list:
+                 print(f"  -> No results returned from {api_name}.")
+                 # We assume we continue? Or stop? 
+                 # For now, we continue, but next step might fail without keywords.
+                 current_keywords = "" # Reset keywords if no data to extract from
             else:
-                print(f"  -> Could not extract meaningful keywords from output.")
-                current_keywords = ""
+                count = len(results_list)
+                print(f"  -> Success! Received {count} records.")
+            
+                # Save step output (JSON + CSV, or a single columnar file)
+                if not existing_output:
+                    output_path = save_step_output(results_list, args.output_dir, step_name, args.output_format)
+                    if local_index:
+                        with phase('index'):
+                            local_index.ingest_file(output_path)
+            
+                # Extract keywords for next step
+                with phase('extract_keywords'):
+                    extracted = extract_keywords(results_list, api_name)
+                if extracted:
+                    current_keywords = extracted
+                    print(f"  -> Extracted new keywords for next step: '{current_keywords}'")
+                else:
+                    print(f"  -> Could not extract meaningful keywords from output.")
+                    current_keywords = ""
+
+        summary.append({
+            'step': i+1,
+            'api_name': api_name,
+            'status': 'resumed' if existing_output else ('partial' if step_partial else ('ok' if results_list else 'empty')),
+            'records': len(results_list) if results_list else 0,
+            'seconds': round(time.perf_counter() - step_started, 3),
+            'partial': step_partial,
+        })
+        if step_error:
+            summary[-1]['error'] = step_error
+        if on_step:
+            on_step(summary[-1])
+
+    if profiler:
+        profiler.print_report()
+    return summary
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("--- Starting Sequential API Workflow ---")
+    
+    steps = read_input_csv(args.input)
+    run_workflow(steps, args)
 
+    resilience.print_report()
     print("\n--- Workflow Completed ---")
 
 if __name__ == "__main__":